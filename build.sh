@@ -7,3 +7,6 @@ echo "🛠 Building for: $PLATFORM"
 pyinstaller --clean jacoco_filter.spec
 
 echo "✅ Output placed in ./dist/jacoco-filter/"
+
+echo "⏱ Measuring startup of the build"
+JACOCO_FILTER_BENCHMARKS=1 JACOCO_FILTER_BINARY="./dist/jacoco-filter/jacoco-filter" python -m pytest -q -s tests/test_startup.py
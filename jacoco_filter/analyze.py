@@ -0,0 +1,279 @@
+"""
+This module implements the 'analyze' command: a what-if evaluation of rule sets over many reports.
+
+Every report is parsed once into a compact CoverageIndex (class and method names with their INSTRUCTION
+counters). The index is saved next to the other cached artifacts and reused while the report is unchanged,
+so later queries only evaluate the rules. Nothing is filtered, mutated or serialized.
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from lxml import etree
+
+from jacoco_filter.cache import write_atomic
+from jacoco_filter.matcher import RuleMatcher, matcher_for
+from jacoco_filter.model import owner_name
+from jacoco_filter.report_input import ReportInput
+from jacoco_filter.rules import FilterRule, ScopeEnum
+
+logger = logging.getLogger(__name__)
+
+# Bump when the index layout changes, to ignore indexes written by older versions.
+INDEX_VERSION = 1
+
+_CLASS_SCOPES = (ScopeEnum.CLASS, ScopeEnum.FILE)
+_METHOD_SCOPES = (ScopeEnum.METHOD,)
+
+
+class CoverageIndex:
+    """
+    Compact per-report index of classes, their methods and the INSTRUCTION counters of the methods.
+
+    Every class is stored as [fully qualified name, source file name, [[method name, missed, covered], ...]].
+    """
+
+    def __init__(self, entries: Optional[dict] = None):
+        self.entries: dict[str, dict] = entries or {}
+
+    @staticmethod
+    def index_report(path: Path) -> list:
+        """
+        Reads the classes of a report with iterparse, without building the tree or the report model.
+
+        Parameters:
+            path (Path): The JaCoCo XML report.
+        Returns:
+            list: The indexed classes.
+        """
+        classes = []
+        with ReportInput(path) as report_input:
+            for _, cls_elem in etree.iterparse(report_input.reader(), tag="class", events=("end",)):
+                methods = []
+                for meth_elem in cls_elem.iterfind("method"):
+                    counter = meth_elem.find("counter[@type='INSTRUCTION']")
+                    missed = int(counter.get("missed", 0)) if counter is not None else 0
+                    covered = int(counter.get("covered", 0)) if counter is not None else 0
+                    methods.append([meth_elem.get("name") or "", missed, covered])
+                classes.append(
+                    [(cls_elem.get("name") or "").replace("/", "."), cls_elem.get("sourcefilename") or "", methods]
+                )
+                cls_elem.clear()
+        return classes
+
+    def classes(self, path: Path) -> list:
+        """
+        Returns the indexed classes of a report, indexing it if it is new or changed since it was indexed.
+        """
+        stat = path.stat()
+        key = str(path)
+        entry = self.entries.get(key)
+        if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            logger.info("Indexing %s", path)
+            entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "classes": self.index_report(path)}
+            self.entries[key] = entry
+        return entry["classes"]
+
+    @classmethod
+    def load(cls, path: Path) -> "CoverageIndex":
+        """
+        Loads a saved index; returns an empty index if the file is missing, unreadable or outdated.
+        """
+        try:
+            data = json.loads(path.read_bytes())
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != INDEX_VERSION:
+            return cls()
+        return cls(data["reports"])
+
+    def save(self, path: Path):
+        """
+        Saves the index atomically.
+        """
+        data = {"version": INDEX_VERSION, "reports": self.entries}
+        write_atomic(path, json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+
+@dataclass
+class RuleSetImpact:
+    """
+    Instruction coverage of the reports before and after applying a rule set.
+    """
+
+    name: str
+    rules: list[FilterRule]
+    after: dict[str, tuple[int, int]] = field(default_factory=dict)
+    used_rules: set[int] = field(default_factory=set)
+
+    def unused_rules(self) -> list[FilterRule]:
+        """
+        Returns the rules that matched no class or method in any report.
+        """
+        return [rule for index, rule in enumerate(self.rules) if index not in self.used_rules]
+
+
+def evaluate_rule_set(classes: list, matcher: RuleMatcher, used_rules: set[int]) -> tuple[int, int]:
+    """
+    Computes the instruction (missed, covered) of indexed classes after applying the rules.
+
+    Classes removed by a 'class[nested]' rule take their nested and synthetic classes along, which are looked up
+    in an owner index as in FilterEngine.
+
+    Parameters:
+        classes (list): The indexed classes of one report.
+        matcher (RuleMatcher): The compiled rule set.
+        used_rules (set[int]): Positions of the rules that matched something, updated in place.
+    Returns:
+        tuple[int, int]: The remaining instruction (missed, covered).
+    """
+    missed = covered = 0
+    owners = owner_index(classes) if any(rule.nested for rule in matcher.rules) else {}
+    # Positions of the classes removed with their owner
+    inherited: set[int] = set()
+
+    for position, (fqcn, sourcefilename, methods) in enumerate(classes):
+        if position in inherited:
+            continue
+
+        if matcher.class_removed(fqcn, sourcefilename):
+            target = {"fully_qualified_classname": fqcn, "sourcefilename": sourcefilename}
+            used_rules.update(matcher.matching_positions(target, _CLASS_SCOPES))
+            if owners:
+                rule = matcher.first_class_match(target)
+                if rule is not None and rule.nested:
+                    inherited.update(nested_positions(classes, owners, fqcn))
+            continue
+
+        class_missed, class_covered = _remaining_methods(fqcn, methods, matcher, used_rules)
+        missed += class_missed
+        covered += class_covered
+
+    return missed, covered
+
+
+def _remaining_methods(fqcn: str, methods: list, matcher: RuleMatcher, used_rules: set[int]) -> tuple[int, int]:
+    """
+    Returns the instruction (missed, covered) of the methods of a kept class that no method rule removes.
+    """
+    missed = covered = 0
+    simple_class_name = fqcn.split(".")[-1]
+    for method_name, method_missed, method_covered in methods:
+        if matcher.method_removed(fqcn, simple_class_name, method_name):
+            target = {
+                "fully_qualified_classname": fqcn,
+                "simple_class_name": simple_class_name,
+                "method_name": method_name,
+            }
+            used_rules.update(matcher.matching_positions(target, _METHOD_SCOPES))
+            continue
+        missed += method_missed
+        covered += method_covered
+    return missed, covered
+
+
+def nested_positions(classes: list, owners: dict[str, list[int]], fqcn: str) -> list[int]:
+    """
+    Returns the positions of the indexed classes nested in a class, looked up in the owner index.
+    """
+    prefix = fqcn + "$"
+    return [position for position in owners.get(owner_name(fqcn), ()) if classes[position][0].startswith(prefix)]
+
+
+def owner_index(classes: list) -> dict[str, list[int]]:
+    """
+    Returns the positions of the nested and synthetic indexed classes by the name of their top-level owner, the
+    counterpart of Package.nested for the indexed classes of a whole report.
+    """
+    owners: dict[str, list[int]] = {}
+    for position, (fqcn, _, _) in enumerate(classes):
+        owner = owner_name(fqcn)
+        if owner != fqcn:
+            owners.setdefault(owner, []).append(position)
+    return owners
+
+
+def coverage_before(classes: list) -> tuple[int, int]:
+    """
+    Returns the instruction (missed, covered) of indexed classes without filtering.
+    """
+    missed = covered = 0
+    for _, _, methods in classes:
+        for _, method_missed, method_covered in methods:
+            missed += method_missed
+            covered += method_covered
+    return missed, covered
+
+
+def percent(counter: tuple[int, int]) -> str:
+    """
+    Formats the covered share of an instruction (missed, covered) pair.
+    """
+    total = counter[0] + counter[1]
+    return f"{100 * counter[1] / total:.2f}%" if total else "-"
+
+
+def analyze(
+    reports: dict[str, Path], rule_sets: dict[str, list[FilterRule]], index_path: Optional[Path] = None
+) -> tuple[dict[str, tuple[int, int]], list[RuleSetImpact]]:
+    """
+    Evaluates rule sets against the indexed reports.
+
+    Parameters:
+        reports (dict[str, Path]): The reports by module name.
+        rule_sets (dict[str, list[FilterRule]]): The candidate rule sets by name.
+        index_path (Optional[Path]): Where the index is loaded from and saved to; not persisted if None.
+    Returns:
+        tuple: The coverage before filtering per module, and the impact of every rule set.
+    """
+    index = CoverageIndex.load(index_path) if index_path is not None else CoverageIndex()
+    impacts = [RuleSetImpact(name, rules) for name, rules in rule_sets.items()]
+    matchers = [matcher_for(impact.rules) for impact in impacts]
+    before = {}
+
+    for module, path in reports.items():
+        classes = index.classes(path)
+        before[module] = coverage_before(classes)
+        for impact, matcher in zip(impacts, matchers):
+            impact.after[module] = evaluate_rule_set(classes, matcher, impact.used_rules)
+
+    if index_path is not None:
+        index.save(index_path)
+
+    return before, impacts
+
+
+def format_impact(before: dict[str, tuple[int, int]], impacts: list[RuleSetImpact]) -> str:
+    """
+    Formats the coverage before and after every rule set per module and in total, and the unused rules.
+    """
+    width = max([len("Total")] + [len(module) for module in before]) + 2
+    columns = ["before"] + [impact.name for impact in impacts]
+    column_width = max([10] + [len(c) + 2 for c in columns])
+
+    lines = ["Module".ljust(width) + "".join(c.rjust(column_width) for c in columns)]
+    for module, counter in before.items():
+        values = [percent(counter)] + [percent(impact.after[module]) for impact in impacts]
+        lines.append(module.ljust(width) + "".join(v.rjust(column_width) for v in values))
+
+    totals = [_sum(before.values())] + [_sum(impact.after.values()) for impact in impacts]
+    lines.append("Total".ljust(width) + "".join(percent(t).rjust(column_width) for t in totals))
+
+    for impact in impacts:
+        unused = impact.unused_rules()
+        if unused:
+            lines.append(f"Unused rules in '{impact.name}':")
+            lines.extend(f"   {rule.text}" for rule in unused)
+
+    return "\n".join(lines)
+
+
+def _sum(counters) -> tuple[int, int]:
+    missed = covered = 0
+    for counter_missed, counter_covered in counters:
+        missed += counter_missed
+        covered += counter_covered
+    return missed, covered
@@ -0,0 +1,90 @@
+"""
+This module provides the on-disk cache location and helpers shared by cached artifacts.
+"""
+
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+def default_cache_dir() -> Path:
+    """
+    Returns the default cache directory.
+
+    The directory is taken from the JACOCO_FILTER_CACHE_DIR environment variable, then from XDG_CACHE_HOME,
+    and falls back to '~/.cache/jacoco-filter'.
+
+    Returns:
+        Path: The cache directory (not necessarily existing yet).
+    """
+    if os.getenv("JACOCO_FILTER_CACHE_DIR"):
+        return Path(os.environ["JACOCO_FILTER_CACHE_DIR"])
+    if os.getenv("XDG_CACHE_HOME"):
+        return Path(os.environ["XDG_CACHE_HOME"]) / "jacoco-filter"
+    return Path.home() / ".cache" / "jacoco-filter"
+
+
+def resolve_cache_dir(cache_dir: Optional[str]) -> Path:
+    """
+    Returns the configured cache directory or the default one.
+    """
+    return Path(cache_dir) if cache_dir else default_cache_dir()
+
+
+def configured_cache_dir(cache_dir: Optional[str]) -> Optional[Path]:
+    """
+    Returns the cache directory set with --cache-dir, the configuration or JACOCO_FILTER_CACHE_DIR, for artifacts
+    only saved on request.
+
+    Parameters:
+        cache_dir (Optional[str]): The cache directory of the arguments or the configuration.
+    Returns:
+        Optional[Path]: The cache directory, or None if none is configured.
+    """
+    if cache_dir:
+        return Path(cache_dir)
+    if os.getenv("JACOCO_FILTER_CACHE_DIR"):
+        return Path(os.environ["JACOCO_FILTER_CACHE_DIR"])
+    return None
+
+
+def content_hash(parts: Iterable[str]) -> str:
+    """
+    Returns a stable SHA-256 hex digest of the given strings.
+
+    Parameters:
+        parts (Iterable[str]): The strings to hash, in order.
+    Returns:
+        str: The hex digest.
+    """
+    import hashlib  # pylint: disable=import-outside-toplevel
+
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def write_atomic(path: Path, data: bytes):
+    """
+    Writes data to a temporary file next to the target and renames it over the target, so concurrent readers
+    never see a partially written artifact.
+
+    Parameters:
+        path (Path): The target path; parent directories are created.
+        data (bytes): The content to write.
+    Returns:
+        None
+    """
+    import tempfile  # pylint: disable=import-outside-toplevel
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
@@ -8,14 +8,44 @@ import logging
 import sys
 
 from pathlib import Path
-from typing import Iterable
-
-import tomli
-
+from typing import Iterable, Optional
+
+from jacoco_filter.cache import configured_cache_dir, resolve_cache_dir
+from jacoco_filter.gate import parse_thresholds
+from jacoco_filter.matcher import load_compiled_rules
+from jacoco_filter.scheduler import parse_memory_size
+from jacoco_filter.report_output import DEFAULT_MAX_WRITERS
+from jacoco_filter.serializer import OUTPUT_PROFILES
+from jacoco_filter.sharding import SHARD_STRATEGIES, parse_shard
 from jacoco_filter.rules import FilterRule, load_filter_rules
 
 logger = logging.getLogger(__name__)
 
+ENGINES = ("model", "tree", "xslt", "lexical")
+PROCESSING_OPTIONS = (
+    "engine",
+    "stream",
+    "recount",
+    "prune_lines",
+    "output_profile",
+    "drop_lines",
+    "jobs",
+    "max_writers",
+    "max_memory",
+    "shard",
+    "shard_by",
+    "watch",
+    "watch_interval",
+    "batch_gc",
+    "rule_stats",
+    "huge_tree",
+    "intern_attributes",
+    "cache_dir",
+    "trace",
+    "trace_sample_rate",
+    "metrics",
+)
+
 
 def load_config(config_path: Path) -> dict:
     """
@@ -30,6 +60,9 @@ def load_config(config_path: Path) -> dict:
         logger.error("Configuration file not found: %s.", config_path)
         return {}
 
+    # Only needed when a configuration file is given
+    import tomli  # pylint: disable=import-outside-toplevel
+
     with config_path.open("rb") as f:
         logger.info("Loading configuration from %s...", config_path)
         return tomli.load(f)
@@ -73,6 +106,134 @@ def parse_arguments() -> tuple[argparse.Namespace, dict]:
         default=False,
         help="Enable verbose logging (DEBUG level)",
     )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        help="Processing engine: 'model' builds the report model (default), 'tree' filters and recounts "
+        "directly on the XML tree, 'xslt' compiles the rules into a cached XSLT stylesheet, 'lexical' cuts classes "
+        "out of the raw bytes for file/class-only rule sets (falls back to 'tree' otherwise)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=False,
+        help="Process the report one top-level <group>/<package> at a time to bound memory (model engine)",
+    )
+    parser.add_argument(
+        "--recount",
+        action="store_true",
+        default=False,
+        help="Rebuild all counter types (LINE, BRANCH, COMPLEXITY, METHOD, CLASS) from the surviving methods and "
+        "lines instead of zeroing every non-INSTRUCTION counter; implies --prune-lines, so the LINE counters match "
+        "the <line> entries written",
+    )
+    parser.add_argument(
+        "--prune-lines",
+        action="store_true",
+        default=False,
+        help="Also remove the sourcefile <line> entries of removed classes and methods (always done with --recount)",
+    )
+    parser.add_argument(
+        "--output-profile",
+        choices=OUTPUT_PROFILES,
+        help="'full' writes every element pretty-printed (default); 'slim' leaves out zero counters and "
+        "<sessioninfo> and writes compact XML",
+    )
+    parser.add_argument(
+        "--drop-lines",
+        action="store_true",
+        default=False,
+        help="Leave the sourcefile <line> entries out of the output",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        help="Number of input files processed in parallel worker processes (default: 1)",
+    )
+    parser.add_argument(
+        "--max-writers",
+        type=int,
+        help="Number of outputs flushed and renamed at the same time by all worker processes "
+        f"(default: {DEFAULT_MAX_WRITERS})",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=str,
+        help="Memory budget such as '4G': inputs are started largest first while their estimated footprints fit, "
+        "and inputs too large for it are streamed",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        help="Process only shard 'i/N' of the resolved inputs (1 <= i <= N), e.g. one shard per CI node",
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=SHARD_STRATEGIES,
+        help="Assign inputs to shards by path hash ('hash', default) or balance the shards by file size ('size')",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="Directory for cached artifacts such as compiled stylesheets (default: ~/.cache/jacoco-filter); "
+        "compiled rules are only cached if it is set, here, in the configuration or with JACOCO_FILTER_CACHE_DIR",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        help="Write structured trace events (removed classes/methods with the matching rule) as JSON lines "
+        "to the given file, or '-' for stdout",
+    )
+    parser.add_argument(
+        "--huge-tree",
+        action="store_true",
+        default=False,
+        help="Lift the XML parser limits on document depth and text size, for very large reports",
+    )
+    parser.add_argument(
+        "--intern-attributes",
+        action="store_true",
+        default=False,
+        help="Share one string per repeated attribute value (counter types, method descriptors) in the report "
+        "model, reducing its memory",
+    )
+    parser.add_argument(
+        "--batch-gc",
+        action="store_true",
+        default=False,
+        help="Tune the garbage collector for many inputs: pause it while a report is processed and release every "
+        "report right after it is written",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        default=False,
+        help="Keep running and re-filter the inputs whenever they change, e.g. after every local test run",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        help="Seconds between two polls of the inputs in watch mode; a changed report is filtered once it stayed "
+        "unchanged for one interval (default: 1.0)",
+    )
+    parser.add_argument(
+        "--rule-stats",
+        action="store_true",
+        default=False,
+        help="Count the evaluations, matches, removals and match time of every rule, and report rules that never "
+        "matched or only matched what earlier rules removed (slower matching; written to --metrics)",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        help="Write run metrics (e.g. input I/O counters) as JSON to the given file",
+    )
+    parser.add_argument(
+        "--trace-sample-rate",
+        type=float,
+        help="Share of trace events to record per event type, in the range (0, 1] (default: 1.0)",
+    )
 
     args = parser.parse_args()
     config = load_config(args.config) if args.config else {}
@@ -80,6 +241,129 @@ def parse_arguments() -> tuple[argparse.Namespace, dict]:
     return args, config
 
 
+def parse_analyze_arguments(argv: list[str]) -> tuple[argparse.Namespace, dict]:
+    """
+    Parses the arguments of the 'analyze' command and loads the configuration file if provided.
+
+    Parameters:
+        argv (list[str]): The arguments following 'analyze'.
+    Returns:
+        tuple[argparse.Namespace, dict]: The parsed arguments and the loaded configuration.
+    """
+    parser = argparse.ArgumentParser(
+        prog="jacoco-filter analyze",
+        description="Show how rule sets change the instruction coverage of reports, without writing outputs.",
+    )
+    parser.add_argument("--config", "-c", type=Path, help="Optional path to .toml config file")
+    parser.add_argument("--inputs", "-i", nargs="*", help="Glob patterns of the input XML files")
+    parser.add_argument("--exclude-paths", "-x", nargs="*", default=[], help="Glob patterns of paths to exclude")
+    parser.add_argument(
+        "--rules",
+        "-r",
+        type=Path,
+        action="append",
+        help="A candidate rules file; repeat to compare several (default: the rules and profiles of the config)",
+    )
+    parser.add_argument("--index", type=Path, help="Index file to reuse (default: <cache dir>/analyze/index.json)")
+    parser.add_argument(
+        "--cache-dir", type=str, help="Directory for cached artifacts (default: ~/.cache/jacoco-filter)"
+    )
+    parser.add_argument("--verbose", "-v", action="store_true", default=False, help="Enable verbose logging")
+
+    args = parser.parse_args(argv)
+    config = load_config(args.config) if args.config else {}
+
+    return args, config
+
+
+def evaluate_analyze_arguments(args: argparse.Namespace, config: dict) -> dict:
+    """
+    Merges the arguments of the 'analyze' command with the configuration.
+
+    Parameters:
+        args (argparse.Namespace): The parsed command-line arguments.
+        config (dict): The loaded configuration dictionary.
+    Returns:
+        dict: The inputs, exclude paths, candidate rule sets by name and the index path.
+    """
+    merged: dict = {
+        "inputs": args.inputs or config.get("inputs", []),
+        "exclude_paths": args.exclude_paths or config.get("exclude_paths", []),
+        "rule_sets": {},
+    }
+
+    cache_dir = resolve_cache_dir(args.cache_dir or config.get("cache_dir"))
+    rules_cache_dir = configured_cache_dir(args.cache_dir or config.get("cache_dir"))
+
+    if args.rules:
+        for rules_path in args.rules:
+            name = rules_path.stem if rules_path.stem not in merged["rule_sets"] else str(rules_path)
+            merged["rule_sets"][name] = load_rules_file(rules_path, rules_cache_dir)
+    else:
+        if "rules" in config:
+            merged["rule_sets"]["rules"] = load_rule_lines(config["rules"], rules_cache_dir)
+        for name, lines in config.get("profiles", {}).items():
+            merged["rule_sets"][name] = load_rule_lines(lines, rules_cache_dir)
+
+    if not merged["inputs"]:
+        logger.error("No input files provided. Use --inputs or define them in the config.")
+        sys.exit(1)
+    if not merged["rule_sets"]:
+        logger.error("No rule sets to analyze. Use --rules or define rules or profiles in the config.")
+        sys.exit(1)
+
+    merged["index"] = args.index or cache_dir / "analyze" / "index.json"
+
+    return merged
+
+
+def parse_diff_arguments(argv: list[str]) -> argparse.Namespace:
+    """
+    Parses the arguments of the 'diff' command.
+
+    Parameters:
+        argv (list[str]): The arguments following 'diff'.
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="jacoco-filter diff",
+        description="Report added, removed and changed coverage between two JaCoCo XML reports as JSON.",
+    )
+    parser.add_argument("base", type=Path, help="The baseline report (e.g. of the target branch)")
+    parser.add_argument("head", type=Path, help="The report to compare with the baseline (e.g. of the PR)")
+    parser.add_argument("--output", "-o", type=Path, help="Write the JSON diff to this file (default: stdout)")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=False,
+        help="Read both reports one package at a time to bound memory",
+    )
+    parser.add_argument("--verbose", "-v", action="store_true", default=False, help="Enable verbose logging")
+
+    return parser.parse_args(argv)
+
+
+def parse_merge_metrics_arguments(argv: list[str]) -> argparse.Namespace:
+    """
+    Parses the arguments of the 'merge-metrics' command.
+
+    Parameters:
+        argv (list[str]): The arguments following 'merge-metrics'.
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="jacoco-filter merge-metrics",
+        description="Merge the metrics files written by '--metrics' (e.g. one per shard) into one run summary.",
+    )
+    parser.add_argument("metrics", type=Path, nargs="+", help="The metrics files to merge")
+    parser.add_argument("--output", "-o", type=Path, help="Write the JSON summary to this file (default: stdout)")
+    parser.add_argument("--verbose", "-v", action="store_true", default=False, help="Enable verbose logging")
+
+    return parser.parse_args(argv)
+
+
 def evaluate_parsed_arguments(args: argparse.Namespace, config: dict) -> dict:
     """
     Evaluates the parsed command-line arguments and merges them with the configuration file if provided.
@@ -120,47 +404,217 @@ def evaluate_parsed_arguments(args: argparse.Namespace, config: dict) -> dict:
     # -----------
     # Rules
     merged["rules"] = []
+    # Compiled rules are reused from a configured cache directory while the rules are unchanged
+    cache_dir = configured_cache_dir(args.cache_dir or config.get("cache_dir"))
 
     if args.rules:
         # when rules are provided via CLI
         logger.info("   Loaded from file: %s", args.rules)
-        merged["rules"] = load_filter_rules(args.rules)
+        merged["rules"] = load_rules_file(args.rules, cache_dir)
 
     elif "rules" in config:
         # when rules are defined in the config
         logger.info("   Loaded rules from config")
-        for raw_line in config.get("rules", []):
-            stripped = raw_line.strip()
-            if stripped.startswith("#"):
-                continue
-
-            if not FilterRule.is_valid_line(stripped):
-                if stripped:
-                    logger.warning("Skipping invalid rule rule: '%s'", stripped)
-                continue
-            try:
-                merged["rules"].append(FilterRule.parse(stripped))
-            # pylint: disable=broad-except
-            except Exception as e:
-                logger.error("Failed to parse rule rule '%s': %s", stripped, e)
-
-    if len(merged["rules"]) == 0:
+        merged["rules"] = load_rule_lines(config.get("rules", []), cache_dir)
+
+    # -----------
+    # Profiles (named rule sets, each written to its own output)
+    merged["profiles"] = {name: load_rule_lines(lines, cache_dir) for name, lines in config.get("profiles", {}).items()}
+
+    if len(merged["rules"]) == 0 and not merged["profiles"]:
         logger.error("No rules provided. Use --rules or define rules in the config.")
 
     # -----------
     # Verbose logging
     merged["verbose"] = args.verbose or config.get("verbose", False)
 
+    # -----------
+    # Processing options
+    merge_processing_options(args, config, merged)
+
+    # -----------
+    # Coverage thresholds
+    merge_thresholds(config, merged)
+
     # -----------
     logger.info("Final configuration:")
     logger.info("   inputs: %s", merged["inputs"])
     logger.info("   exclude_paths: %s", merged["exclude_paths"])
     logger.info("   rules: %s", merged["rules"])
+    logger.info("   profiles: %s", list(merged["profiles"]))
     logger.info("   verbose logging: %s", merged["verbose"])
+    for key in PROCESSING_OPTIONS:
+        logger.info("   %s: %s", key, merged[key])
+    logger.info("   thresholds: %s", merged["thresholds"])
 
     return merged
 
 
+def load_rules_file(path: Path, cache_dir: Optional[Path]) -> list[FilterRule]:
+    """
+    Loads a rules file, from its compiled-rules artifact if the file is unchanged since it was saved.
+
+    Parameters:
+        path (Path): The rules file.
+        cache_dir (Optional[Path]): The cache directory of the artifacts; no artifact is used if None.
+    Returns:
+        list[FilterRule]: The parsed rules.
+    Raises:
+        ValueError: If the file contains invalid rule formats.
+    """
+    return load_compiled_rules(["file", path.read_text(encoding="utf-8")], lambda: load_filter_rules(path), cache_dir)
+
+
+def load_rule_lines(lines: Iterable[str], cache_dir: Optional[Path]) -> list[FilterRule]:
+    """
+    Parses rule lines defined in the configuration, from their compiled-rules artifact if one was saved.
+
+    Parameters:
+        lines (Iterable[str]): The raw rule lines.
+        cache_dir (Optional[Path]): The cache directory of the artifacts; no artifact is used if None.
+    Returns:
+        list[FilterRule]: The parsed rules.
+    """
+    lines = list(lines)
+    return load_compiled_rules(["config", *lines], lambda: parse_rule_lines(lines), cache_dir)
+
+
+def parse_rule_lines(lines: Iterable[str]) -> list[FilterRule]:
+    """
+    Parses rule lines defined in the configuration, skipping comments and invalid lines.
+
+    Parameters:
+        lines (Iterable[str]): The raw rule lines.
+    Returns:
+        list[FilterRule]: The parsed rules.
+    """
+    rules = []
+    for raw_line in lines:
+        stripped = raw_line.strip()
+        if stripped.startswith("#"):
+            continue
+
+        if not FilterRule.is_valid_line(stripped):
+            if stripped:
+                logger.warning("Skipping invalid rule rule: '%s'", stripped)
+            continue
+        try:
+            rules.append(FilterRule.parse(stripped))
+        # pylint: disable=broad-except
+        except Exception as e:
+            logger.error("Failed to parse rule rule '%s': %s", stripped, e)
+
+    return rules
+
+
+def merge_processing_options(args: argparse.Namespace, config: dict, merged: dict):
+    """
+    Merges the options controlling how reports are processed (engine, counters, caching, tracing) into the
+    configuration.
+
+    Parameters:
+        args (argparse.Namespace): The parsed command-line arguments.
+        config (dict): The loaded configuration dictionary.
+        merged (dict): The merged configuration to update.
+    Returns:
+        None
+    """
+    merged["engine"] = args.engine or config.get("engine", "model")
+    if merged["engine"] not in ENGINES:
+        logger.error("Unsupported engine '%s'. Use one of: %s.", merged["engine"], ", ".join(ENGINES))
+        sys.exit(1)
+
+    merged["stream"] = args.stream or config.get("stream", False)
+    merged["recount"] = args.recount or config.get("recount", False)
+    merged["prune_lines"] = args.prune_lines or config.get("prune_lines", False)
+    merged["output_profile"] = args.output_profile or config.get("output_profile", "full")
+    if merged["output_profile"] not in OUTPUT_PROFILES:
+        logger.error(
+            "Unsupported output profile '%s'. Use one of: %s.", merged["output_profile"], ", ".join(OUTPUT_PROFILES)
+        )
+        sys.exit(1)
+    merged["drop_lines"] = args.drop_lines or config.get("drop_lines", False)
+    merged["jobs"] = args.jobs or config.get("jobs", 1)
+    if not isinstance(merged["jobs"], int) or merged["jobs"] < 1:
+        logger.error("The number of jobs must be a positive integer, got '%s'.", merged["jobs"])
+        sys.exit(1)
+    merged["max_writers"] = args.max_writers or config.get("max_writers", DEFAULT_MAX_WRITERS)
+    if not isinstance(merged["max_writers"], int) or merged["max_writers"] < 1:
+        logger.error("The number of writers must be a positive integer, got '%s'.", merged["max_writers"])
+        sys.exit(1)
+
+    max_memory = args.max_memory or config.get("max_memory")
+    try:
+        merged["max_memory"] = parse_memory_size(max_memory) if max_memory is not None else None
+    except ValueError as e:
+        logger.error("%s", e)
+        sys.exit(1)
+
+    shard = args.shard or config.get("shard")
+    try:
+        merged["shard"] = parse_shard(shard) if shard is not None else None
+    except ValueError as e:
+        logger.error("%s", e)
+        sys.exit(1)
+    merged["shard_by"] = args.shard_by or config.get("shard_by", "hash")
+    if merged["shard_by"] not in SHARD_STRATEGIES:
+        logger.error(
+            "Unsupported shard strategy '%s'. Use one of: %s.", merged["shard_by"], ", ".join(SHARD_STRATEGIES)
+        )
+        sys.exit(1)
+    merged["cache_dir"] = args.cache_dir or config.get("cache_dir")
+
+    merged["huge_tree"] = args.huge_tree or config.get("huge_tree", False)
+    merged["intern_attributes"] = args.intern_attributes or config.get("intern_attributes", False)
+    merged["batch_gc"] = args.batch_gc or config.get("batch_gc", False)
+
+    merged["watch"] = args.watch or config.get("watch", False)
+    merged["watch_interval"] = args.watch_interval or config.get("watch_interval", 1.0)
+    if not isinstance(merged["watch_interval"], (int, float)) or merged["watch_interval"] <= 0:
+        logger.error("The watch interval must be a positive number of seconds, got '%s'.", merged["watch_interval"])
+        sys.exit(1)
+
+    merged["rule_stats"] = args.rule_stats or config.get("rule_stats", False)
+
+    merged["trace"] = args.trace or config.get("trace")
+    merged["trace_sample_rate"] = (
+        args.trace_sample_rate if args.trace_sample_rate is not None else config.get("trace_sample_rate", 1.0)
+    )
+    merged["metrics"] = args.metrics or config.get("metrics")
+
+
+def merge_thresholds(config: dict, merged: dict):
+    """
+    Parses the coverage thresholds of the configuration into the merged configuration.
+
+    Thresholds of counters other than INSTRUCTION are only meaningful with --recount, since the default counter
+    update zeroes those counters; they are skipped otherwise.
+
+    Parameters:
+        config (dict): The loaded configuration dictionary.
+        merged (dict): The merged configuration to update; 'recount' must already be set.
+    Returns:
+        None
+    """
+    try:
+        thresholds = parse_thresholds(config.get("thresholds", {}))
+    except ValueError as e:
+        logger.error("Invalid thresholds: %s", e)
+        sys.exit(1)
+
+    if not merged["recount"]:
+        skipped = [t for t in thresholds if t.counter_type != "INSTRUCTION"]
+        for threshold in skipped:
+            logger.warning(
+                "Skipping threshold %s.%s: only INSTRUCTION counters are recomputed without --recount.",
+                threshold.level,
+                threshold.counter_type,
+            )
+        thresholds = [t for t in thresholds if t.counter_type == "INSTRUCTION"]
+
+    merged["thresholds"] = thresholds
+
+
 def resolve_globs(patterns: Iterable[str], root_path: Path) -> list[Path]:
     """
     Resolves a list of glob patterns against a root path and returns a sorted list of file paths.
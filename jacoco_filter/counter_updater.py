@@ -3,10 +3,12 @@ This module provides functionality to update Jacoco counters in a report.
 """
 
 import logging
+from typing import Union
 
 import lxml.etree as ET
 
-from jacoco_filter.model import JacocoReport, Counter
+from jacoco_filter.model import JacocoReport, Counter, Group, iter_packages
+from jacoco_filter.tracing import TRACER
 
 
 logger = logging.getLogger(__name__)
@@ -19,10 +21,17 @@ class CounterUpdater:
 
     NON_INSTRUCTION_TYPES = {"LINE", "METHOD", "CLASS", "BRANCH", "COMPLEXITY"}
 
+    def __init__(self):
+        # Counters updated in the model whose XML attributes are not written yet
+        self.dirty: list[Counter] = []
+
     def apply(self, report: JacocoReport):
         """
         Apply the counter updates to the Jacoco report.
 
+        Counters are updated in the model first; the changed XML attributes are written in one flush at the end,
+        so the tree is only touched for counters whose values changed.
+
         Parameters:
             report (JacocoReport): The Jacoco report to update.
         Returns:
@@ -30,7 +39,7 @@ class CounterUpdater:
         """
         self._clean_non_instruction_counters(report.counters)
 
-        for package in report.packages:
+        for package in iter_packages(report):
             # Clean non-instruction counters at package level too (optional)
             self._clean_non_instruction_counters(package.counters)
 
@@ -46,38 +55,115 @@ class CounterUpdater:
                 # Aggregate instruction counters for each class from method values
                 self._aggregate_instruction_counters(cls, cls.methods)
 
+            # One pass over the classes instead of one scan per sourcefile
+            sourcefile_totals = self._instruction_totals_by_sourcefile(package.classes)
+
             for sourcefile in package.sourcefiles:
                 for counter in sourcefile.counters:
                     if counter.type == "INSTRUCTION":
-                        mis, cov = self._aggregate_instruction_counters_for_sourcefile(sourcefile.name, package.classes)
-                        counter.missed = mis
-                        counter.covered = cov
+                        self._set(counter, *sourcefile_totals.get(sourcefile.name, (0, 0)))
 
-                        if counter.xml_element is not None:
-                            counter.xml_element.set("missed", str(mis))
-                            counter.xml_element.set("covered", str(cov))
-
-            package.sourcefiles = self._remove_zero_coverage_sourcefiles(package)
+            package.sourcefiles = self._remove_zero_coverage_sourcefiles(package, sourcefile_totals)
             self._aggregate_instruction_counters(package, package.classes)
 
         for counter in report.counters:
             if counter.type == "INSTRUCTION":
-                mis, cov = self._aggregate_instruction_counters_for_report(report)
-                counter.missed = mis
-                counter.covered = cov
+                self._set(counter, *self._aggregate_instruction_counters_for_report(report))
 
-                if counter.xml_element is not None:
-                    counter.xml_element.set("missed", str(mis))
-                    counter.xml_element.set("covered", str(cov))
+        for group in report.groups:
+            self._apply_group(group)
 
         report.packages = self._remove_zero_coverage_packages(report)
+        report.groups = self._remove_zero_coverage_groups(report.groups)
+        self.flush()
+
+    def flush(self):
+        """
+        Writes the counters updated since the last flush back to their XML elements.
+
+        Returns:
+            None
+        """
+        for counter in self.dirty:
+            counter.flush()
+        self.dirty = []
 
-    def _remove_zero_coverage_packages(self, report: JacocoReport) -> list:
+    def _set(self, counter: Counter, missed: int, covered: int):
+        """
+        Updates a counter in the model and marks it for the next flush if its values changed.
+        """
+        if counter.missed == missed and counter.covered == covered:
+            return
+        counter.missed = missed
+        counter.covered = covered
+        if not counter.dirty:
+            counter.dirty = True
+            self.dirty.append(counter)
+
+    def _apply_group(self, group: Group) -> tuple[int, int]:
+        """
+        Roll up the instruction counters of a group from its packages and nested groups.
+
+        Parameters:
+            group (Group): The group, whose packages are already updated.
+        Returns:
+            tuple[int, int]: Instruction (missed, covered) of the group.
+        """
+        self._clean_non_instruction_counters(group.counters)
+
+        total_missed = 0
+        total_covered = 0
+
+        for child in group.groups:
+            missed, covered = self._apply_group(child)
+            total_missed += missed
+            total_covered += covered
+
+        for package in group.packages:
+            for clazz in package.classes:
+                for counter in clazz.counters:
+                    if counter.type == "INSTRUCTION":
+                        total_missed += counter.missed
+                        total_covered += counter.covered
+
+        for counter in group.counters:
+            if counter.type == "INSTRUCTION":
+                self._set(counter, total_missed, total_covered)
+
+        group.packages = self._remove_zero_coverage_packages(group)
+        group.groups = self._remove_zero_coverage_groups(group.groups)
+        return total_missed, total_covered
+
+    def _remove_zero_coverage_groups(self, groups: list[Group]) -> list[Group]:
+        """
+        Remove <group> elements from the XML and model if their instruction counter has 0 missed and 0 covered.
+
+        Parameters:
+            groups (list[Group]): The groups of a report or of a parent group.
+
+        Returns:
+            list[Group]: A list of groups with non-zero instruction coverage.
+        """
+        updated_groups = []
+
+        for group in groups:
+            if any(c.type == "INSTRUCTION" and c.missed == 0 and c.covered == 0 for c in group.counters):
+                if TRACER.enabled:
+                    TRACER.emit("group_removed", group=group.name, reason="zero_instruction_coverage")
+                parent = group.xml_element.getparent() if group.xml_element is not None else None
+                if parent is not None:
+                    parent.remove(group.xml_element)
+            else:
+                updated_groups.append(group)
+
+        return updated_groups
+
+    def _remove_zero_coverage_packages(self, report: Union[JacocoReport, Group]) -> list:
         """
         Remove <package> elements from the XML and model if their instruction counter has 0 missed and 0 covered.
 
         Parameters:
-            report (JacocoReport): The report containing packages.
+            report (JacocoReport): The report (or group) containing packages.
 
         Returns:
             list: A list of packages with non-zero instruction coverage.
@@ -85,24 +171,25 @@ class CounterUpdater:
         updated_packages = []
 
         for package in report.packages:
-            for counter in package.counters:
-                if counter.type == "INSTRUCTION" and counter.missed == 0 and counter.covered == 0:
-                    logger.debug("Removing package '%s' with 0 instruction coverage", package.name)
-                    if package.xml_element is not None:
-                        parent = package.xml_element.getparent()
-                        if parent is not None:
-                            parent.remove(package.xml_element)
+            if any(c.type == "INSTRUCTION" and c.missed == 0 and c.covered == 0 for c in package.counters):
+                if TRACER.enabled:
+                    TRACER.emit("package_removed", package=package.name, reason="zero_instruction_coverage")
+                if package.xml_element is not None:
+                    parent = package.xml_element.getparent()
+                    if parent is not None:
+                        parent.remove(package.xml_element)
             else:
                 updated_packages.append(package)
 
         return updated_packages
 
-    def _remove_zero_coverage_sourcefiles(self, package) -> list:
+    def _remove_zero_coverage_sourcefiles(self, package, sourcefile_totals: dict[str, tuple[int, int]]) -> list:
         """
         Remove <sourcefile> elements from the XML and model if their instruction counter has 0 missed and 0 covered.
 
         Parameters:
             package: The package object containing sourcefiles and classes.
+            sourcefile_totals (dict[str, tuple[int, int]]): Instruction totals per source file name.
 
         Returns:
             list: A list of sourcefiles with non-zero instruction coverage.
@@ -113,19 +200,20 @@ class CounterUpdater:
             remove = False
             for counter in sourcefile.counters:
                 if counter.type == "INSTRUCTION":
-                    mis, cov = self._aggregate_instruction_counters_for_sourcefile(sourcefile.name, package.classes)
-                    counter.missed = mis
-                    counter.covered = cov
-
-                    if counter.xml_element is not None:
-                        counter.xml_element.set("missed", str(mis))
-                        counter.xml_element.set("covered", str(cov))
+                    mis, cov = sourcefile_totals.get(sourcefile.name, (0, 0))
+                    self._set(counter, mis, cov)
 
                     if mis == 0 and cov == 0:
                         remove = True
 
             if remove:
-                logger.debug("Removing sourcefile '%s' with 0 instruction coverage", sourcefile.name)
+                if TRACER.enabled:
+                    TRACER.emit(
+                        "sourcefile_removed",
+                        package=package.name,
+                        sourcefile=sourcefile.name,
+                        reason="zero_instruction_coverage",
+                    )
                 if sourcefile.xml_element is not None:
                     parent = sourcefile.xml_element.getparent()
                     if parent is not None:
@@ -148,21 +236,21 @@ class CounterUpdater:
             if not skip_instruction and counter.type == "INSTRUCTION":
                 continue
 
-            counter.missed = 0
-            counter.covered = 0
-            # Update original XML as well
-            counter.xml_element.set("missed", "0")
-            counter.xml_element.set("covered", "0")
+            self._set(counter, 0, 0)
 
     def _aggregate_instruction_counters(self, parent, children: list):
         """
         Aggregate instruction counters from the children elements.
 
         Parameters:
+            parent: The Package or Class whose INSTRUCTION counter is updated.
             children (list): List of children elements (Package, Class, Method).
         Returns:
             None
         """
+        if not children:
+            return
+
         total_missed = 0
         total_covered = 0
 
@@ -172,28 +260,21 @@ class CounterUpdater:
                     total_missed += counter.missed
                     total_covered += counter.covered
 
-        # Create new Counter and XML element
-        if children and hasattr(children[0], "xml_element"):
-            parent_elem = children[0].xml_element.getparent()
-
-            if parent_elem is not None:
-                for old_counter in parent_elem.findall("counter"):
-                    if old_counter.get("type") == "INSTRUCTION":
-                        parent_elem.remove(old_counter)
-
-                new_elem = ET.Element(
-                    "counter",
-                    type="INSTRUCTION",
-                    missed=str(total_missed),
-                    covered=str(total_covered),
-                )
-                parent_elem.append(new_elem)
+        # Updated in place, so the counter keeps its position among the children of the parent element
+        for counter in parent.counters:
+            if counter.type == "INSTRUCTION":
+                self._set(counter, total_missed, total_covered)
+                return
 
-                for counter in parent.counters:
-                    if counter.type == "INSTRUCTION":
-                        counter.missed = total_missed
-                        counter.covered = total_covered
-                        counter.xml_element = new_elem
+        # No INSTRUCTION counter to update in place, add one after the existing counters
+        parent_elem = getattr(parent, "xml_element", None)
+        if parent_elem is None:
+            parent_elem = children[0].xml_element.getparent()
+        if parent_elem is not None:
+            new_elem = ET.SubElement(
+                parent_elem, "counter", type="INSTRUCTION", missed=str(total_missed), covered=str(total_covered)
+            )
+            parent.counters.append(Counter("INSTRUCTION", total_missed, total_covered, new_elem))
 
     def _aggregate_instruction_counters_for_report(self, report: JacocoReport) -> tuple:
         """
@@ -208,7 +289,7 @@ class CounterUpdater:
         total_missed = 0
         total_covered = 0
 
-        for package in report.packages:
+        for package in iter_packages(report):
             for clazz in package.classes:
                 for counter in clazz.counters:
                     if counter.type == "INSTRUCTION":
@@ -217,30 +298,21 @@ class CounterUpdater:
 
         return total_missed, total_covered
 
-    def _aggregate_instruction_counters_for_sourcefile(self, sourcefile: str, classes: list) -> tuple:
+    def _instruction_totals_by_sourcefile(self, classes: list) -> dict[str, tuple[int, int]]:
         """
-        Aggregate instruction counters for a specific source file.
+        Aggregate instruction counters of the given classes per source file in a single pass.
 
         Parameters:
-            sourcefile (str): The name of the source file.
             classes (list): List of classes to aggregate counters from.
         Returns:
-            list[Counter]: List containing a single Counter with aggregated instruction data.
+            dict[str, tuple[int, int]]: Mapping of source file name to (missed, covered).
         """
-        total_missed = 0
-        total_covered = 0
+        totals: dict[str, tuple[int, int]] = {}
 
         for clz in classes:
-            logger.debug("Processing class '%s' for source file '%s'", clz.name, sourcefile)
-            if clz.source_filename == sourcefile:
-                logger.debug("Class '%s' matches source file '%s'", clz.name, sourcefile)
-                for counter in clz.counters:
-                    if counter.type == "INSTRUCTION":
-                        total_missed += counter.missed
-                        total_covered += counter.covered
-
-        logger.debug(
-            "Aggregated counters for source file '%s': missed=%d, covered=%d", sourcefile, total_missed, total_covered
-        )
+            for counter in clz.counters:
+                if counter.type == "INSTRUCTION":
+                    missed, covered = totals.get(clz.source_filename, (0, 0))
+                    totals[clz.source_filename] = (missed + counter.missed, covered + counter.covered)
 
-        return total_missed, total_covered
+        return totals
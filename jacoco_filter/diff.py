@@ -0,0 +1,276 @@
+"""
+This module implements the 'diff' command: added, removed and changed coverage between two reports.
+
+Both reports are indexed with dictionaries keyed by package, class and method name plus descriptor, so every
+level is compared in linear time. Large reports can be streamed: packages are read one at a time from both
+inputs with iterparse and spilled to a temporary file, then read back sorted by key and merged, so only the package
+keys and one package per report are held in memory. JaCoCo writes packages in the order it analyzed them, which
+is not sorted.
+"""
+
+import logging
+import pickle
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+from lxml import etree
+
+from jacoco_filter.model import Counter, Package
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.report_input import ReportInput
+
+logger = logging.getLogger(__name__)
+
+CounterMap = dict[str, tuple[int, int]]
+LEVELS = ("packages", "classes", "methods")
+
+
+def counter_map(counters: list[Counter]) -> CounterMap:
+    """
+    Returns the (missed, covered) values of counters by type.
+    """
+    return {counter.type: (counter.missed, counter.covered) for counter in counters}
+
+
+@dataclass
+class PackageIndex:
+    """
+    Hash index of one package: its counters, and the counters of its classes and their methods.
+
+    The key is the names of the enclosing groups followed by the package name, so packages of different modules
+    of an aggregate report are kept apart. Classes are keyed by name, methods by name plus descriptor.
+    """
+
+    key: tuple[str, ...]
+    counters: CounterMap
+    classes: dict[str, tuple[CounterMap, dict[str, CounterMap]]] = field(default_factory=dict)
+
+    @classmethod
+    def from_package(cls, package: Package, groups: tuple[str, ...] = ()) -> "PackageIndex":
+        """
+        Indexes a package of the report model.
+        """
+        index = cls(groups + (package.name,), counter_map(package.counters))
+        for clazz in package.classes:
+            methods = {method.name + method.desc: counter_map(method.counters) for method in clazz.methods}
+            index.classes[clazz.name] = (counter_map(clazz.counters), methods)
+        return index
+
+    @property
+    def display_name(self) -> str:
+        """
+        The dotted package name, prefixed with the group path for packages inside groups.
+        """
+        name = self.key[-1].replace("/", ".")
+        return f"{'/'.join(self.key[:-1])}:{name}" if len(self.key) > 1 else name
+
+
+def iter_package_indexes(container, groups: tuple[str, ...] = ()) -> Iterator[PackageIndex]:
+    """
+    Indexes the packages of a report or group model, including the packages of nested groups.
+    """
+    for package in container.packages:
+        yield PackageIndex.from_package(package, groups)
+    for group in getattr(container, "groups", []):
+        yield from iter_package_indexes(group, groups + (group.name,))
+
+
+def stream_package_indexes(path: Path, report_counters: CounterMap) -> Iterator[PackageIndex]:
+    """
+    Reads a report with iterparse and indexes one package at a time, releasing it afterwards.
+
+    Parameters:
+        path (Path): The JaCoCo XML report.
+        report_counters (CounterMap): Filled with the report counters, which come after the last package.
+    Returns:
+        Iterator[PackageIndex]: The package indexes in document order.
+    """
+    with ReportInput(path) as report_input:
+        yield from _stream_package_indexes(path, report_input, report_counters)
+
+
+def _stream_package_indexes(path: Path, report_input: ReportInput, report_counters: CounterMap):
+    parser = JacocoParser(path)
+    groups: list[str] = []
+    events = etree.iterparse(report_input.reader(), events=("start", "end"), tag=("group", "package", "counter"))
+
+    for event, elem in events:
+        if elem.tag == "group":
+            if event == "start":
+                groups.append(elem.get("name") or "")
+            else:
+                groups.pop()
+            continue
+        if event == "start":
+            continue
+
+        parent = elem.getparent()
+        if elem.tag == "package":
+            yield PackageIndex.from_package(parser.build_package(elem), tuple(groups))
+            elem.clear()
+            if parent is not None:
+                parent.remove(elem)
+        elif parent is not None and parent.tag == "report":
+            report_counters.update(counter_map([Counter.from_xml(elem)]))
+
+
+class CoverageDiff:
+    """
+    CoverageDiff collects the added, removed and changed packages, classes and methods of two reports.
+    """
+
+    def __init__(self):
+        self.result: dict[str, dict[str, list]] = {
+            level: {"added": [], "removed": [], "changed": []} for level in LEVELS
+        }
+        self.report: dict = {}
+
+    def compare_report(self, base: CounterMap, head: CounterMap):
+        """
+        Records the report counters of both sides.
+        """
+        self.report = {
+            counter_type: {"base": list(base.get(counter_type, (0, 0))), "head": list(head.get(counter_type, (0, 0)))}
+            for counter_type in sorted(set(base) | set(head))
+        }
+
+    def compare_packages(self, base: Optional[PackageIndex], head: Optional[PackageIndex]):
+        """
+        Compares one package of both reports; either side is None if the package exists only on the other side.
+        """
+        if base is None:
+            if head is not None:
+                self.result["packages"]["added"].append(_entry(head.display_name, head.counters))
+            return
+        if head is None:
+            self.result["packages"]["removed"].append(_entry(base.display_name, base.counters))
+            return
+
+        name = base.display_name
+        self._compare("packages", name, base.counters, head.counters)
+
+        for class_name, (base_counters, base_methods) in base.classes.items():
+            class_display = f"{name}.{class_name.rsplit('/', 1)[-1]}"
+            head_class = head.classes.get(class_name)
+            if head_class is None:
+                self.result["classes"]["removed"].append(_entry(class_display, base_counters))
+                continue
+
+            head_counters, head_methods = head_class
+            self._compare("classes", class_display, base_counters, head_counters)
+            self._compare_methods(class_display, base_methods, head_methods)
+
+        for class_name, (head_counters, _) in head.classes.items():
+            if class_name not in base.classes:
+                self.result["classes"]["added"].append(_entry(f"{name}.{class_name.rsplit('/', 1)[-1]}", head_counters))
+
+    def _compare_methods(self, class_display: str, base: dict[str, CounterMap], head: dict[str, CounterMap]):
+        for method_key, base_counters in base.items():
+            head_counters = head.get(method_key)
+            if head_counters is None:
+                self.result["methods"]["removed"].append(_entry(f"{class_display}#{method_key}", base_counters))
+            else:
+                self._compare("methods", f"{class_display}#{method_key}", base_counters, head_counters)
+
+        for method_key, head_counters in head.items():
+            if method_key not in base:
+                self.result["methods"]["added"].append(_entry(f"{class_display}#{method_key}", head_counters))
+
+    def _compare(self, level: str, name: str, base: CounterMap, head: CounterMap):
+        changed = {
+            counter_type: {"base": list(base.get(counter_type, (0, 0))), "head": list(head.get(counter_type, (0, 0)))}
+            for counter_type in sorted(set(base) | set(head))
+            if base.get(counter_type, (0, 0)) != head.get(counter_type, (0, 0))
+        }
+        if changed:
+            self.result[level]["changed"].append({"name": name, "counters": changed})
+
+    def to_dict(self) -> dict:
+        """
+        Returns the diff as a JSON-serializable dictionary.
+        """
+        return {"report": self.report, **self.result}
+
+
+def _entry(name: str, counters: CounterMap) -> dict:
+    return {"name": name, "counters": {counter_type: list(value) for counter_type, value in counters.items()}}
+
+
+def diff_reports(base_path: Path, head_path: Path) -> dict:
+    """
+    Compares two reports held in memory.
+
+    Parameters:
+        base_path (Path): The baseline report.
+        head_path (Path): The report to compare with the baseline.
+    Returns:
+        dict: The report counters of both sides and the added, removed and changed packages, classes and methods.
+    """
+    base_report = JacocoParser(base_path).parse()
+    head_report = JacocoParser(head_path).parse()
+
+    base = {index.key: index for index in iter_package_indexes(base_report)}
+    head = {index.key: index for index in iter_package_indexes(head_report)}
+
+    diff = CoverageDiff()
+    diff.compare_report(counter_map(base_report.counters), counter_map(head_report.counters))
+    # In key order, the same as the streaming diff
+    for key in sorted(base.keys() | head.keys()):
+        diff.compare_packages(base.get(key), head.get(key))
+    return diff.to_dict()
+
+
+def diff_reports_streaming(base_path: Path, head_path: Path) -> dict:
+    """
+    Compares two reports one package at a time by merging both package sequences in sorted order.
+
+    Parameters:
+        base_path (Path): The baseline report.
+        head_path (Path): The report to compare with the baseline.
+    Returns:
+        dict: Same as diff_reports.
+    """
+    base_counters: CounterMap = {}
+    head_counters: CounterMap = {}
+
+    with tempfile.TemporaryFile() as base_spill, tempfile.TemporaryFile() as head_spill:
+        base_iter = _in_key_order(stream_package_indexes(base_path, base_counters), base_spill)
+        head_iter = _in_key_order(stream_package_indexes(head_path, head_counters), head_spill)
+
+        diff = CoverageDiff()
+        base = next(base_iter, None)
+        head = next(head_iter, None)
+        while base is not None or head is not None:
+            if head is None or (base is not None and base.key < head.key):
+                diff.compare_packages(base, None)
+                base = next(base_iter, None)
+            elif base is None or head.key < base.key:
+                diff.compare_packages(None, head)
+                head = next(head_iter, None)
+            else:
+                diff.compare_packages(base, head)
+                base = next(base_iter, None)
+                head = next(head_iter, None)
+
+    # The report counters are read after the last package
+    diff.compare_report(base_counters, head_counters)
+    return diff.to_dict()
+
+
+def _in_key_order(indexes: Iterator[PackageIndex], spill: IO[bytes]) -> Iterator[PackageIndex]:
+    """
+    Writes the package indexes of a report to a spill file and reads them back sorted by key.
+
+    Only the keys and file offsets are kept in memory. Of packages with the same key, the last one is kept, as in
+    the in-memory diff.
+    """
+    offsets: dict[tuple[str, ...], int] = {}
+    for index in indexes:
+        offsets[index.key] = spill.tell()
+        pickle.dump(index, spill, protocol=pickle.HIGHEST_PROTOCOL)
+
+    for key in sorted(offsets):
+        spill.seek(offsets[key])
+        yield pickle.load(spill)
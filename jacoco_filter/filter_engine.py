@@ -3,8 +3,11 @@ This module implements the FilterEngine class, which applies filtering rules
 """
 
 import logging
+from typing import Optional
 
-from jacoco_filter.model import JacocoReport
+from jacoco_filter.line_index import prune_removed_lines
+from jacoco_filter.model import JacocoReport, Package, iter_packages, owner_name
+from jacoco_filter.removals import RemovalRecorder
 from jacoco_filter.rules import FilterRule
 
 
@@ -16,9 +19,12 @@ class FilterEngine:
     FilterEngine applies filtering rules to a JaCoCo report.
     """
 
-    def __init__(self, rules: list[FilterRule]):
+    def __init__(self, rules: list[FilterRule], prune_lines: bool = False):
         self.rules = rules
-        self.stats = {"methods_removed": 0, "classes_removed": 0}
+        self.removals = RemovalRecorder(rules)
+        self.matcher = self.removals.matcher
+        self.prune_lines = prune_lines
+        self.stats = self.removals.stats
 
     def apply(self, report: JacocoReport):
         """
@@ -29,50 +35,117 @@ class FilterEngine:
         Returns:
             None
         """
-        for package in report.packages:
-            remaining_classes = []
+        for package in iter_packages(report):
+            self._apply_package(package)
 
-            for cls in package.classes:
-                fqcn = cls.name.replace("/", ".")
-                simple_class_name = fqcn.split(".")[-1]
-                sourcefilename = getattr(cls, "sourcefilename", cls.xml_element.get("sourcefilename", ""))
+    def _apply_package(self, package: Package):  # pylint: disable=too-many-locals
+        """
+        Apply filtering rules to the classes and methods of one package.
 
-                class_attrs = {
+        Parameters:
+            package (Package): The package to filter.
+        Returns:
+            None
+        """
+        remaining_classes = []
+        # Nested classes of the classes removed by a 'class[nested]' rule, with that rule
+        inherited: dict[int, FilterRule] = {}
+
+        for cls in package.classes:
+            fqcn = cls.name.replace("/", ".")
+            simple_class_name = fqcn.split(".")[-1]
+            sourcefilename = getattr(cls, "sourcefilename", cls.xml_element.get("sourcefilename", ""))
+
+            class_attrs = {
+                "fully_qualified_classname": fqcn,
+                "sourcefilename": sourcefilename,
+            }
+
+            # Check if class should be removed with its owner, or by class or file rule
+            rule = inherited.get(id(cls))
+            if rule is None:
+                rule = self._class_rule(cls, class_attrs)
+                if rule is not None and rule.nested:
+                    self._inherit_removal(package, cls.name, rule, inherited)
+            if rule is not None:
+                self.removals.record_class(package.name, fqcn, sourcefilename, rule)
+                package.removed_classes.append(cls)
+                parent_elem = cls.xml_element.getparent()
+                if parent_elem is not None:
+                    parent_elem.remove(cls.xml_element)
+                continue
+
+            # Process methods in class
+            remaining_methods = []
+            for method in cls.methods:
+                method_attrs = {
                     "fully_qualified_classname": fqcn,
-                    "sourcefilename": sourcefilename,
+                    "simple_class_name": simple_class_name,
+                    "method_name": method.name,
                 }
 
-                # Check if class should be removed by class or file rule
-                if self._matches(class_attrs, "class") or self._matches(class_attrs, "file"):
-                    logger.debug("Removing class due to rule: %s (%s)", fqcn, sourcefilename)
-                    self.stats["classes_removed"] += 1
-                    parent_elem = cls.xml_element.getparent()
-                    if parent_elem is not None:
-                        parent_elem.remove(cls.xml_element)
+                rule = self._method_rule(method, method_attrs)
+                if rule is not None:
+                    self.removals.record_method(fqcn, method.name, rule)
+                    cls.removed_methods.append(method)
+                    if cls.xml_element is not None and method.xml_element is not None:
+                        cls.xml_element.remove(method.xml_element)
                     continue
 
-                # Process methods in class
-                remaining_methods = []
-                for method in cls.methods:
-                    method_attrs = {
-                        "fully_qualified_classname": fqcn,
-                        "simple_class_name": simple_class_name,
-                        "method_name": method.name,
-                    }
+                remaining_methods.append(method)
+
+            cls.methods = remaining_methods
+            remaining_classes.append(cls)
+
+        package.classes = remaining_classes
+
+        if self.prune_lines:
+            prune_removed_lines(package)
+
+    def _class_rule(self, cls, class_attrs: dict) -> Optional[FilterRule]:  # pylint: disable=unused-argument
+        """
+        Find the class or file rule removing the class.
+
+        Parameters:
+            cls: The class model.
+            class_attrs (dict): Attributes of the class to match against rules.
+        Returns:
+            Optional[FilterRule]: The matching rule, or None if the class is kept.
+        """
+        return self.matcher.first_class_match(class_attrs)
+
+    @staticmethod
+    def _inherit_removal(package: Package, class_name: str, rule: FilterRule, inherited: dict[int, FilterRule]):
+        """
+        Marks the nested and synthetic classes of a removed class for removal by the same rule, looking them up in
+        the owner index of the package instead of evaluating the rules for each of them.
 
-                    if self._matches(method_attrs, "method"):
-                        logger.debug("Removing method due to rule: %s#%s", fqcn, method.name)
-                        self.stats["methods_removed"] += 1
-                        if cls.xml_element is not None and method.xml_element is not None:
-                            cls.xml_element.remove(method.xml_element)
-                        continue
+        JaCoCo lists the classes of a package sorted by name, so the nested classes follow their owner.
 
-                    remaining_methods.append(method)
+        Parameters:
+            package (Package): The package of the class.
+            class_name (str): The name of the removed class, e.g. 'com/example/Outer'.
+            rule (FilterRule): The 'class[nested]' rule removing the class.
+            inherited (dict[int, FilterRule]): The classes to remove with their owner, updated in place.
+        Returns:
+            None
+        """
+        prefix = class_name + "$"
+        for nested in package.nested.get(owner_name(class_name), ()):
+            if nested.name.startswith(prefix):
+                inherited[id(nested)] = rule
 
-                cls.methods = remaining_methods
-                remaining_classes.append(cls)
+    def _method_rule(self, method, method_attrs: dict) -> Optional[FilterRule]:  # pylint: disable=unused-argument
+        """
+        Find the method rule removing the method.
 
-            package.classes = remaining_classes
+        Parameters:
+            method: The method model.
+            method_attrs (dict): Attributes of the method to match against rules.
+        Returns:
+            Optional[FilterRule]: The matching rule, or None if the method is kept.
+        """
+        return self._find_matching_rule(method_attrs, "method")
 
     def _matches(self, target: dict, scope: str) -> bool:
         """
@@ -84,8 +157,16 @@ class FilterEngine:
         Returns:
             bool: True if any rule matches, False otherwise.
         """
-        for rule in self.rules:
-            if rule.scope == scope and rule.matches(target):
-                logger.debug("Matching rule '%s' on scope '%s' => matched", rule.pattern, scope)
-                return True
-        return False
+        return self._find_matching_rule(target, scope) is not None
+
+    def _find_matching_rule(self, target: dict, scope: str) -> Optional[FilterRule]:
+        """
+        Find the first filtering rule of the given scope that matches the target.
+
+        Parameters:
+            target (dict): Attributes of the target to match against rules.
+            scope (str): The scope to check against the rules (e.g., "class", "method", "file").
+        Returns:
+            Optional[FilterRule]: The first matching rule, or None if no rule matches.
+        """
+        return self.matcher.first_match(target, scope)
@@ -0,0 +1,182 @@
+"""
+This module implements the coverage gate: minimum coverage thresholds checked on the filtered report model.
+
+The thresholds are evaluated on the counters left by the counter updater, so the filtered reports never have to
+be read again to enforce them.
+"""
+
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from jacoco_filter.model import Counter, JacocoReport, iter_packages
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ("total", "package", "class")
+COUNTER_TYPES = ("INSTRUCTION", "BRANCH", "LINE", "COMPLEXITY", "METHOD", "CLASS")
+
+# Exit code of a run whose filtered reports violate a threshold
+GATE_EXIT_CODE = 2
+
+
+@dataclass
+class Threshold:
+    """
+    Minimum covered percentage of one counter type at one level of the report.
+    """
+
+    level: str
+    counter_type: str
+    minimum: float
+
+
+@dataclass
+class Violation:
+    """
+    A counter below its threshold.
+    """
+
+    source: str
+    level: str
+    name: str
+    counter_type: str
+    actual: float
+    minimum: float
+
+    def __str__(self) -> str:
+        subject = self.level if self.level == "total" else f"{self.level} {self.name}"
+        return f"{self.source}: {subject} {self.counter_type} {self.actual:.2f}% < {self.minimum:.2f}%"
+
+
+def parse_thresholds(config: dict) -> list[Threshold]:
+    """
+    Parses the [thresholds] table of the configuration, e.g. {"total": {"INSTRUCTION": 80}}.
+
+    Parameters:
+        config (dict): The thresholds per level, each a table of minimum percentages per counter type.
+    Returns:
+        list[Threshold]: The parsed thresholds.
+    Raises:
+        ValueError: If a level, counter type or percentage is invalid.
+    """
+    thresholds = []
+    for level, minimums in config.items():
+        if level not in LEVELS:
+            raise ValueError(f"Unsupported threshold level '{level}'. Use one of: {', '.join(LEVELS)}.")
+        if not isinstance(minimums, dict):
+            raise ValueError(f"Thresholds of level '{level}' must be a table of counter types.")
+
+        for counter_type, minimum in minimums.items():
+            counter_type = counter_type.upper()
+            if counter_type not in COUNTER_TYPES:
+                raise ValueError(f"Unsupported counter type '{counter_type}' in threshold level '{level}'.")
+            if isinstance(minimum, bool) or not isinstance(minimum, (int, float)) or not 0 <= minimum <= 100:
+                raise ValueError(f"Threshold {level}.{counter_type} must be a percentage in [0, 100].")
+            thresholds.append(Threshold(level, counter_type, float(minimum)))
+
+    return thresholds
+
+
+class CoverageGate:
+    """
+    CoverageGate checks filtered reports against the thresholds and collects the violations.
+    """
+
+    def __init__(self, thresholds: list[Threshold]):
+        self.by_level: dict[str, list[Threshold]] = {level: [] for level in LEVELS}
+        for threshold in thresholds:
+            self.by_level[threshold.level].append(threshold)
+        self.violations: list[Violation] = []
+
+    def check(self, report: JacocoReport, source: str, include_total: bool = True) -> list[Violation]:
+        """
+        Checks the counters of a filtered report, after the counter update.
+
+        Parameters:
+            report (JacocoReport): The filtered report model.
+            source (str): The name of the report in the violation list.
+            include_total (bool): Whether to check the report counters, e.g. not for a partial report.
+        Returns:
+            list[Violation]: The new violations, which are also added to self.violations.
+        """
+        found: list[Violation] = []
+
+        if include_total:
+            found.extend(self._check_counters(self.by_level["total"], report.counters, source, ""))
+
+        if self.by_level["package"] or self.by_level["class"]:
+            for package in iter_packages(report):
+                package_name = package.name.replace("/", ".")
+                found.extend(self._check_counters(self.by_level["package"], package.counters, source, package_name))
+                for cls in package.classes:
+                    found.extend(
+                        self._check_counters(self.by_level["class"], cls.counters, source, cls.name.replace("/", "."))
+                    )
+
+        self.violations.extend(found)
+        return found
+
+    def check_totals(self, totals: dict[str, list[int]], source: str) -> list[Violation]:
+        """
+        Checks report totals given as (missed, covered) per counter type, e.g. summed by the streaming processor.
+        """
+        found = []
+        for threshold in self.by_level["total"]:
+            counter = totals.get(threshold.counter_type)
+            violation = self._check(threshold, counter[0], counter[1], source, "") if counter else None
+            if violation is not None:
+                found.append(violation)
+
+        self.violations.extend(found)
+        return found
+
+    def _check_counters(
+        self, thresholds: list[Threshold], counters: list[Counter], source: str, name: str
+    ) -> list[Violation]:
+        found = []
+        for threshold in thresholds:
+            for counter in counters:
+                if counter.type == threshold.counter_type:
+                    violation = self._check(threshold, counter.missed, counter.covered, source, name)
+                    if violation is not None:
+                        found.append(violation)
+        return found
+
+    @staticmethod
+    def _check(threshold: Threshold, missed: int, covered: int, source: str, name: str) -> Optional[Violation]:
+        total = missed + covered
+        # Nothing to cover, e.g. a package left empty by the filter
+        if not total:
+            return None
+
+        actual = 100 * covered / total
+        if actual >= threshold.minimum:
+            return None
+        return Violation(source, threshold.level, name, threshold.counter_type, actual, threshold.minimum)
+
+    def report_violations(self) -> bool:
+        """
+        Logs the collected violations.
+
+        Returns:
+            bool: True if any threshold was violated.
+        """
+        if not self.violations:
+            return False
+
+        logger.error("Coverage below the configured thresholds (%s violation(s)):", len(self.violations))
+        for violation in self.violations:
+            logger.error("   %s", violation)
+        return True
+
+
+def display_path(path: Path) -> str:
+    """
+    Returns the path relative to the working directory if it is below it, to keep the violation list short.
+    """
+    try:
+        return str(path.relative_to(Path.cwd()))
+    except ValueError:
+        return str(path)
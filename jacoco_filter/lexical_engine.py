@@ -0,0 +1,348 @@
+"""
+This module implements the LexicalFilterEngine, a DOM-free fast path for rule sets with only 'file:' and
+'class:' rules.
+
+The report is memory-mapped and scanned as bytes: matching <class>...</class> blocks are cut out, the
+INSTRUCTION counters of the parent sourcefiles, packages and the report are recomputed from the surviving
+class counters and all other counters are zeroed, like in the model pipeline. The output is written as a
+sequence of slices of the input. Inputs using constructs the scanner does not handle safely raise
+UnsupportedInputError, so the caller can fall back to an lxml based engine.
+"""
+
+import logging
+import re
+from pathlib import Path
+from typing import Optional
+from xml.sax.saxutils import unescape
+
+from jacoco_filter.removals import RemovalRecorder
+from jacoco_filter.report_input import ReportInput
+from jacoco_filter.report_output import AtomicOutput
+from jacoco_filter.rules import FilterRule, ScopeEnum
+from jacoco_filter.tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+_ATTRS = rb"""(?:[^>"']|"[^"]*"|'[^']*')*"""
+_PACKAGE_START = re.compile(rb"<package\b(" + _ATTRS + rb")>")
+_CLASS_START = re.compile(rb"<class\b(" + _ATTRS + rb")>")
+_SOURCEFILE_START = re.compile(rb"<sourcefile\b(" + _ATTRS + rb")>")
+_ATTRIBUTE = re.compile(rb"""([A-Za-z_:][-\w.:]*)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_INSTRUCTION = re.compile(rb'<counter type="INSTRUCTION" missed="(\d+)" covered="(\d+)"/>')
+_NON_INSTRUCTION = re.compile(rb'<counter type="(LINE|BRANCH|METHOD|CLASS|COMPLEXITY)" missed="\d+" covered="\d+"/>')
+_ENCODING = re.compile(rb"""^<\?xml[^>]*encoding\s*=\s*["']([^"']+)["']""")
+_WHITESPACE = re.compile(rb"\s*")
+
+_UNSAFE_TOKENS = {
+    b"<!--": "comments",
+    b"<![CDATA[": "CDATA sections",
+    b"<group": "group elements",
+    b"<!ENTITY": "entity declarations",
+}
+_SAFE_ENCODINGS = {b"utf-8", b"utf8", b"us-ascii", b"ascii"}
+
+
+class UnsupportedInputError(ValueError):
+    """
+    Raised when the input or the rules cannot be processed safely by the lexical engine.
+    """
+
+
+class LexicalFilterEngine:
+    """
+    LexicalFilterEngine removes classes matched by 'file:'/'class:' rules directly on the report bytes.
+    """
+
+    def __init__(self, rules: list[FilterRule]):
+        self.rules = rules
+        self.removals = RemovalRecorder(rules)
+        self.stats = self.removals.stats
+        self._data = b""
+        self._out = _Output(b"")
+
+    @staticmethod
+    def supports(rules: list[FilterRule]) -> bool:
+        """
+        Checks if the rule set contains only 'file:' and 'class:' rules.
+        """
+        return all(rule.scope in (ScopeEnum.FILE, ScopeEnum.CLASS) for rule in rules)
+
+    def apply(self, input_path: Path, output_path: Path, report_input: Optional[ReportInput] = None) -> dict:
+        """
+        Filters the input report into the output path.
+
+        Parameters:
+            input_path (Path): The JaCoCo XML report.
+            output_path (Path): Where to write the filtered report.
+            report_input (Optional[ReportInput]): The memory-mapped input; the report is mapped if None.
+        Returns:
+            dict: The filtering statistics.
+        Raises:
+            UnsupportedInputError: If the rules or the input cannot be handled; nothing is written in that case.
+        """
+        if not self.supports(self.rules):
+            raise UnsupportedInputError("rules other than 'file:' and 'class:' are present")
+
+        if report_input is None:
+            with ReportInput(input_path) as mapped_input:
+                return self.apply(input_path, output_path, mapped_input)
+
+        if len(report_input) == 0:
+            raise UnsupportedInputError("empty input")
+
+        data = report_input.scan()
+        self._check_safe(data)
+        segments = self._filter(data)
+        with AtomicOutput(output_path) as out:
+            out.writelines(segments)
+
+        return self.stats
+
+    @staticmethod
+    def _check_safe(data):
+        """
+        Rejects inputs with constructs the scanner does not understand.
+        """
+        match = _ENCODING.match(data[:200].removeprefix(b"\xef\xbb\xbf"))
+        if match and match.group(1).lower() not in _SAFE_ENCODINGS:
+            raise UnsupportedInputError(f"encoding {match.group(1).decode('ascii', 'replace')}")
+        if data[:2] in (b"\xff\xfe", b"\xfe\xff"):
+            raise UnsupportedInputError("UTF-16 input")
+        prolog_start = 3 if data[:3] == b"\xef\xbb\xbf" else 0
+        if data.find(b"<?", prolog_start + 2) != -1:
+            raise UnsupportedInputError("processing instructions")
+
+        doctype = data.find(b"<!DOCTYPE")
+        if doctype != -1 and data.find(b"[", doctype, data.find(b">", doctype)) != -1:
+            raise UnsupportedInputError("internal DTD subset")
+
+        for token, description in _UNSAFE_TOKENS.items():
+            if data.find(token) != -1:
+                raise UnsupportedInputError(description)
+
+    def _filter(self, data) -> list:
+        """
+        Scans the report and returns the output as a list of byte segments.
+        """
+        self._data = data
+        self._out = _Output(data)
+        report_missed = report_covered = 0
+        pos = 0
+        last_end = 0
+
+        while True:
+            match = _PACKAGE_START.search(data, pos)
+            if match is None:
+                break
+
+            if match.group(1).endswith(b"/"):
+                pos = match.end()
+                continue
+
+            pkg_end = _element_end(data, match, b"</package>", len(data))
+            self._out.copy_to(match.start())
+            mark = self._out.mark()
+            pkg_name = self._attributes(match.group(1)).get("name", "")
+            missed, covered, remove = self._filter_package(match.end(), pkg_end, pkg_name)
+            report_missed += missed
+            report_covered += covered
+
+            if remove:
+                if TRACER.enabled:
+                    TRACER.emit("package_removed", package=pkg_name, reason="zero_instruction_coverage")
+                self._out.reset(mark)
+                self._out.skip_to(_skip_whitespace(data, pkg_end))
+            pos = last_end = pkg_end
+
+        self._write_instruction(last_end, len(data), report_missed, report_covered)
+        self._out.copy_to(len(data))
+        return self._out.segments
+
+    def _filter_package(self, start: int, end: int, pkg_name: str) -> tuple[int, int, bool]:
+        """
+        Filters the classes of one package and rewrites its sourcefile and package counters.
+
+        Returns:
+            tuple[int, int, bool]: Instruction (missed, covered) of the package and whether to remove it.
+        """
+        sourcefile_totals: dict[str, tuple[int, int]] = {}
+        pos = self._filter_classes(start, end, pkg_name, sourcefile_totals)
+        pos = self._update_sourcefiles(pos, end, pkg_name, sourcefile_totals)
+
+        has_classes = bool(sourcefile_totals)
+        missed = sum(m for m, _ in sourcefile_totals.values())
+        covered = sum(c for _, c in sourcefile_totals.values())
+
+        found = self._write_instruction(pos, end, missed, covered)
+        if not found and has_classes:
+            # Same as the model pipeline: a package with classes always gets an INSTRUCTION counter
+            self._insert_instruction(end - len(b"</package>"), missed, covered)
+        return missed, covered, found and missed == 0 and covered == 0
+
+    def _filter_classes(self, pos: int, end: int, pkg_name: str, sourcefile_totals: dict) -> int:
+        """
+        Cuts out matching classes and sums the INSTRUCTION counters of the others per sourcefile.
+
+        Returns:
+            int: The position after the last class.
+        """
+        data, out = self._data, self._out
+
+        while True:
+            match = _CLASS_START.search(data, pos, end)
+            if match is None:
+                return pos
+
+            cls_end = _element_end(data, match, b"</class>", end)
+            attrs = self._attributes(match.group(1))
+            sourcefilename = attrs.get("sourcefilename", "")
+
+            out.copy_to(match.start())
+            if self.removals.class_rule(pkg_name, attrs.get("name", "").replace("/", "."), sourcefilename) is not None:
+                out.skip_to(_skip_whitespace(data, cls_end))
+            else:
+                cls_missed, cls_covered = self._class_instruction(match.end(), cls_end)
+                sf_missed, sf_covered = sourcefile_totals.get(sourcefilename, (0, 0))
+                sourcefile_totals[sourcefilename] = (sf_missed + cls_missed, sf_covered + cls_covered)
+
+            pos = cls_end
+
+    def _update_sourcefiles(self, pos: int, end: int, pkg_name: str, sourcefile_totals: dict) -> int:
+        """
+        Rewrites the sourcefile INSTRUCTION counters and cuts out sourcefiles left without coverage.
+
+        Returns:
+            int: The position after the last sourcefile.
+        """
+        data, out = self._data, self._out
+
+        while True:
+            match = _SOURCEFILE_START.search(data, pos, end)
+            if match is None:
+                return pos
+
+            sf_end = _element_end(data, match, b"</sourcefile>", end)
+            name = self._attributes(match.group(1)).get("name", "")
+            missed, covered = sourcefile_totals.get(name, (0, 0))
+
+            out.copy_to(match.start())
+            mark = out.mark()
+            if self._write_instruction(match.end(), sf_end, missed, covered) and missed == 0 and covered == 0:
+                if TRACER.enabled:
+                    TRACER.emit(
+                        "sourcefile_removed", package=pkg_name, sourcefile=name, reason="zero_instruction_coverage"
+                    )
+                out.reset(mark)
+                out.skip_to(_skip_whitespace(data, sf_end))
+            pos = sf_end
+
+    def _class_instruction(self, start: int, end: int) -> tuple[int, int]:
+        """
+        Returns the INSTRUCTION totals of a surviving class; a class without methods is zeroed.
+        """
+        data = self._data
+        last_method = data.rfind(b"</method>", start, end)
+        if last_method == -1 and data.find(b"<method", start, end) == -1:
+            # Same as the model pipeline: counters of classes without methods are zeroed
+            self._write_instruction(start, end, 0, 0)
+            return 0, 0
+
+        match = _INSTRUCTION.search(data, max(start, last_method), end)
+        if match is None:
+            # Same as the model pipeline: the counter is added, but does not contribute to the parents
+            missed = covered = 0
+            for method_counter in _INSTRUCTION.finditer(data, start, end):
+                missed += int(method_counter.group(1))
+                covered += int(method_counter.group(2))
+            self._insert_instruction(end - len(b"</class>"), missed, covered)
+            return 0, 0
+        return int(match.group(1)), int(match.group(2))
+
+    def _write_instruction(self, start: int, end: int, missed: int, covered: int) -> bool:
+        """
+        Replaces the first INSTRUCTION counter in the range by the given totals.
+
+        Returns:
+            bool: True if an INSTRUCTION counter was found.
+        """
+        match = _INSTRUCTION.search(self._data, start, end)
+        if match is None:
+            return False
+        self._out.copy_to(match.start())
+        self._out.skip_to(match.end())
+        self._out.insert(_instruction_counter(missed, covered))
+        return True
+
+    def _insert_instruction(self, pos: int, missed: int, covered: int):
+        self._out.copy_to(pos)
+        self._out.insert(_instruction_counter(missed, covered))
+
+    @staticmethod
+    def _attributes(raw: bytes) -> dict[str, str]:
+        """
+        Parses and unescapes the attributes of a start tag.
+        """
+        attrs = {}
+        for match in _ATTRIBUTE.finditer(raw):
+            value = match.group(2) if match.group(2) is not None else match.group(3)
+            if b"&#" in value:
+                raise UnsupportedInputError("character references in attributes")
+            text = value.decode("utf-8")
+            if "&" in text:
+                text = unescape(text, {"&quot;": '"', "&apos;": "'"})
+            attrs[match.group(1).decode("ascii")] = text
+        return attrs
+
+
+class _Output:
+    """
+    Collects the output as slices of the input interleaved with replacement bytes. Copied slices have all
+    non-INSTRUCTION counters zeroed.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.segments: list = []
+        self.pos = 0
+
+    def copy_to(self, end: int):
+        """
+        Copies the input up to the given position, zeroing non-INSTRUCTION counters.
+        """
+        if end > self.pos:
+            segment = self.data[self.pos : end]
+            zeroed, replaced = _NON_INSTRUCTION.subn(rb'<counter type="\1" missed="0" covered="0"/>', segment)
+            if segment.count(b"<counter") != replaced + segment.count(b'<counter type="INSTRUCTION" missed="'):
+                raise UnsupportedInputError("counters with unexpected attribute layout")
+            self.segments.append(zeroed)
+            self.pos = end
+
+    def skip_to(self, end: int):
+        self.pos = max(self.pos, end)
+
+    def insert(self, chunk: bytes):
+        self.segments.append(chunk)
+
+    def mark(self) -> int:
+        return len(self.segments)
+
+    def reset(self, mark: int):
+        del self.segments[mark:]
+
+
+def _element_end(data, start_match: re.Match, end_tag: bytes, limit: int) -> int:
+    if start_match.group(1).endswith(b"/"):
+        return start_match.end()
+    end = data.find(end_tag, start_match.end(), limit)
+    if end == -1:
+        raise UnsupportedInputError(f"unterminated element {end_tag.decode('ascii')}")
+    return end + len(end_tag)
+
+
+def _skip_whitespace(data, pos: int) -> int:
+    match: Optional[re.Match] = _WHITESPACE.match(data, pos)
+    return match.end() if match else pos
+
+
+def _instruction_counter(missed: int, covered: int) -> bytes:
+    return f'<counter type="INSTRUCTION" missed="{missed}" covered="{covered}"/>'.encode("ascii")
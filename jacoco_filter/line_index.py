@@ -0,0 +1,194 @@
+"""
+This module decides which <line> entries of a sourcefile belong only to removed methods.
+
+JaCoCo reports record the first line of every method and the number of lines in its LINE counter, but not which
+lines these are. A method is taken to claim the first N lines of its sourcefile at or after its first line, N being
+its LINE total. The lines of a method with gaps (lambdas, anonymous and inner classes, field initializers in
+between) may lie past that span, so a surviving method also claims every line up to the first line of the next
+method. A line is released, i.e. pruned and no longer counted, only if a removed method claims it and no surviving
+method does; lines claimed by no method are kept. The claims err on the side of keeping lines.
+"""
+
+import logging
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from jacoco_filter.model import Class, Method, Package
+from jacoco_filter.tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+
+class SourceLines:
+    """
+    The sorted line numbers of one sourcefile.
+    """
+
+    def __init__(self, numbers: Iterable[int]):
+        self.numbers = array("i", sorted(numbers))
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def span(self, first_line: int, count: int) -> array:
+        """
+        Returns the first `count` line numbers at or after `first_line`.
+        """
+        start = bisect_left(self.numbers, first_line)
+        return self.numbers[start : start + count]
+
+    def between(self, first_line: int, end: Optional[int]) -> array:
+        """
+        Returns the line numbers from `first_line` up to, not including, `end`; up to the last line if None.
+        """
+        start = bisect_left(self.numbers, first_line)
+        return self.numbers[start : bisect_left(self.numbers, end) if end is not None else len(self.numbers)]
+
+
+def line_total(method: Method) -> Optional[int]:
+    """
+    Returns the number of lines of a method, or None if it has no LINE counter.
+    """
+    for counter in method.counters:
+        if counter.type == "LINE":
+            return counter.missed + counter.covered
+    return None
+
+
+@dataclass
+class ReleasedLines:
+    """
+    The lines owned only by removed methods, per sourcefile and per kept class with removed methods.
+    """
+
+    by_sourcefile: dict[str, set[int]] = field(default_factory=dict)
+    # By the id() of the class
+    by_class: dict[int, set[int]] = field(default_factory=dict)
+    # The released lines of each sourcefile with a covered instruction
+    covered: dict[str, set[int]] = field(default_factory=dict)
+
+    def line_counter(self, sourcefile: str, numbers: set[int]) -> tuple[int, int]:
+        """
+        Returns the LINE (missed, covered) of released lines of a sourcefile.
+        """
+        covered = len(numbers & self.covered.get(sourcefile, set()))
+        return len(numbers) - covered, covered
+
+
+def released_lines(package: Package) -> ReleasedLines:
+    """
+    Returns the lines of a filtered package owned only by its removed methods.
+
+    The result is computed from the <line> entries on the first call, before any of them is pruned, and kept on the
+    package for line pruning and the full recount.
+
+    Parameters:
+        package (Package): The package, after filtering.
+    Returns:
+        ReleasedLines: The released line numbers.
+    """
+    if package.released_lines is not None:
+        return package.released_lines
+
+    released = ReleasedLines()
+    package.released_lines = released
+
+    removed: dict[str, list[tuple[Optional[Class], Method]]] = {}
+    for cls in package.removed_classes:
+        removed.setdefault(cls.source_filename, []).extend((None, method) for method in cls.methods)
+    for cls in package.classes:
+        removed.setdefault(cls.source_filename, []).extend((cls, method) for method in cls.removed_methods)
+    if not any(removed.values()):
+        return released
+
+    surviving: dict[str, list[Method]] = {}
+    for cls in package.classes:
+        surviving.setdefault(cls.source_filename, []).extend(cls.methods)
+
+    for sourcefile in package.sourcefiles:
+        removed_methods = removed.get(sourcefile.name)
+        if not removed_methods or sourcefile.xml_element is None:
+            continue
+
+        lines, covered = _read_lines(sourcefile.xml_element)
+        claims = {id(method): _claim(lines, method) for _, method in removed_methods}
+        claimed = set().union(*claims.values())
+        if not claimed:
+            continue
+
+        kept = _surviving_claims(lines, surviving.get(sourcefile.name, []), [m for _, m in removed_methods])
+        released.by_sourcefile[sourcefile.name] = claimed - kept
+        released.covered[sourcefile.name] = released.by_sourcefile[sourcefile.name] & covered
+        for owner, method in removed_methods:
+            if owner is not None:
+                released.by_class.setdefault(id(owner), set()).update(claims[id(method)] - kept)
+
+    return released
+
+
+def _read_lines(sourcefile_elem) -> tuple[SourceLines, set[int]]:
+    """
+    Returns the line numbers of a <sourcefile> element, and those with a covered instruction.
+    """
+    numbers = []
+    covered = set()
+    for line in sourcefile_elem.iterfind("line"):
+        numbers.append(int(line.get("nr")))
+        if int(line.get("ci", 0)) > 0:
+            covered.add(numbers[-1])
+    return SourceLines(numbers), covered
+
+
+def _claim(lines: SourceLines, method: Method) -> set[int]:
+    total = line_total(method)
+    if method.line is None or not total:
+        return set()
+    return set(lines.span(int(method.line), total))
+
+
+def _surviving_claims(lines: SourceLines, surviving: list[Method], removed: list[Method]) -> set[int]:
+    """
+    Returns the lines the surviving methods may own: their spans, and every line up to the next method.
+    """
+    starts = sorted({int(method.line) for method in (*surviving, *removed) if method.line is not None})
+    kept: set[int] = set()
+    for method in surviving:
+        if method.line is None:
+            continue
+        first_line = int(method.line)
+        kept.update(_claim(lines, method))
+        position = bisect_left(starts, first_line + 1)
+        kept.update(lines.between(first_line, starts[position] if position < len(starts) else None))
+    return kept
+
+
+def prune_removed_lines(package: Package) -> int:
+    """
+    Removes the <line> elements owned only by removed methods from the sourcefiles of a filtered package.
+
+    Parameters:
+        package (Package): The filtered package.
+    Returns:
+        int: The number of removed <line> elements.
+    """
+    released = released_lines(package).by_sourcefile
+    total = 0
+
+    for sourcefile in package.sourcefiles:
+        numbers = released.get(sourcefile.name)
+        if not numbers or sourcefile.xml_element is None:
+            continue
+
+        removed = 0
+        for line_elem in sourcefile.xml_element.findall("line"):
+            if int(line_elem.get("nr")) in numbers:
+                sourcefile.xml_element.remove(line_elem)
+                removed += 1
+
+        if removed and TRACER.enabled:
+            TRACER.emit("lines_removed", package=package.name, sourcefile=sourcefile.name, count=removed)
+        total += removed
+
+    return total
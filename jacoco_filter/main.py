@@ -1,81 +1,293 @@
 """
 This module is the entry point for the jacoco-filter CLI application.
+
+Only the argument parsing is imported eagerly. The pipeline (lxml, the engines and the scheduler) and the
+'analyze' and 'diff' commands are imported once the arguments are valid, to keep the startup of '--help' and of
+runs failing on their configuration short.
 """
 
+import json
 import logging
 from pathlib import Path
 import sys
 import traceback
+from typing import Optional
 
+from jacoco_filter.cache import write_atomic
 from jacoco_filter.cli import parse_arguments, resolve_globs, apply_excludes, evaluate_parsed_arguments
+from jacoco_filter.cli import evaluate_analyze_arguments, parse_analyze_arguments, parse_diff_arguments
+from jacoco_filter.cli import parse_merge_metrics_arguments
 from jacoco_filter.logging_config import setup_logging
-from jacoco_filter.model import JacocoReport
-from jacoco_filter.parser import JacocoParser
-from jacoco_filter.filter_engine import FilterEngine
-from jacoco_filter.counter_updater import CounterUpdater
-from jacoco_filter.serializer import ReportSerializer
+from jacoco_filter.sharding import load_metrics, merge_metrics, select_shard, shard_label
+from jacoco_filter.tracing import TRACER
+
+logger = logging.getLogger(__name__)
 
 
-def main():
+def main():  # pylint: disable=too-many-locals
     """
     Main entry point for the jacoco-filter application.
 
     Returns:
         None
     """
+    if sys.argv[1:2] == ["analyze"]:
+        analyze_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["diff"]:
+        diff_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["merge-metrics"]:
+        merge_metrics_main(sys.argv[2:])
+        return
+
     try:
         parsed_args, config = parse_arguments()
         setup_logging(parsed_args.verbose or config.get("verbose", False))
-        logger = logging.getLogger(__name__)
 
         args = evaluate_parsed_arguments(parsed_args, config)
-        root_dir = Path.cwd()
 
         logger.info("jacoco-filter started")
 
-        # 1. Resolve all input globs (find files)
-        resolved_files = resolve_globs(args["inputs"], root_dir)
-
-        # 2. Apply exclude patterns
-        input_files = apply_excludes(resolved_files, args["exclude_paths"], root_dir)
-
-        if not input_files:
-            raise FileNotFoundError("No input files remain after exclusions.")
-
         logger.info("Loaded rules:")
         for rule in args["rules"]:
             logger.info("   %s:%s", rule.scope.value, rule.pattern)
 
+        TRACER.configure(args["trace"], args["trace_sample_rate"])
+
+        if args.get("watch"):
+            watch_inputs(args, Path.cwd())
+            TRACER.close()
+            return
+
+        input_files = resolve_inputs(args, Path.cwd())
+
         logger.info("Found %s input file(s) to process.", len(input_files))
         for file in input_files:
             logger.info(" - %s", file)
 
-        for file in input_files:
-            logger.info("Loading report '%s' ...", file)
+        # pylint: disable=import-outside-toplevel
+        from jacoco_filter.gate import GATE_EXIT_CODE, CoverageGate
+        from jacoco_filter.pipeline import process_inputs
+        from jacoco_filter.report_input import IO_METRICS
+        from jacoco_filter.rule_stats import RULE_STATS
+
+        gate = CoverageGate(args["thresholds"]) if args.get("thresholds") else None
+
+        stats: dict = {}
+        scheduling = process_inputs(input_files, args, gate, stats)
+
+        TRACER.close()
+
+        if RULE_STATS.enabled:
+            RULE_STATS.log_report()
+
+        if args.get("metrics"):
+            metrics = {
+                "shard": shard_label(args["shard"]) if args.get("shard") else None,
+                "files": len(input_files),
+                "stats": stats,
+                "violations": len(gate.violations) if gate is not None else 0,
+                "io": IO_METRICS.as_dict(),
+                "scheduler": scheduling,
+            }
+            if RULE_STATS.enabled:
+                metrics["rules"] = RULE_STATS.as_dict()
+            write_metrics(Path(args["metrics"]), metrics)
+
+        if gate is not None and gate.report_violations():
+            sys.exit(GATE_EXIT_CODE)
+
+        logger.info("jacoco-filter finished successfully.")
+
+    # pylint: disable=broad-except
+    except Exception as e:
+        TRACER.close()
+        logger.error("Error: %s", e)
+        traceback.print_exc()
+        sys.exit(1)
+
+
+def resolve_inputs(args: dict, root_dir: Path) -> list[Path]:
+    """
+    Resolves the input globs, applies the exclude patterns and keeps the inputs of the configured shard.
+
+    Parameters:
+        args (dict): The merged configuration.
+        root_dir (Path): The directory the globs are resolved in.
+    Returns:
+        list[Path]: The input files; empty only for an empty shard.
+    Raises:
+        FileNotFoundError: If no input files remain after exclusions.
+    """
+    # 1. Resolve all input globs (find files)
+    resolved_files = resolve_globs(args["inputs"], root_dir)
+
+    # 2. Apply exclude patterns
+    input_files = apply_excludes(resolved_files, args["exclude_paths"], root_dir)
+
+    if not input_files:
+        raise FileNotFoundError("No input files remain after exclusions.")
+
+    # 3. Keep the inputs of this shard; a shard may be empty
+    if args.get("shard"):
+        input_files = select_shard(input_files, args["shard"], root_dir, args["shard_by"])
+        logger.info("Shard %s: %s input file(s).", shard_label(args["shard"]), len(input_files))
+
+    return input_files
+
+
+def watch_inputs(args: dict, root_dir: Path, polls: Optional[int] = None):
+    """
+    Re-filters the inputs whenever they change, until interrupted.
+
+    The rules are loaded once; the coverage gate is evaluated for every batch of changed reports, but violations
+    are only reported and do not end the watch.
+
+    Parameters:
+        args (dict): The merged configuration.
+        root_dir (Path): The directory the globs are resolved in.
+        polls (Optional[int]): The number of polls; unlimited if None.
+    Returns:
+        None
+    """
+    # pylint: disable=import-outside-toplevel
+    from jacoco_filter.gate import CoverageGate
+    from jacoco_filter.pipeline import add_stats, process_inputs
+    from jacoco_filter.rule_stats import RULE_STATS
+    from jacoco_filter.watch import ReportWatcher
+
+    totals: dict = {}
+
+    def resolve() -> list[Path]:
+        try:
+            return resolve_inputs(args, root_dir)
+        except FileNotFoundError:
+            # Inputs may appear later, e.g. after the first test run
+            return []
+
+    def process(files: list[Path]):
+        gate = CoverageGate(args["thresholds"]) if args.get("thresholds") else None
+        stats: dict = {}
+        process_inputs(files, args, gate, stats)
+        add_stats(totals, stats)
+        if gate is not None:
+            gate.report_violations()
+        logger.info("Filtered %s report(s): %s", len(files), stats)
+
+    watcher = ReportWatcher(resolve, process, args["watch_interval"])
+    try:
+        watcher.run(polls)
+    except KeyboardInterrupt:
+        pass
+    logger.info("Watch stopped after %s poll(s): %s", watcher.polls, totals)
+    if RULE_STATS.enabled:
+        RULE_STATS.log_report()
 
-            parser = JacocoParser(file)
-            report: JacocoReport = parser.parse()
 
-            logger.info("Applying filters...")
-            engine = FilterEngine(args["rules"])
-            engine.apply(report)
-            logger.info(
-                "Removed %s class(es), %s method(s)",
-                engine.stats["classes_removed"],
-                engine.stats["methods_removed"],
-            )
+def write_metrics(path: Path, metrics: dict):
+    """
+    Writes the metrics of the run as JSON.
 
-            logger.info("Updating counters...")
-            updater = CounterUpdater()
-            updater.apply(report)
+    Parameters:
+        path (Path): The metrics file.
+        metrics (dict): The metrics by name.
+    Returns:
+        None
+    """
+    write_atomic(path, (json.dumps(metrics, indent=2) + "\n").encode("utf-8"))
+    logger.info("Metrics written to %s", path)
+
+
+def analyze_main(argv: list[str]):
+    """
+    Entry point of the 'analyze' command: prints the coverage before and after every candidate rule set.
+
+    Parameters:
+        argv (list[str]): The arguments following 'analyze'.
+    Returns:
+        None
+    """
+    try:
+        parsed_args, config = parse_analyze_arguments(argv)
+        setup_logging(parsed_args.verbose or config.get("verbose", False))
 
-            filtered_file = file.with_name(file.stem + ".filtered.xml")
+        args = evaluate_analyze_arguments(parsed_args, config)
+        root_dir = Path.cwd()
+
+        input_files = apply_excludes(resolve_globs(args["inputs"], root_dir), args["exclude_paths"], root_dir)
+        if not input_files:
+            raise FileNotFoundError("No input files remain after exclusions.")
+
+        # pylint: disable=import-outside-toplevel
+        from jacoco_filter.analyze import analyze, format_impact
+
+        reports = {str(path.relative_to(root_dir)): path for path in input_files}
+        before, impacts = analyze(reports, args["rule_sets"], args["index"])
+        print(format_impact(before, impacts))
+
+    # pylint: disable=broad-except
+    except Exception as e:
+        logger.error("Error: %s", e)
+        traceback.print_exc()
+        sys.exit(1)
 
-            logger.info("Saving output to %s", filtered_file)
-            serializer = ReportSerializer(report)
-            serializer.write_to_file(filtered_file)
 
-            logger.info("jacoco-filter finished successfully.")
+def diff_main(argv: list[str]):
+    """
+    Entry point of the 'diff' command: writes the coverage differences of two reports as JSON.
+
+    Parameters:
+        argv (list[str]): The arguments following 'diff'.
+    Returns:
+        None
+    """
+    try:
+        args = parse_diff_arguments(argv)
+        setup_logging(args.verbose)
+
+        # pylint: disable=import-outside-toplevel
+        from jacoco_filter.diff import diff_reports, diff_reports_streaming
+
+        if args.stream:
+            result = diff_reports_streaming(args.base, args.head)
+        else:
+            result = diff_reports(args.base, args.head)
+
+        text = json.dumps(result, indent=2)
+        if args.output:
+            write_atomic(args.output, (text + "\n").encode("utf-8"))
+            logger.info("Diff written to %s", args.output)
+        else:
+            print(text)
+
+    # pylint: disable=broad-except
+    except Exception as e:
+        logger.error("Error: %s", e)
+        traceback.print_exc()
+        sys.exit(1)
+
+
+def merge_metrics_main(argv: list[str]):
+    """
+    Entry point of the 'merge-metrics' command: merges the metrics of several runs, e.g. shards, into one summary.
+
+    Parameters:
+        argv (list[str]): The arguments following 'merge-metrics'.
+    Returns:
+        None
+    """
+    try:
+        args = parse_merge_metrics_arguments(argv)
+        setup_logging(args.verbose)
+
+        summary = merge_metrics(load_metrics(args.metrics))
+        text = json.dumps(summary, indent=2)
+        if args.output:
+            write_atomic(args.output, (text + "\n").encode("utf-8"))
+            logger.info("Summary of %s run(s) written to %s", summary["runs"], args.output)
+        else:
+            print(text)
 
     # pylint: disable=broad-except
     except Exception as e:
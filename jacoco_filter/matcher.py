@@ -0,0 +1,326 @@
+"""
+This module provides the RuleMatcher, which compiles a rule list into one regular expression per scope.
+
+Evaluating a combined expression is a single call into the regex engine per class or method, instead of one
+fnmatchcase() call per rule. The decisions are the same as matching the rules one by one.
+
+The parsed rules and their translated expressions are saved as a compiled-rules artifact in the configured cache
+directory, keyed by the hash of the rules source (a rules file or the rule lines of the configuration). Warm runs
+load the artifact instead of parsing, validating and translating the rules again; a changed source has a new key.
+The warnings logged while parsing, e.g. about skipped invalid lines, are saved with the artifact and logged again.
+"""
+
+import json
+import logging
+import re
+import time
+from fnmatch import translate
+from functools import cached_property
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from jacoco_filter.cache import content_hash, write_atomic
+from jacoco_filter.rule_stats import RULE_STATS
+from jacoco_filter.rules import FilterRule, ScopeEnum
+
+logger = logging.getLogger(__name__)
+
+# Bump when the artifact format or the translation changes, to invalidate saved artifacts.
+COMPILED_RULES_VERSION = "3"
+
+
+def translate_rule(rule: FilterRule) -> list[str]:
+    """
+    Returns the translated regular expressions of a rule.
+
+    Class and file rules have their pattern. Method rules have the method pattern, followed by the class pattern
+    and the combined 'Class#method' pattern for rules with a class part.
+    """
+    if rule.scope != ScopeEnum.METHOD:
+        return [translate(rule.pattern)]
+
+    sources = [translate(rule.target_method_pattern or "")]
+    if rule.target_class_pattern:
+        sources.append(translate(rule.target_class_pattern))
+        sources.append(translate(f"{rule.target_class_pattern}#{rule.target_method_pattern}"))
+    return sources
+
+
+def _combine(sources: list[str]) -> Optional[re.Pattern]:
+    if not sources:
+        return None
+    return re.compile("|".join(f"(?:{source})" for source in sources))
+
+
+class RuleMatcher:
+    """
+    RuleMatcher decides whether classes and methods are removed by a rule list.
+    """
+
+    def __init__(self, rules: list[FilterRule], sources: Optional[list[list[str]]] = None):
+        self.rules = rules
+        # The translated expressions of every rule, see translate_rule()
+        self.sources = sources if sources is not None else [translate_rule(rule) for rule in rules]
+        self.positions = {scope: [i for i, rule in enumerate(rules) if rule.scope == scope] for scope in ScopeEnum}
+        # Expressions of single rules, compiled when a combined expression matches
+        self._compiled: dict[int, list[re.Pattern]] = {}
+
+    # The combined expressions are compiled on first use, so loading a matcher only restores the sources
+
+    @cached_property
+    def class_regex(self) -> Optional[re.Pattern]:
+        """
+        The combined expression of the class rules.
+        """
+        return _combine([self.sources[i][0] for i in self.positions[ScopeEnum.CLASS]])
+
+    @cached_property
+    def file_regex(self) -> Optional[re.Pattern]:
+        """
+        The combined expression of the file rules.
+        """
+        return _combine([self.sources[i][0] for i in self.positions[ScopeEnum.FILE]])
+
+    @cached_property
+    def any_method_regex(self) -> Optional[re.Pattern]:
+        """
+        The combined method patterns of all method rules; every method rule needs its method pattern to match, so
+        this rejects most methods in one call.
+        """
+        return _combine([self.sources[i][0] for i in self.positions[ScopeEnum.METHOD]])
+
+    @cached_property
+    def method_regex(self) -> Optional[re.Pattern]:
+        """
+        The combined expression of the method rules without a class part.
+        """
+        return _combine([self.sources[i][0] for i in self.positions[ScopeEnum.METHOD] if len(self.sources[i]) == 1])
+
+    @cached_property
+    def qualified_regex(self) -> Optional[re.Pattern]:
+        """
+        The combined expression of the 'Class#method' rules, matched against 'fqcn#method' and 'simple#method';
+        names never contain '#'.
+        """
+        return _combine([self.sources[i][2] for i in self.positions[ScopeEnum.METHOD] if len(self.sources[i]) == 3])
+
+    def class_removed(self, fqcn: str, sourcefilename: str) -> bool:
+        """
+        Returns True if a class or file rule matches the class.
+        """
+        return bool(
+            (self.class_regex is not None and self.class_regex.match(fqcn))
+            or (self.file_regex is not None and self.file_regex.match(sourcefilename))
+        )
+
+    def method_removed(self, fqcn: str, simple_class_name: str, method_name: str) -> bool:
+        """
+        Returns True if a method rule matches the method.
+        """
+        if self.method_regex is not None and self.method_regex.match(method_name):
+            return True
+        return bool(
+            self.qualified_regex is not None
+            and (
+                self.qualified_regex.match(f"{fqcn}#{method_name}")
+                or self.qualified_regex.match(f"{simple_class_name}#{method_name}")
+            )
+        )
+
+    def first_class_match(self, target: dict) -> Optional[FilterRule]:
+        """
+        Finds the rule removing a class: the first matching class rule, else the first matching file rule.
+
+        Parameters:
+            target (dict): The 'fully_qualified_classname' and 'sourcefilename' of the class.
+        Returns:
+            Optional[FilterRule]: The first matching rule, or None if the class is kept.
+        """
+        if RULE_STATS.enabled:
+            return self._counted_match(target, (ScopeEnum.CLASS, ScopeEnum.FILE))
+        return self.first_match(target, ScopeEnum.CLASS) or self.first_match(target, ScopeEnum.FILE)
+
+    def first_match(  # pylint: disable=too-many-return-statements
+        self, target: dict, scope: str
+    ) -> Optional[FilterRule]:
+        """
+        Finds the first rule of the given scope that matches the target, in rule order.
+
+        Parameters:
+            target (dict): Attributes of the target to match against rules.
+            scope (str): The scope to check against the rules (e.g., "class", "method", "file").
+        Returns:
+            Optional[FilterRule]: The first matching rule, or None if no rule matches.
+        """
+        if RULE_STATS.enabled:
+            return self._counted_match(target, (ScopeEnum(scope),))
+        if scope == ScopeEnum.METHOD:
+            method_name = target["method_name"]
+            if self.any_method_regex is None or not self.any_method_regex.match(method_name):
+                return None
+
+            fqcn = target.get("fully_qualified_classname", "")
+            simple_class = target.get("simple_class_name", fqcn.split(".")[-1] if fqcn else "")
+            for i in self.positions[ScopeEnum.METHOD]:
+                patterns = self._patterns(i)
+                if patterns[0].match(method_name) and (
+                    len(patterns) == 1 or patterns[1].match(fqcn) or patterns[1].match(simple_class)
+                ):
+                    return self.rules[i]
+            return None
+
+        if scope == ScopeEnum.CLASS:
+            name, regex = target["fully_qualified_classname"], self.class_regex
+        else:
+            name, regex = target["sourcefilename"], self.file_regex
+        if regex is None or not regex.match(name):
+            return None
+        for i in self.positions[ScopeEnum(scope)]:
+            if self._patterns(i)[0].match(name):
+                return self.rules[i]
+        return None
+
+    def _counted_match(self, target: dict, scopes: tuple[ScopeEnum, ...]) -> Optional[FilterRule]:
+        """
+        Evaluates every rule of the scopes on its own, records the evaluations in RULE_STATS and returns the first
+        matching rule.
+        """
+        first = None
+        for scope in scopes:
+            for i in self.positions[scope]:
+                start = time.perf_counter_ns()
+                matched = self._rule_matches(i, target)
+                RULE_STATS.record(self.rules[i], matched, matched and first is None, time.perf_counter_ns() - start)
+                if matched and first is None:
+                    first = self.rules[i]
+        return first
+
+    def _rule_matches(self, position: int, target: dict) -> bool:
+        """
+        Matches a single rule against the target, with the same semantics as the combined expressions.
+        """
+        patterns = self._patterns(position)
+        scope = self.rules[position].scope
+        if scope == ScopeEnum.CLASS:
+            return bool(patterns[0].match(target["fully_qualified_classname"]))
+        if scope == ScopeEnum.FILE:
+            return bool(patterns[0].match(target["sourcefilename"]))
+
+        fqcn = target.get("fully_qualified_classname", "")
+        simple_class = target.get("simple_class_name", fqcn.split(".")[-1] if fqcn else "")
+        return bool(
+            patterns[0].match(target["method_name"])
+            and (len(patterns) == 1 or patterns[1].match(fqcn) or patterns[1].match(simple_class))
+        )
+
+    def _patterns(self, position: int) -> list[re.Pattern]:
+        patterns = self._compiled.get(position)
+        if patterns is None:
+            patterns = self._compiled[position] = [re.compile(source) for source in self.sources[position]]
+        return patterns
+
+    def to_dict(self) -> dict:
+        """
+        Returns the rules and their translated expressions as a JSON-serializable dictionary.
+        """
+        return {
+            "rules": [[rule.scope.value, rule.pattern, rule.nested] for rule in self.rules],
+            "sources": self.sources,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RuleMatcher":
+        """
+        Restores a matcher saved with to_dict(), without parsing or translating the rules again.
+        """
+        rules = [FilterRule(ScopeEnum(scope), pattern, nested) for scope, pattern, nested in data["rules"]]
+        return cls(rules, data["sources"])
+
+    def matching_positions(self, target: dict, scopes: tuple[ScopeEnum, ...]) -> list[int]:
+        """
+        Returns the positions of all rules of the given scopes matching the target, e.g. to attribute a removal.
+        """
+        return [index for index, rule in enumerate(self.rules) if rule.scope in scopes and rule.matches(target)]
+
+
+# Matchers of the rule lists of this process, by their scopes, patterns and options
+_MATCHERS: dict[tuple, RuleMatcher] = {}
+
+
+def _rules_key(rules: list[FilterRule]) -> tuple:
+    return tuple((rule.scope, rule.pattern, rule.nested) for rule in rules)
+
+
+def matcher_for(rules: list[FilterRule]) -> RuleMatcher:
+    """
+    Returns the matcher of a rule list, compiling it on first use in this process.
+    """
+    key = _rules_key(rules)
+    matcher = _MATCHERS.get(key)
+    if matcher is None:
+        matcher = _MATCHERS[key] = RuleMatcher(rules)
+    return matcher
+
+
+def load_compiled_rules(
+    source: Iterable[str], parse: Callable[[], list[FilterRule]], cache_dir: Optional[Path]
+) -> list[FilterRule]:
+    """
+    Returns the rules of a rules source, loaded from its compiled-rules artifact if one was saved.
+
+    On a miss, the rules are parsed, and the artifact is saved for the next run with the warnings logged while
+    parsing; on a hit, these warnings are logged again. The compiled matcher is kept for matcher_for() in both
+    cases.
+
+    Parameters:
+        source (Iterable[str]): The content the rules are parsed from, e.g. the text of a rules file, prefixed with
+            the kind of source; the artifact is keyed by its hash.
+        parse (Callable[[], list[FilterRule]]): Parses and validates the rules on a miss.
+        cache_dir (Optional[Path]): The cache directory; no artifact is used if None.
+    Returns:
+        list[FilterRule]: The rules.
+    """
+    key = content_hash([COMPILED_RULES_VERSION, *source])
+    artifact = cache_dir / "rules" / f"{key}.json" if cache_dir is not None else None
+
+    if artifact is not None and artifact.is_file():
+        try:
+            data = json.loads(artifact.read_bytes())
+            matcher = RuleMatcher.from_dict(data)
+            warnings = [(int(level), str(message)) for level, message in data["warnings"]]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable compiled rules %s: %s", artifact, e)
+        else:
+            logger.debug("Using compiled rules %s", artifact)
+            for level, message in warnings:
+                logger.log(level, "%s", message)
+            _MATCHERS[_rules_key(matcher.rules)] = matcher
+            return matcher.rules
+
+    # The warnings of the parser are logged as usual and collected for the artifact
+    collector = _WarningCollector()
+    package_logger = logging.getLogger(__name__.split(".", maxsplit=1)[0])
+    package_logger.addHandler(collector)
+    try:
+        rules = parse()
+    finally:
+        package_logger.removeHandler(collector)
+
+    matcher = matcher_for(rules)
+    if artifact is not None:
+        data = {**matcher.to_dict(), "warnings": collector.warnings}
+        write_atomic(artifact, json.dumps(data, separators=(",", ":")).encode("utf-8"))
+    return rules
+
+
+class _WarningCollector(logging.Handler):
+    """
+    Collects the (level, message) of the warnings and errors logged while rules are parsed.
+    """
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.warnings: list[tuple[int, str]] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.warnings.append((record.levelno, record.getMessage()))
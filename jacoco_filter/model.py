@@ -3,7 +3,7 @@ This module defines data classes to represent the structure of a JaCoCo XML repo
 """
 
 from dataclasses import dataclass, field
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
 
 @dataclass
@@ -16,6 +16,17 @@ class Counter:
     missed: int
     covered: int
     xml_element: Any
+    # Set while the values differ from the attributes of xml_element, until flush()
+    dirty: bool = field(default=False, compare=False, repr=False)
+
+    def flush(self):
+        """
+        Writes changed values back to the XML element.
+        """
+        if self.dirty and self.xml_element is not None:
+            self.xml_element.set("missed", str(self.missed))
+            self.xml_element.set("covered", str(self.covered))
+        self.dirty = False
 
     @classmethod
     def from_xml(cls, elem):
@@ -51,6 +62,8 @@ class Class:
     methods: list[Method] = field(default_factory=list)
     counters: list[Counter] = field(default_factory=list)
     xml_element: Any = None
+    # The methods removed by filtering, for line pruning and the full recount
+    removed_methods: list[Method] = field(default_factory=list)
 
 
 @dataclass
@@ -65,7 +78,7 @@ class SourceFile:
 
 
 @dataclass
-class Package:
+class Package:  # pylint: disable=too-many-instance-attributes
     """
     Represents a package in a JaCoCo report.
     """
@@ -75,6 +88,24 @@ class Package:
     sourcefiles: list[SourceFile] = field(default_factory=list)
     counters: list[Counter] = field(default_factory=list)
     xml_element: Any = None
+    # The nested and synthetic classes of the package by the name of their top-level owner, see owner_name()
+    nested: dict[str, list[Class]] = field(default_factory=dict)
+    # The classes removed by filtering, and their lines owned by no surviving method, see line_index
+    removed_classes: list[Class] = field(default_factory=list)
+    released_lines: Any = None
+
+
+@dataclass
+class Group:
+    """
+    Represents a group (e.g. a module of an aggregate report) in a JaCoCo report. Groups can be nested.
+    """
+
+    name: str
+    groups: list["Group"] = field(default_factory=list)
+    packages: list[Package] = field(default_factory=list)
+    counters: list[Counter] = field(default_factory=list)
+    xml_element: Any = None
 
 
 @dataclass
@@ -82,3 +113,34 @@ class JacocoReport:
     packages: list[Package] = field(default_factory=list)
     xml_element: Any = None
     counters: list[Counter] = field(default_factory=list)
+    groups: list[Group] = field(default_factory=list)
+
+
+def owner_name(class_name: str) -> str:
+    """
+    Returns the name of the top-level class owning a class, e.g. 'com/example/Outer' for 'com/example/Outer$Inner',
+    'com/example/Outer$' and 'com/example/Outer$$anonfun$1'; a top-level class owns itself.
+    """
+    return class_name.split("$", 1)[0]
+
+
+def iter_packages(container) -> Iterator[Package]:
+    """
+    Yields the packages of a report or group, including the packages of all nested groups.
+    """
+    yield from container.packages
+    for group in getattr(container, "groups", []):
+        yield from iter_packages(group)
+
+
+def release_report(report: JacocoReport):
+    """
+    Tears down a report model and its XML tree once the report is written, so their memory is returned right away
+    by reference counting instead of by the cyclic garbage collector.
+    """
+    if report.xml_element is not None:
+        report.xml_element.clear()
+        report.xml_element = None
+    report.packages.clear()
+    report.groups.clear()
+    report.counters.clear()
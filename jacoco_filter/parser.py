@@ -3,10 +3,13 @@ Parser for JaCoCo XML reports.
 """
 
 import logging
+import sys
 
 from pathlib import Path
-from lxml import etree
-from jacoco_filter.model import JacocoReport, Package, Class, Method, Counter, SourceFile
+from typing import Optional
+
+from jacoco_filter.model import JacocoReport, Group, Package, Class, Method, Counter, SourceFile, owner_name
+from jacoco_filter.report_input import ParserOptions, ReportInput
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +19,31 @@ class JacocoParser:
     A parser for JaCoCo XML reports.
     """
 
-    def __init__(self, input_path: Path):
+    def __init__(
+        self, input_path: Path, report_input: Optional[ReportInput] = None, options: Optional[ParserOptions] = None
+    ):
         self.input_path = input_path
+        self.report_input = report_input
+        self.options = options or ParserOptions()
+        # Applied to the repeated attribute values of the model
+        self._value = sys.intern if self.options.intern_attributes else str
+
+    def parse_tree(self):
+        """
+        Parses the JaCoCo XML report into an lxml tree without building the model.
+
+        The report is read from the shared memory-mapped input if one was given, and mapped for the parse
+        otherwise.
+
+        Returns:
+            The root <report> element.
+        """
+        logger.info("Parsing %s", self.input_path)
+
+        if self.report_input is not None:
+            return self.report_input.parse_tree(options=self.options)
+        with ReportInput(self.input_path) as report_input:
+            return report_input.parse_tree(options=self.options)
 
     def parse(self) -> JacocoReport:
         """
@@ -26,56 +52,109 @@ class JacocoParser:
         Returns:
             JacocoReport: The parsed JaCoCo report containing packages, classes, methods, and counters.
         """
-        logger.info("Parsing %s", self.input_path)
+        return self.build_report(self.parse_tree())
 
-        tree = etree.parse(str(self.input_path))
-        root = tree.getroot()
+    def build_report(self, root) -> JacocoReport:
+        """
+        Builds the report model from an already parsed <report> element.
 
+        Parameters:
+            root: The root <report> element.
+        Returns:
+            JacocoReport: The report model referencing the elements of the tree.
+        """
         report = JacocoReport(xml_element=root)
 
         for counter_elem in root.findall("counter"):
-            counter = Counter.from_xml(counter_elem)
+            counter = self._counter(counter_elem)
             report.counters.append(counter)
 
         for pkg_elem in root.findall("package"):
-            pkg = Package(xml_element=pkg_elem, name=pkg_elem.get("name") or "")
-            report.packages.append(pkg)
-
-            for sourcefile_elem in pkg_elem.findall("sourcefile"):
-                cls_sf = SourceFile(xml_element=sourcefile_elem, name=sourcefile_elem.get("name") or "")
-                pkg.sourcefiles.append(cls_sf)
-
-                for counter_elem in sourcefile_elem.findall("counter"):
-                    counter = Counter.from_xml(counter_elem)
-                    cls_sf.counters.append(counter)
-
-            for cls_elem in pkg_elem.findall("class"):
-                cls: Class = Class(
-                    xml_element=cls_elem,
-                    name=cls_elem.get("name") or "",
-                    source_filename=cls_elem.get("sourcefilename") or "",
+            report.packages.append(self.build_package(pkg_elem))
+
+        for group_elem in root.findall("group"):
+            report.groups.append(self.build_group(group_elem))
+
+        return report
+
+    def build_group(self, group_elem) -> Group:
+        """
+        Builds the model of a <group> element, including its nested groups.
+
+        Parameters:
+            group_elem: The <group> element.
+        Returns:
+            Group: The group model referencing the elements of the tree.
+        """
+        group = Group(xml_element=group_elem, name=group_elem.get("name") or "")
+
+        for child_elem in group_elem.findall("group"):
+            group.groups.append(self.build_group(child_elem))
+
+        for pkg_elem in group_elem.findall("package"):
+            group.packages.append(self.build_package(pkg_elem))
+
+        for counter_elem in group_elem.findall("counter"):
+            group.counters.append(self._counter(counter_elem))
+
+        return group
+
+    def build_package(self, pkg_elem) -> Package:
+        """
+        Builds the model of a <package> element.
+
+        Parameters:
+            pkg_elem: The <package> element.
+        Returns:
+            Package: The package model referencing the elements of the tree.
+        """
+        pkg = Package(xml_element=pkg_elem, name=pkg_elem.get("name") or "")
+
+        for sourcefile_elem in pkg_elem.findall("sourcefile"):
+            cls_sf = SourceFile(xml_element=sourcefile_elem, name=sourcefile_elem.get("name") or "")
+            pkg.sourcefiles.append(cls_sf)
+
+            for counter_elem in sourcefile_elem.findall("counter"):
+                counter = self._counter(counter_elem)
+                cls_sf.counters.append(counter)
+
+        for cls_elem in pkg_elem.findall("class"):
+            cls: Class = Class(
+                xml_element=cls_elem,
+                name=cls_elem.get("name") or "",
+                source_filename=self._value(cls_elem.get("sourcefilename") or ""),
+            )
+            pkg.classes.append(cls)
+            if "$" in cls.name:
+                pkg.nested.setdefault(owner_name(cls.name), []).append(cls)
+
+            for meth_elem in cls_elem.findall("method"):
+                meth = Method(
+                    xml_element=meth_elem,
+                    name=meth_elem.get("name") or "",
+                    desc=self._value(meth_elem.get("desc") or ""),
+                    line=meth_elem.get("line"),
                 )
-                pkg.classes.append(cls)
+                cls.methods.append(meth)
 
-                for meth_elem in cls_elem.findall("method"):
-                    meth = Method(
-                        xml_element=meth_elem,
-                        name=meth_elem.get("name") or "",
-                        desc=meth_elem.get("desc") or "",
-                        line=meth_elem.get("line"),
-                    )
-                    cls.methods.append(meth)
+                for counter_elem in meth_elem.findall("counter"):
+                    counter = self._counter(counter_elem)
+                    meth.counters.append(counter)
 
-                    for counter_elem in meth_elem.findall("counter"):
-                        counter = Counter.from_xml(counter_elem)
-                        meth.counters.append(counter)
+            for counter_elem in cls_elem.findall("counter"):
+                counter = self._counter(counter_elem)
+                cls.counters.append(counter)
 
-                for counter_elem in cls_elem.findall("counter"):
-                    counter = Counter.from_xml(counter_elem)
-                    cls.counters.append(counter)
+        for counter_elem in pkg_elem.findall("counter"):
+            counter = self._counter(counter_elem)
+            pkg.counters.append(counter)
 
-            for counter_elem in pkg_elem.findall("counter"):
-                counter = Counter.from_xml(counter_elem)
-                pkg.counters.append(counter)
+        return pkg
 
-        return report
+    def _counter(self, counter_elem) -> Counter:
+        return Counter(
+            type=self._value(counter_elem.get("type")),
+            missed=int(counter_elem.get("missed")),
+            covered=int(counter_elem.get("covered")),
+            xml_element=counter_elem,
+        )
@@ -0,0 +1,385 @@
+"""
+This module implements the processing of the input reports: scheduling, engine selection, filtering and writing.
+
+It is imported by the entry points only once the arguments are parsed, so '--help' and invalid configurations
+do not pay for loading lxml and the engines.
+"""
+
+import logging
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+from jacoco_filter.cache import resolve_cache_dir
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.gate import CoverageGate, display_path
+from jacoco_filter.gc_tuning import frozen_heap, paused_gc
+from jacoco_filter.lexical_engine import LexicalFilterEngine, UnsupportedInputError
+from jacoco_filter.logging_config import setup_logging
+from jacoco_filter.model import JacocoReport, release_report
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.profiles import process_profiles
+from jacoco_filter.recount import FullCounterUpdater
+from jacoco_filter.report_input import IO_METRICS, ParserOptions, ReportInput
+from jacoco_filter.report_output import DEFAULT_MAX_WRITERS, configure_writers
+from jacoco_filter.rule_stats import RULE_STATS
+from jacoco_filter.scheduler import Job, MemoryScheduler, plan_jobs
+from jacoco_filter.serializer import OutputOptions, ReportSerializer
+from jacoco_filter.streaming import StreamingProcessor
+from jacoco_filter.tracing import TRACER
+from jacoco_filter.tree_engine import TreeFilterEngine
+from jacoco_filter.xslt_engine import XsltFilterEngine
+
+logger = logging.getLogger(__name__)
+
+
+def process_inputs(
+    input_files: list[Path], args: dict, gate: Optional[CoverageGate] = None, stats: Optional[dict] = None
+) -> dict:
+    """
+    Processes the inputs largest first under the memory budget, in worker processes if several jobs are allowed.
+
+    Parameters:
+        input_files (list[Path]): The input reports.
+        args (dict): The merged configuration.
+        gate (Optional[CoverageGate]): Collects the threshold violations of all outputs if set.
+        stats (Optional[dict]): Collects the filtering statistics summed over all inputs if set.
+    Returns:
+        dict: The scheduling metrics.
+    """
+    if args.get("rule_stats"):
+        RULE_STATS.enabled = True
+        for rules in [args["rules"], *args.get("profiles", {}).values()]:
+            RULE_STATS.register(rules)
+
+    if not args.get("profiles"):
+        # Resolved once, so the reasons for an engine switch are logged once per run instead of once per input
+        args = {**args, "engine": select_engine(args)}
+
+    max_memory = args.get("max_memory")
+    jobs = plan_jobs(input_files, estimate_engine(args), max_memory, can_stream=not args.get("profiles"))
+
+    workers = args.get("jobs", 1)
+    if workers > 1 and TRACER.enabled:
+        logger.info("Trace events are written to one stream, processing the inputs in a single process.")
+        workers = 1
+
+    slots = writer_slots(workers, args.get("max_writers", DEFAULT_MAX_WRITERS))
+    scheduler = MemoryScheduler(max_memory, workers, init_worker, (args.get("verbose", False), slots))
+    totals = stats if stats is not None else {}
+    # The rules and the compiled matchers live for the whole run
+    with frozen_heap(args.get("batch_gc", False)):
+        if scheduler.workers == 1:
+            scheduler.run(jobs, partial(process_job, args, gate), lambda job, result: add_stats(totals, result))
+        else:
+            scheduler.run(jobs, partial(run_job, args), partial(collect_job_result, gate, totals))
+
+    return {
+        "workers": scheduler.workers,
+        "max_memory": max_memory,
+        "peak_estimated_memory": scheduler.peak_memory,
+        "streamed_files": sum(1 for job in jobs if job.stream),
+    }
+
+
+def writer_slots(workers: int, max_writers: int):
+    """
+    Returns the semaphore limiting the outputs written at the same time by the worker processes, or None if all
+    workers may write at once.
+    """
+    if workers <= max_writers:
+        return None
+    # Loading multiprocessing is left to runs with several workers
+    import multiprocessing  # pylint: disable=import-outside-toplevel
+
+    return multiprocessing.BoundedSemaphore(max_writers)
+
+
+def init_worker(verbose: bool, slots):
+    """
+    Sets up a worker process: its logging, and the writer slots shared with the other workers.
+    """
+    setup_logging(verbose)
+    configure_writers(slots)
+
+
+def estimate_engine(args: dict) -> str:
+    """
+    Returns the engine whose memory footprint applies to the inputs, 'stream' for streaming.
+    """
+    if args.get("stream"):
+        return "stream"
+    if args.get("profiles"):
+        return "model"
+    engine = select_engine(args)
+    if engine == "lexical" and not LexicalFilterEngine.supports(args["rules"]):
+        return "tree"
+    return engine
+
+
+def process_job(args: dict, gate: Optional[CoverageGate], job: Job) -> dict:
+    """
+    Processes one scheduled input, streaming it if the scheduler switched it to streaming.
+    """
+    job_args = {**args, "stream": True} if job.stream else args
+    with paused_gc(args.get("batch_gc", False)):
+        if args.get("profiles"):
+            return process_file_profiles(job.path, job_args, gate)
+        return process_file(job.path, job_args, gate)
+
+
+def run_job(args: dict, job: Job) -> dict:
+    """
+    Processes one input in a worker process.
+
+    Returns:
+        dict: The filtering statistics, the threshold violations, the I/O counters and the rule counters of the job.
+    """
+    IO_METRICS.reset()
+    RULE_STATS.reset()
+    RULE_STATS.enabled = bool(args.get("rule_stats"))
+    gate = CoverageGate(args["thresholds"]) if args.get("thresholds") else None
+    stats = process_job(args, gate, job)
+    return {
+        "stats": stats,
+        "violations": gate.violations if gate else [],
+        "io": IO_METRICS.as_dict(),
+        "rules": RULE_STATS.rules,
+    }
+
+
+def collect_job_result(gate: Optional[CoverageGate], totals: dict, job: Job, result: dict):
+    """
+    Adds the violations, statistics, I/O and rule counters of a job run in a worker process to those of the run.
+    """
+    logger.debug("Finished '%s'", job.path)
+    if gate is not None:
+        gate.violations.extend(result["violations"])
+    add_stats(totals, result["stats"])
+    IO_METRICS.add(result["io"])
+    RULE_STATS.add(result["rules"])
+
+
+def add_stats(totals: dict, stats: dict):
+    """
+    Adds the filtering statistics of one input to the totals; the statistics of profiles are summed as well.
+    """
+    for name, value in stats.items():
+        if isinstance(value, dict):
+            add_stats(totals, value)
+        else:
+            totals[name] = totals.get(name, 0) + value
+
+
+def process_file_profiles(
+    file: Path, args: dict, gate: Optional[CoverageGate] = None, report_input: Optional[ReportInput] = None
+) -> dict[str, dict]:
+    """
+    Parses a single report once and writes '<stem>.<profile>.filtered.xml' for every configured profile.
+
+    Parameters:
+        file (Path): The input JaCoCo XML report.
+        args (dict): The merged configuration.
+        gate (Optional[CoverageGate]): Checks the coverage thresholds of every output if set.
+        report_input (Optional[ReportInput]): The memory-mapped input; the report is mapped if None.
+    Returns:
+        dict[str, dict]: The filtering statistics per profile.
+    """
+    if report_input is None:
+        with ReportInput(file) as mapped_input:
+            return process_file_profiles(file, args, gate, mapped_input)
+
+    logger.info("Loading report '%s' for profiles %s ...", file, ", ".join(args["profiles"]))
+    if args.get("engine", "model") != "model" or args.get("stream"):
+        logger.info("Profiles are applied to one shared tree with the model engine.")
+
+    updater = FullCounterUpdater() if args.get("recount") else CounterUpdater()
+    return process_profiles(
+        file,
+        args["profiles"],
+        updater,
+        prune_lines(args),
+        gate,
+        output_options(args),
+        parser_options(args),
+        report_input,
+    )
+
+
+def output_options(args: dict) -> OutputOptions:
+    """
+    Returns the output options of the merged configuration.
+    """
+    return OutputOptions(args.get("output_profile", "full"), args.get("drop_lines", False))
+
+
+def prune_lines(args: dict) -> bool:
+    """
+    Returns whether the <line> entries of removed classes and methods are removed. A full recount always removes
+    them, so the recounted LINE counters match the <line> entries written.
+    """
+    return bool(args.get("prune_lines") or args.get("recount"))
+
+
+def parser_options(args: dict) -> ParserOptions:
+    """
+    Returns the XML parser settings of the merged configuration.
+    """
+    return ParserOptions(huge_tree=args.get("huge_tree", False), intern_attributes=args.get("intern_attributes", False))
+
+
+def select_engine(args: dict) -> str:  # pylint: disable=too-many-return-statements
+    """
+    Returns the configured engine, or the model engine when an option needs the report model. An engine returned
+    by select_engine is returned again without logging.
+
+    Parameters:
+        args (dict): The merged configuration.
+    Returns:
+        str: The engine to use.
+    """
+    engine = args.get("engine", "model")
+    if args.get("stream") and engine != "model":
+        logger.info("Streaming processes every unit with the model engine, using the model engine.")
+        return "model"
+    if args.get("prune_lines") and engine != "model":
+        logger.info("Line pruning is done on the report model, using the model engine.")
+        return "model"
+    if args.get("recount") and engine != "model":
+        logger.info("Full recount needs the removed methods of the report model, using the model engine.")
+        return "model"
+    if engine != "model" and any(rule.nested for rule in args.get("rules", [])):
+        logger.info("Nested classes are removed through the owner index of the report model, using the model engine.")
+        return "model"
+    if args.get("rule_stats") and engine == "xslt":
+        logger.info("Rule statistics are collected by the rule matcher, using the model engine.")
+        return "model"
+    if args.get("trace") and engine == "xslt":
+        logger.info("Trace events name the rule removing each class and method, using the model engine.")
+        return "model"
+    if args.get("thresholds") and engine in ("tree", "lexical"):
+        logger.info("Coverage thresholds are checked on the report model, using the model engine.")
+        return "model"
+    # Options needing the report model are checked first: the tree engine does not build it
+    if engine == "lexical" and (args.get("output_profile", "full") != "full" or args.get("drop_lines")):
+        logger.info(
+            "The lexical engine copies the input bytes unchanged, using the tree engine for the output profile."
+        )
+        return "tree"
+    return engine
+
+
+def process_file(
+    file: Path, args: dict, gate: Optional[CoverageGate] = None, report_input: Optional[ReportInput] = None
+) -> dict:
+    """
+    Filters a single report with the configured engine and writes '<stem>.filtered.xml' next to it.
+
+    The report is memory-mapped once; all readers of the input (including a fallback from the lexical engine)
+    share the mapping.
+
+    Parameters:
+        file (Path): The input JaCoCo XML report.
+        args (dict): The merged configuration.
+        gate (Optional[CoverageGate]): Checks the coverage thresholds of the filtered report if set.
+        report_input (Optional[ReportInput]): The memory-mapped input; the report is mapped if None.
+    Returns:
+        dict: The filtering statistics of the engine.
+    """
+    if report_input is None:
+        with ReportInput(file) as mapped_input:
+            return process_file(file, args, gate, mapped_input)
+
+    logger.info("Loading report '%s' ...", file)
+    if TRACER.enabled:
+        TRACER.bind(file=str(file))
+
+    engine = select_engine(args)
+    updater = FullCounterUpdater() if args.get("recount") else CounterUpdater()
+    filtered_file = file.with_name(file.stem + ".filtered.xml")
+
+    if args.get("stream"):
+        logger.info("Filtering (streaming) into %s", filtered_file)
+        processor = StreamingProcessor(
+            args["rules"], updater, prune_lines(args), gate, output_options(args), parser_options(args)
+        )
+        stats = processor.process(file, filtered_file, report_input)
+        logger.info("Removed %s class(es), %s method(s)", stats["classes_removed"], stats["methods_removed"])
+        return stats
+
+    if engine == "lexical":
+        if LexicalFilterEngine.supports(args["rules"]):
+            lexical_engine = LexicalFilterEngine(args["rules"])
+            try:
+                logger.info("Filtering (lexical engine) into %s", filtered_file)
+                stats = lexical_engine.apply(file, filtered_file, report_input)
+                logger.info("Removed %s class(es), %s method(s)", stats["classes_removed"], stats["methods_removed"])
+                return stats
+            except UnsupportedInputError as e:
+                logger.info("Lexical engine cannot process '%s' (%s), falling back to the tree engine.", file, e)
+        else:
+            logger.info("Lexical engine supports only 'file:' and 'class:' rules, using the tree engine.")
+        engine = "tree"
+
+    report, stats = filter_report(file, engine, args, updater, report_input)
+
+    logger.info("Removed %s class(es), %s method(s)", stats["classes_removed"], stats["methods_removed"])
+
+    if gate is not None:
+        gate.check(report, display_path(filtered_file))
+
+    logger.info("Saving output to %s", filtered_file)
+    serializer = ReportSerializer(report, output_options(args))
+    serializer.write_to_file(filtered_file)
+
+    if args.get("batch_gc"):
+        release_report(report)
+
+    return stats
+
+
+def filter_report(
+    file: Path, engine: str, args: dict, updater: CounterUpdater, report_input: Optional[ReportInput] = None
+) -> tuple[JacocoReport, dict]:
+    """
+    Parses a report and filters it in memory with the model, tree or xslt engine.
+
+    Parameters:
+        file (Path): The input JaCoCo XML report.
+        engine (str): The engine to use.
+        args (dict): The merged configuration.
+        updater (CounterUpdater): The counter updater of the model and xslt engines.
+        report_input (Optional[ReportInput]): The memory-mapped input; the report is mapped if None.
+    Returns:
+        tuple[JacocoReport, dict]: The filtered report and the filtering statistics.
+    """
+    parser = JacocoParser(file, report_input, parser_options(args))
+
+    if engine == "xslt":
+        root = parser.parse_tree()
+
+        logger.info("Applying filters (xslt engine) and updating counters...")
+        xslt_engine = XsltFilterEngine(args["rules"], resolve_cache_dir(args.get("cache_dir")), updater)
+        report = xslt_engine.apply(root)
+        stats = xslt_engine.stats
+    elif engine == "tree":
+        root = parser.parse_tree()
+
+        logger.info("Applying filters and updating counters (tree engine)...")
+        tree_engine = TreeFilterEngine(args["rules"])
+        tree_engine.apply(root)
+        stats = tree_engine.stats
+        report = JacocoReport(xml_element=root)
+    else:
+        report = parser.parse()
+
+        logger.info("Applying filters...")
+        model_engine = FilterEngine(args["rules"], prune_lines(args))
+        model_engine.apply(report)
+        stats = model_engine.stats
+
+        logger.info("Updating counters...")
+        updater.apply(report)
+
+    return report, stats
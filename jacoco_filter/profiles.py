@@ -0,0 +1,221 @@
+"""
+This module implements multi-profile filtering: several named rule sets applied to one parsed report.
+
+The input is parsed once. A combined matcher evaluates the distinct rules of all profiles once per class and
+method and stores the result as a bitmask with one bit per profile. Every profile is then applied to the
+shared tree, written out, and undone by restoring a snapshot of the child lists and counter values, so the
+tree is never deep-copied.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, Optional
+
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.gate import CoverageGate, display_path
+from jacoco_filter.model import JacocoReport, iter_packages
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.report_input import ParserOptions, ReportInput
+from jacoco_filter.rule_stats import RULE_STATS
+from jacoco_filter.rules import FilterRule, ScopeEnum
+from jacoco_filter.serializer import OutputOptions, ReportSerializer
+from jacoco_filter.tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileMatcher:
+    """
+    Evaluates the rules of all profiles at once and returns, per class or method, the bitmask of the profiles
+    removing it.
+    """
+
+    def __init__(self, profiles: dict[str, list[FilterRule]]):
+        self.bits = {name: 1 << index for index, name in enumerate(profiles)}
+        self.all_bits = (1 << len(profiles)) - 1
+
+        # Rules shared by several profiles are evaluated once
+        masks: dict[tuple[ScopeEnum, str], int] = {}
+        unique: dict[tuple[ScopeEnum, str], FilterRule] = {}
+        for name, rules in profiles.items():
+            for rule in rules:
+                key = (rule.scope, rule.pattern)
+                masks[key] = masks.get(key, 0) | self.bits[name]
+                unique.setdefault(key, rule)
+
+        self.class_rules = [(unique[k], m) for k, m in masks.items() if k[0] in (ScopeEnum.CLASS, ScopeEnum.FILE)]
+        self.method_rules = [(unique[k], m) for k, m in masks.items() if k[0] == ScopeEnum.METHOD]
+
+    def class_mask(self, class_attrs: dict) -> int:
+        """
+        Returns the bitmask of the profiles whose class or file rules match the class.
+        """
+        return self._mask(self.class_rules, class_attrs)
+
+    def method_mask(self, method_attrs: dict) -> int:
+        """
+        Returns the bitmask of the profiles whose method rules match the method.
+        """
+        return self._mask(self.method_rules, method_attrs)
+
+    def _mask(self, rules: list[tuple[FilterRule, int]], target: dict) -> int:
+        mask = 0
+        for rule, rule_mask in rules:
+            if rule_mask & ~mask and rule.matches(target):
+                mask |= rule_mask
+                if mask == self.all_bits:
+                    break
+        return mask
+
+    def evaluate(self, report: JacocoReport) -> dict[Any, int]:
+        """
+        Computes the bitmask of every class and method of the report.
+
+        Parameters:
+            report (JacocoReport): The unfiltered report.
+        Returns:
+            dict[Any, int]: The non-zero bitmasks, keyed by the <class>/<method> element.
+        """
+        masks: dict[Any, int] = {}
+
+        for package in iter_packages(report):
+            for cls in package.classes:
+                fqcn = cls.name.replace("/", ".")
+                class_mask = self.class_mask({"fully_qualified_classname": fqcn, "sourcefilename": cls.source_filename})
+                if class_mask:
+                    masks[cls.xml_element] = class_mask
+                if class_mask == self.all_bits:
+                    continue
+
+                simple_class_name = fqcn.split(".")[-1]
+                for method in cls.methods:
+                    method_mask = self.method_mask(
+                        {
+                            "fully_qualified_classname": fqcn,
+                            "simple_class_name": simple_class_name,
+                            "method_name": method.name,
+                        }
+                    )
+                    if method_mask:
+                        masks[method.xml_element] = method_mask
+
+        return masks
+
+
+class ProfileFilterEngine(FilterEngine):
+    """
+    ProfileFilterEngine removes the classes and methods whose precomputed bitmask includes its profile.
+    """
+
+    def __init__(self, rules: list[FilterRule], masks: dict[Any, int], bit: int, prune_lines: bool = False):
+        super().__init__(rules, prune_lines)
+        self.masks = masks
+        self.bit = bit
+
+    def _class_rule(self, cls, class_attrs: dict) -> Optional[FilterRule]:
+        # Only removed classes are matched again, to report the rule; with rule statistics every class is, so the
+        # evaluations are counted as by a separate run of the profile
+        if not RULE_STATS.enabled and not self.masks.get(cls.xml_element, 0) & self.bit:
+            return None
+        return super()._class_rule(cls, class_attrs)
+
+    def _method_rule(self, method, method_attrs: dict) -> Optional[FilterRule]:
+        if not RULE_STATS.enabled and not self.masks.get(method.xml_element, 0) & self.bit:
+            return None
+        return super()._method_rule(method, method_attrs)
+
+
+class TreeSnapshot:
+    """
+    Records the child lists and counter values of a tree, to undo filtering and counter updates.
+    """
+
+    def __init__(self, root, include_sourcefiles: bool = False):
+        # The children of sourcefiles are only removed by line pruning and the output options; skip the (large)
+        # sourcefile child lists otherwise
+        self.children = [
+            (elem, list(elem))
+            for elem in root.iter()
+            if len(elem) and (include_sourcefiles or elem.tag != "sourcefile")
+        ]
+        self.counters = [(elem, elem.get("missed"), elem.get("covered")) for elem in root.iter("counter")]
+
+    def restore(self):
+        """
+        Restores the recorded child lists and counter values.
+        """
+        for elem, children in self.children:
+            elem[:] = children
+        for elem, missed, covered in self.counters:
+            elem.set("missed", missed)
+            elem.set("covered", covered)
+
+
+def profile_output_path(file: Path, profile: str) -> Path:
+    """
+    Returns the output path of a profile, '<stem>.<profile>.filtered.xml' next to the input.
+    """
+    return file.with_name(f"{file.stem}.{profile}.filtered.xml")
+
+
+def process_profiles(  # pylint: disable=too-many-arguments,too-many-locals
+    file: Path,
+    profiles: dict[str, list[FilterRule]],
+    updater: Optional[CounterUpdater] = None,
+    prune_lines: bool = False,
+    gate: Optional[CoverageGate] = None,
+    output: Optional[OutputOptions] = None,
+    parser_options: Optional[ParserOptions] = None,
+    report_input: Optional[ReportInput] = None,
+) -> dict[str, dict]:
+    """
+    Parses a report once and writes one filtered report per profile.
+
+    Parameters:
+        file (Path): The input JaCoCo XML report.
+        profiles (dict[str, list[FilterRule]]): The rules per profile name.
+        updater (Optional[CounterUpdater]): The counter updater; CounterUpdater if None.
+        prune_lines (bool): Whether to remove the lines of removed classes and methods.
+        gate (Optional[CoverageGate]): Checks the thresholds of every profile output if set.
+        output (Optional[OutputOptions]): What is written to the outputs; the full profile if None.
+        parser_options (Optional[ParserOptions]): The XML parser settings; the defaults if None.
+        report_input (Optional[ReportInput]): The memory-mapped input; the report is read from the path if None.
+    Returns:
+        dict[str, dict]: The filtering statistics per profile.
+    """
+    updater = updater or CounterUpdater()
+    parser = JacocoParser(file, report_input, parser_options)
+    root = parser.parse_tree()
+
+    output = output or OutputOptions()
+    # Lines removed by pruning, and lines or zero counters left out of the output, are restored for the next profile
+    snapshot = TreeSnapshot(root, include_sourcefiles=prune_lines or output.slim or output.drop_lines)
+    matcher = ProfileMatcher(profiles)
+    masks = matcher.evaluate(parser.build_report(root))
+
+    stats: dict[str, dict] = {}
+    for name, rules in profiles.items():
+        if stats:
+            # Undo the previous profile
+            snapshot.restore()
+        if TRACER.enabled:
+            TRACER.bind(file=str(file), profile=name)
+
+        report = parser.build_report(root)
+        engine = ProfileFilterEngine(rules, masks, matcher.bits[name], prune_lines)
+        engine.apply(report)
+        updater.apply(report)
+
+        stats[name] = engine.stats
+        logger.info(
+            "Profile '%s': removed %s class(es), %s method(s)",
+            name,
+            engine.stats["classes_removed"],
+            engine.stats["methods_removed"],
+        )
+        if gate is not None:
+            gate.check(report, display_path(profile_output_path(file, name)))
+        ReportSerializer(report, output).write_to_file(profile_output_path(file, name))
+
+    return stats
@@ -0,0 +1,178 @@
+"""
+This module provides the full recount of all counter types (opt-in alternative to CounterUpdater).
+
+JaCoCo reports keep exact per-method counters and the per-line data of every sourcefile. After filtering, the
+counters of classes, sourcefiles, packages and the report are rebuilt from the surviving methods: INSTRUCTION,
+BRANCH, COMPLEXITY and METHOD are sums and CLASS is derived from the covered methods. LINE starts from the original
+counter of a class or sourcefile and loses only the lines owned solely by removed methods, see line_index, so an
+unfiltered report keeps its exact LINE counters.
+"""
+
+import logging
+
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.line_index import ReleasedLines, released_lines
+from jacoco_filter.model import Class, Counter, Group, JacocoReport, Package
+
+logger = logging.getLogger(__name__)
+
+COUNTER_TYPES = ("INSTRUCTION", "BRANCH", "LINE", "COMPLEXITY", "METHOD", "CLASS")
+
+# Counter types of a class that are plain sums of its method counters
+_SUMMED_TYPES = ("INSTRUCTION", "BRANCH", "COMPLEXITY", "METHOD")
+
+
+class FullCounterUpdater(CounterUpdater):
+    """
+    FullCounterUpdater rebuilds every counter type at every level from the surviving methods and lines.
+
+    Method counters are exact in the JaCoCo report and are kept. Classes without removed methods keep their LINE
+    counter; the others lose the lines owned only by their removed methods.
+    """
+
+    def apply(self, report: JacocoReport):
+        """
+        Recount all counters of the report.
+
+        Parameters:
+            report (JacocoReport): The filtered Jacoco report to update.
+        Returns:
+            None
+        """
+        report_totals = _empty_totals()
+
+        for package in report.packages:
+            _add(report_totals, self._recount_package(package))
+
+        for group in report.groups:
+            _add(report_totals, self._recount_group(group))
+
+        self._set_counters(report.counters, report_totals)
+        report.packages = self._remove_zero_coverage_packages(report)
+        report.groups = self._remove_zero_coverage_groups(report.groups)
+        self.flush()
+
+    def _recount_group(self, group: Group) -> dict[str, list[int]]:
+        """
+        Recount the packages and nested groups of a group and the group itself.
+
+        Returns:
+            dict[str, list[int]]: The group totals per counter type.
+        """
+        group_totals = _empty_totals()
+
+        for child in group.groups:
+            _add(group_totals, self._recount_group(child))
+
+        for package in group.packages:
+            _add(group_totals, self._recount_package(package))
+
+        self._set_counters(group.counters, group_totals)
+        group.packages = self._remove_zero_coverage_packages(group)
+        group.groups = self._remove_zero_coverage_groups(group.groups)
+        return group_totals
+
+    def _recount_package(self, package: Package) -> dict[str, list[int]]:
+        """
+        Recount the classes and sourcefiles of a package and the package itself.
+
+        Returns:
+            dict[str, list[int]]: The package totals per counter type.
+        """
+        released = released_lines(package)
+        with_lines = {sf.name for sf in package.sourcefiles if sf.xml_element is not None}
+        sourcefile_totals: dict[str, dict[str, list[int]]] = {}
+        pkg_totals = _empty_totals()
+
+        for cls in package.classes:
+            cls_totals = self._count_class(cls, released, cls.source_filename in with_lines)
+            self._set_counters(cls.counters, cls_totals)
+
+            if cls.source_filename not in with_lines:
+                # Same as JaCoCo: classes without a sourcefile are counted in the package directly
+                _add(pkg_totals, cls_totals)
+                continue
+
+            _add(sourcefile_totals.setdefault(cls.source_filename, _empty_totals()), cls_totals)
+
+        for sourcefile in package.sourcefiles:
+            if sourcefile.name not in sourcefile_totals:
+                # No class left: the sourcefile is removed below with all of its lines, owned by a method or not
+                self._set_counters(sourcefile.counters, _empty_totals())
+                continue
+            sf_totals = sourcefile_totals[sourcefile.name]
+            missed, covered = _original(sourcefile.counters, "LINE")
+            released_missed, released_covered = released.line_counter(
+                sourcefile.name, released.by_sourcefile.get(sourcefile.name, set())
+            )
+            sf_totals["LINE"] = [missed - released_missed, covered - released_covered]
+            self._set_counters(sourcefile.counters, sf_totals)
+            _add(pkg_totals, sf_totals)
+
+        instruction_totals = {
+            name: (totals["INSTRUCTION"][0], totals["INSTRUCTION"][1]) for name, totals in sourcefile_totals.items()
+        }
+        package.sourcefiles = self._remove_zero_coverage_sourcefiles(package, instruction_totals)
+        self._set_counters(package.counters, pkg_totals)
+        return pkg_totals
+
+    @staticmethod
+    def _count_class(clazz: Class, released: ReleasedLines, has_lines: bool) -> dict[str, list[int]]:
+        """
+        Sum the method counters of a class and take the lines owned only by its removed methods from its LINE.
+
+        Returns:
+            dict[str, list[int]]: The class totals per counter type.
+        """
+        totals = _empty_totals()
+        method_lines = [0, 0]
+
+        for method in clazz.methods:
+            for counter in method.counters:
+                if counter.type in _SUMMED_TYPES:
+                    totals[counter.type][0] += counter.missed
+                    totals[counter.type][1] += counter.covered
+                elif counter.type == "LINE":
+                    method_lines[0] += counter.missed
+                    method_lines[1] += counter.covered
+
+        if not clazz.removed_methods:
+            totals["LINE"] = list(_original(clazz.counters, "LINE"))
+        elif not clazz.methods:
+            totals["LINE"] = [0, 0]
+        elif has_lines:
+            missed, covered = _original(clazz.counters, "LINE")
+            released_missed, released_covered = released.line_counter(
+                clazz.source_filename, released.by_class.get(id(clazz), set())
+            )
+            totals["LINE"] = [missed - released_missed, covered - released_covered]
+        else:
+            # Without line data, lines shared by methods cannot be told apart
+            totals["LINE"] = method_lines
+
+        if clazz.methods or clazz.removed_methods:
+            totals["CLASS"] = [0, 1] if totals["METHOD"][1] else [1, 0]
+        else:
+            totals["CLASS"] = list(_original(clazz.counters, "CLASS"))
+        return totals
+
+    def _set_counters(self, counters: list[Counter], totals: dict[str, list[int]]):
+        for counter in counters:
+            self._set(counter, *totals.get(counter.type, (0, 0)))
+
+
+def _original(counters: list[Counter], counter_type: str) -> tuple[int, int]:
+    for counter in counters:
+        if counter.type == counter_type:
+            return counter.missed, counter.covered
+    return 0, 0
+
+
+def _empty_totals() -> dict[str, list[int]]:
+    return {counter_type: [0, 0] for counter_type in COUNTER_TYPES}
+
+
+def _add(totals: dict[str, list[int]], other: dict[str, list[int]]):
+    for counter_type, (missed, covered) in other.items():
+        totals[counter_type][0] += missed
+        totals[counter_type][1] += covered
@@ -0,0 +1,75 @@
+"""
+This module implements the RemovalRecorder, which matches classes and methods against the rules of an engine and
+records their removal.
+
+Every engine counts its removals in the same statistics and emits the same trace events, whether it filters the
+report model, the lxml tree or the raw bytes of a report.
+"""
+
+import logging
+from typing import Optional
+
+from jacoco_filter.matcher import matcher_for
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+
+class RemovalRecorder:
+    """
+    RemovalRecorder finds the rules removing classes and methods and counts the removals.
+    """
+
+    def __init__(self, rules: list[FilterRule]):
+        self.matcher = matcher_for(rules)
+        self.stats = {"methods_removed": 0, "classes_removed": 0}
+
+    def class_rule(self, package: str, fqcn: str, sourcefilename: str) -> Optional[FilterRule]:
+        """
+        Finds the class or file rule removing a class and records the removal.
+
+        Parameters:
+            package (str): The name of the package of the class.
+            fqcn (str): The fully qualified, dotted name of the class.
+            sourcefilename (str): The name of the sourcefile of the class.
+        Returns:
+            Optional[FilterRule]: The matching rule, or None if the class is kept.
+        """
+        rule = self.matcher.first_class_match({"fully_qualified_classname": fqcn, "sourcefilename": sourcefilename})
+        if rule is not None:
+            self.record_class(package, fqcn, sourcefilename, rule)
+        return rule
+
+    def method_rule(self, fqcn: str, simple_class_name: str, method_name: str) -> Optional[FilterRule]:
+        """
+        Finds the method rule removing a method and records the removal.
+
+        Parameters:
+            fqcn (str): The fully qualified, dotted name of the class.
+            simple_class_name (str): The name of the class without its package.
+            method_name (str): The name of the method.
+        Returns:
+            Optional[FilterRule]: The matching rule, or None if the method is kept.
+        """
+        target = {"fully_qualified_classname": fqcn, "simple_class_name": simple_class_name, "method_name": method_name}
+        rule = self.matcher.first_match(target, "method")
+        if rule is not None:
+            self.record_method(fqcn, method_name, rule)
+        return rule
+
+    def record_class(self, package: str, fqcn: str, sourcefilename: str, rule: FilterRule):
+        """
+        Counts and traces the removal of a class by a rule.
+        """
+        if TRACER.enabled:
+            TRACER.emit("class_removed", package=package, class_name=fqcn, sourcefile=sourcefilename, rule=rule.text)
+        self.stats["classes_removed"] += 1
+
+    def record_method(self, fqcn: str, method_name: str, rule: FilterRule):
+        """
+        Counts and traces the removal of a method by a rule.
+        """
+        if TRACER.enabled:
+            TRACER.emit("method_removed", class_name=fqcn, method=method_name, rule=rule.text)
+        self.stats["methods_removed"] += 1
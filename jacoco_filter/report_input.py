@@ -0,0 +1,215 @@
+"""
+This module provides the input layer for reports: every report is memory-mapped once per run.
+
+The mapped buffer is shared by all consumers of a report: content hashing, the lxml feed parser (fed in
+chunks, so the file is never copied into one bytes object), iterparse-based readers and the lexical engine. The
+bytes each consumer takes from the buffer are counted in IO_METRICS.
+
+The XML parser is configured by ParserOptions and created once per process (i.e. per worker) and options. DTD
+loading, entity resolution and network access are always off: every JaCoCo report declares 'report.dtd', which
+is neither needed nor available offline.
+"""
+
+import hashlib
+import logging
+import mmap
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Size of the chunks fed to the XML parser
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class ParserOptions:
+    """
+    Settings of the XML parser of the reports.
+
+    remove_blank_text drops the whitespace-only text nodes of indented reports, which would otherwise be carried
+    through every phase. huge_tree lifts the libxml2 limits on the depth and the text size of a document, for very
+    large reports. intern_attributes shares one string object per distinct repeated attribute value (counter types,
+    method descriptors, source file names) in the report model.
+    """
+
+    remove_blank_text: bool = True
+    huge_tree: bool = False
+    intern_attributes: bool = False
+
+    def settings(self) -> dict[str, Any]:
+        """
+        Returns the keyword arguments of etree.XMLParser and etree.iterparse for these options.
+        """
+        return {
+            "load_dtd": False,
+            "dtd_validation": False,
+            "resolve_entities": False,
+            "no_network": True,
+            "remove_blank_text": self.remove_blank_text,
+            "huge_tree": self.huge_tree,
+        }
+
+
+# One parser per options, reused for every report of the process
+_PARSERS: dict[ParserOptions, etree.XMLParser] = {}
+
+
+def get_parser(options: Optional[ParserOptions] = None) -> etree.XMLParser:
+    """
+    Returns the reusable XML parser of the options; the default options if None.
+    """
+    options = options or ParserOptions()
+    parser = _PARSERS.get(options)
+    if parser is None:
+        parser = _PARSERS[options] = etree.XMLParser(**options.settings())
+    return parser
+
+
+class IOMetrics:  # pylint: disable=too-many-instance-attributes
+    """
+    Counters of the report input and output of a run.
+    """
+
+    def __init__(self):
+        self.files_mapped = 0
+        self.bytes_mapped = 0
+        self.bytes_parsed = 0
+        self.bytes_hashed = 0
+        self.bytes_scanned = 0
+        # Outputs renamed over their target, and outputs equal to the existing file, see report_output
+        self.files_written = 0
+        self.files_unchanged = 0
+        self.bytes_written = 0
+
+    def reset(self):
+        """
+        Resets all counters to zero.
+        """
+        for name in vars(self):
+            setattr(self, name, 0)
+
+    def add(self, counters: dict[str, int]):
+        """
+        Adds counters, e.g. those of a worker process, to these counters.
+        """
+        for name, value in counters.items():
+            setattr(self, name, getattr(self, name, 0) + value)
+
+    def as_dict(self) -> dict[str, int]:
+        """
+        Returns the counters by name.
+        """
+        return dict(vars(self))
+
+
+IO_METRICS = IOMetrics()
+
+
+class _ChunkReader:
+    """
+    File-like reader over the mapped buffer, for iterparse.
+    """
+
+    def __init__(self, report_input: "ReportInput"):
+        self._input = report_input
+        self._pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Returns the next chunk of the buffer.
+        """
+        end = len(self._input.buffer) if size < 0 else self._pos + size
+        chunk = self._input.buffer[self._pos : end]
+        self._pos += len(chunk)
+        self._input.metrics.bytes_parsed += len(chunk)
+        return chunk
+
+
+class ReportInput:
+    """
+    A memory-mapped report. Use as a context manager; the buffer is released when the context exits.
+    """
+
+    def __init__(self, path: Path, metrics: Optional[IOMetrics] = None):
+        self.path = path
+        self.metrics = metrics or IO_METRICS
+        self._file = path.open("rb")
+        self._hash: Optional[str] = None
+
+        size = path.stat().st_size
+        # Empty files cannot be mapped
+        self.buffer: Union[mmap.mmap, bytes] = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        )
+        self.metrics.files_mapped += 1
+        self.metrics.bytes_mapped += size
+
+    def __enter__(self) -> "ReportInput":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def close(self):
+        """
+        Releases the mapping and the file.
+        """
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+    def content_hash(self) -> str:
+        """
+        Returns the SHA-256 hex digest of the report content, computed once from the buffer.
+        """
+        if self._hash is None:
+            digest = hashlib.sha256()
+            digest.update(self.buffer)
+            self.metrics.bytes_hashed += len(self.buffer)
+            self._hash = digest.hexdigest()
+        return self._hash
+
+    def scan(self) -> Union[mmap.mmap, bytes]:
+        """
+        Returns the buffer for a byte-level scan (e.g. the lexical engine).
+        """
+        self.metrics.bytes_scanned += len(self.buffer)
+        return self.buffer
+
+    def parse_tree(self, chunk_size: int = CHUNK_SIZE, options: Optional[ParserOptions] = None):
+        """
+        Parses the buffer with the reusable lxml feed parser, one chunk at a time.
+
+        Parameters:
+            chunk_size (int): The size of the chunks fed to the parser.
+            options (Optional[ParserOptions]): The parser settings; the defaults if None.
+        Returns:
+            The root <report> element.
+        """
+        parser = get_parser(options)
+        try:
+            for start in range(0, len(self.buffer), chunk_size):
+                chunk = self.buffer[start : start + chunk_size]
+                self.metrics.bytes_parsed += len(chunk)
+                parser.feed(chunk)
+        except etree.XMLSyntaxError:
+            # Resets the reusable parser for the next report
+            try:
+                parser.close()
+            except etree.XMLSyntaxError:
+                pass
+            raise
+        return parser.close()
+
+    def reader(self) -> _ChunkReader:
+        """
+        Returns a file-like reader over the buffer, e.g. as the source of etree.iterparse.
+        """
+        return _ChunkReader(self)
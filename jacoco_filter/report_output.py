@@ -0,0 +1,148 @@
+"""
+This module provides the output layer for filtered reports.
+
+Every output is written through a large buffer to a temporary file in the directory of the target and renamed over
+the target once complete, so a killed run never leaves a truncated report for the downstream steps. An output
+whose content hash equals that of the existing file is not renamed, which keeps the modification time of the
+existing file for incremental builds. The number of outputs committed at the same time by all worker processes is
+limited, so concurrent writes to one disk do not thrash; the slot is only held for the final flush and the rename,
+not while the output is produced. The written and unchanged outputs are counted in
+IO_METRICS.
+"""
+
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+    from jacoco_filter.report_input import IOMetrics
+
+logger = logging.getLogger(__name__)
+
+# Size of the write buffer of an output
+OUTPUT_BUFFER_SIZE = 1 << 20
+# Outputs committed at the same time by all worker processes
+DEFAULT_MAX_WRITERS = 2
+
+# The semaphore shared by the worker processes of a run, see configure_writers()
+_WRITER_SLOTS: Optional[Any] = None
+
+
+def configure_writers(slots: Optional[Any]):
+    """
+    Sets the semaphore limiting the outputs written at the same time, e.g. in the initializer of a worker process.
+
+    Parameters:
+        slots (Optional[Any]): A multiprocessing semaphore shared by all processes; no limit if None.
+    Returns:
+        None
+    """
+    global _WRITER_SLOTS  # pylint: disable=global-statement
+    _WRITER_SLOTS = slots
+
+
+@contextmanager
+def writer_slot() -> Iterator[None]:
+    """
+    Waits for one of the configured writer slots and holds it for the duration.
+    """
+    slots = _WRITER_SLOTS
+    if slots is None:
+        yield
+        return
+    with slots:
+        yield
+
+
+def file_digest(path: Path) -> Optional[bytes]:
+    """
+    Returns the SHA-256 digest of a file, or None if it does not exist.
+    """
+    import hashlib  # pylint: disable=import-outside-toplevel
+
+    try:
+        with path.open("rb") as f:
+            return hashlib.file_digest(f, "sha256").digest()
+    except FileNotFoundError:
+        return None
+
+
+class AtomicOutput:
+    """
+    A binary file-like output that replaces its target atomically on a successful exit, and is discarded on an
+    exception. Usable as the target of lxml's ElementTree.write() and etree.xmlfile().
+    """
+
+    def __init__(self, path: Path, buffer_size: int = OUTPUT_BUFFER_SIZE, metrics: Optional["IOMetrics"] = None):
+        # Imported here, so the CLI can read DEFAULT_MAX_WRITERS without loading hashlib and lxml
+        # pylint: disable=import-outside-toplevel
+        import hashlib
+
+        from jacoco_filter.report_input import IO_METRICS
+
+        self.path = path
+        self.buffer_size = buffer_size
+        self.metrics = metrics or IO_METRICS
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file: Any = None
+        self._tmp_name = ""
+
+    def __enter__(self) -> "AtomicOutput":
+        self._tmp_name = str(self.path.with_name(f".{self.path.name}.{os.getpid()}.{os.urandom(6).hex()}.tmp"))
+        # Created with the mode of a new file under the current umask, like the target would be
+        fd = os.open(self._tmp_name, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+        self._file = os.fdopen(fd, "wb", buffering=self.buffer_size)
+        return self
+
+    def write(self, data: bytes) -> int:
+        """
+        Writes data to the temporary file.
+        """
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def writelines(self, lines: Iterable[bytes]):
+        """
+        Writes every chunk of data to the temporary file.
+        """
+        for data in lines:
+            self.write(data)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self._file.close()
+            Path(self._tmp_name).unlink(missing_ok=True)
+            return
+
+        with writer_slot():
+            try:
+                # Flushes the rest of the buffer
+                self._file.close()
+            except BaseException:
+                Path(self._tmp_name).unlink(missing_ok=True)
+                raise
+            self._commit()
+
+    def _commit(self):
+        try:
+            unchanged = self.path.stat().st_size == self.size and file_digest(self.path) == self._digest.digest()
+        except FileNotFoundError:
+            unchanged = False
+
+        if unchanged:
+            Path(self._tmp_name).unlink()
+            self.metrics.files_unchanged += 1
+            logger.debug("Output '%s' is unchanged, keeping the existing file.", self.path)
+            return
+
+        try:
+            os.replace(self._tmp_name, self.path)
+        except BaseException:
+            Path(self._tmp_name).unlink(missing_ok=True)
+            raise
+        self.metrics.files_written += 1
+        self.metrics.bytes_written += self.size
@@ -0,0 +1,124 @@
+"""
+This module provides per-rule statistics: how often every rule was evaluated, matched and removed something, and
+the time spent evaluating it, summed over all inputs of a run.
+
+While enabled, the RuleMatcher evaluates every rule of a scope on its own instead of the combined expression, so
+the counters are exact but matching is slower; the statistics are opt-in. A rule that never matched is dead. A
+rule that matched, but only targets an earlier rule had already removed, is shadowed. Both can be deleted without
+changing the output.
+"""
+
+import logging
+from typing import Iterable
+
+from jacoco_filter.rules import FilterRule
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("evaluations", "matches", "removals", "time_ns")
+
+
+def rule_key(rule: FilterRule) -> str:
+    """
+    Returns the text of a rule, e.g. 'class:*Test', which identifies it in the statistics.
+    """
+    return rule.text
+
+
+class RuleStats:
+    """
+    Counters of every rule, by the 'scope:pattern' text of the rule, in rule order.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.rules: dict[str, dict[str, int]] = {}
+
+    def reset(self):
+        """
+        Drops all counters; whether collecting is enabled is kept.
+        """
+        self.rules = {}
+
+    def register(self, rules: Iterable[FilterRule]):
+        """
+        Adds rules with zero counters, so rules that are never evaluated are reported as well.
+        """
+        for rule in rules:
+            self.rules.setdefault(rule_key(rule), dict.fromkeys(COUNTERS, 0))
+
+    def record(self, rule: FilterRule, matched: bool, removed: bool, elapsed_ns: int):
+        """
+        Records one evaluation of a rule.
+
+        Parameters:
+            rule (FilterRule): The evaluated rule.
+            matched (bool): Whether the rule matched the target.
+            removed (bool): Whether the rule was the first match, i.e. removed the target.
+            elapsed_ns (int): The time the evaluation took, in nanoseconds.
+        Returns:
+            None
+        """
+        counters = self.rules.get(rule_key(rule))
+        if counters is None:
+            counters = self.rules[rule_key(rule)] = dict.fromkeys(COUNTERS, 0)
+        counters["evaluations"] += 1
+        counters["matches"] += matched
+        counters["removals"] += removed
+        counters["time_ns"] += elapsed_ns
+
+    def add(self, rules: dict[str, dict[str, int]]):
+        """
+        Adds counters, e.g. those of a worker process, to these counters.
+        """
+        for key, counters in rules.items():
+            totals = self.rules.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            for name in COUNTERS:
+                totals[name] += counters.get(name, 0)
+
+    def as_dict(self) -> dict:
+        """
+        Returns the counters of every rule, and the dead and the shadowed rules.
+        """
+        return {
+            "counters": {key: dict(counters) for key, counters in self.rules.items()},
+            "never_matched": [key for key, counters in self.rules.items() if not counters["matches"]],
+            "shadowed": [
+                key for key, counters in self.rules.items() if counters["matches"] and not counters["removals"]
+            ],
+        }
+
+    def log_report(self, slowest: int = 5):
+        """
+        Logs the dead, the shadowed and the most expensive rules.
+
+        Parameters:
+            slowest (int): The number of most expensive rules to log.
+        Returns:
+            None
+        """
+        summary = self.as_dict()
+        if summary["never_matched"]:
+            logger.warning("%s rule(s) never matched:", len(summary["never_matched"]))
+            for key in summary["never_matched"]:
+                logger.warning("   %s", key)
+        if summary["shadowed"]:
+            logger.warning("%s rule(s) only matched what earlier rules already removed:", len(summary["shadowed"]))
+            for key in summary["shadowed"]:
+                logger.warning("   %s", key)
+
+        expensive = sorted(self.rules.items(), key=lambda item: item[1]["time_ns"], reverse=True)[:slowest]
+        if expensive:
+            logger.info("Most expensive rules:")
+        for key, counters in expensive:
+            logger.info(
+                "   %s: %.1f ms in %s evaluation(s), %s match(es), %s removal(s)",
+                key,
+                counters["time_ns"] / 1e6,
+                counters["evaluations"],
+                counters["matches"],
+                counters["removals"],
+            )
+
+
+RULE_STATS = RuleStats()
@@ -13,6 +13,10 @@ from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Option of class rules, written in brackets after the scope: 'class[nested]:pattern' also removes the nested and
+# synthetic classes ('Outer$Inner', 'Outer$$anonfun$1') of every class the rule removes
+NESTED_OPTION = "nested"
+
 
 class ScopeEnum(str, Enum):
     """
@@ -36,6 +40,7 @@ class FilterRule:
 
     scope: ScopeEnum  # "file", "class", or "method"
     pattern: str
+    nested: bool = False
     target_class_pattern: Optional[str] = field(init=False, default=None)
     target_method_pattern: Optional[str] = field(init=False, default=None)
 
@@ -53,6 +58,14 @@ class FilterRule:
                 self.target_class_pattern = None
                 self.target_method_pattern = self.pattern
 
+    @property
+    def text(self) -> str:
+        """
+        The rule as written in a rules file, e.g. 'class[nested]:com.example.Outer'.
+        """
+        option = f"[{NESTED_OPTION}]" if self.nested else ""
+        return f"{self.scope.value}{option}:{self.pattern}"
+
     def matches(self, target: dict) -> bool:
         """
         Checks if the target matches the filter rule based on its scope and pattern.
@@ -77,40 +90,15 @@ class FilterRule:
                     fqcn = target.get("fully_qualified_classname", "")
                     simple_class = target.get("simple_class_name", fqcn.split(".")[-1] if fqcn else "")
 
-                    logger.debug(
-                        "METHOD: fqcn=%s, simple_class=%s, method=%s",
-                        fqcn,
-                        simple_class,
-                        method_name,
-                    )
-                    logger.debug(
-                        "Rule: class_pattern=%s, method_pattern=%s",
-                        self.target_class_pattern,
-                        self.target_method_pattern,
-                    )
-
                     if self.target_class_pattern:
                         class_match = fnmatchcase(fqcn, self.target_class_pattern) or fnmatchcase(
                             simple_class, self.target_class_pattern
                         )
 
                         if not class_match:
-                            logger.debug(
-                                "Rule '%s' did not match class '%s' or '%s'",
-                                self.pattern,
-                                fqcn,
-                                simple_class,
-                            )
                             return False
 
-                    matched = fnmatchcase(method_name, self.target_method_pattern)
-                    logger.debug(
-                        "Matching method '%s' with rule '%s' => %s",
-                        method_name,
-                        self.pattern,
-                        matched,
-                    )
-                    return matched
+                    return fnmatchcase(method_name, self.target_method_pattern)
 
                 case _:
                     return False
@@ -148,7 +136,7 @@ class FilterRule:
             raise ValueError(f"Missing ':' in rule: '{line}'")
 
         scope, pattern = line.split(":", 1)
-        scope = scope.strip()
+        scope, nested = parse_scope(scope.strip())
         pattern = pattern.strip()
 
         if not ScopeEnum.has_value(scope):
@@ -157,7 +145,29 @@ class FilterRule:
         if not pattern:
             raise ValueError(f"Empty pattern in rule: '{line}'")
 
-        return cls(ScopeEnum(scope), pattern)
+        return cls(ScopeEnum(scope), pattern, nested)
+
+
+def parse_scope(scope: str) -> tuple[str, bool]:
+    """
+    Splits the scope of a rule line into the scope and its option.
+
+    Parameters:
+        scope (str): The text before the ':' of a rule line, e.g. 'class' or 'class[nested]'.
+    Returns:
+        tuple[str, bool]: The scope, and whether the rule has the nested option.
+    Raises:
+        ValueError: If the option is unknown, or given for another scope than 'class'.
+    """
+    if not scope.endswith("]") or "[" not in scope:
+        return scope, False
+
+    scope, option = scope[:-1].split("[", 1)
+    if option.strip() != NESTED_OPTION:
+        raise ValueError(f"Unsupported rule option '{option}', expected '{NESTED_OPTION}'")
+    if scope.strip() != ScopeEnum.CLASS:
+        raise ValueError(f"The '{NESTED_OPTION}' option is only supported by class rules, not '{scope}'")
+    return scope.strip(), True
 
 
 def load_filter_rules(path: Path) -> list[FilterRule]:
@@ -187,7 +197,10 @@ def load_filter_rules(path: Path) -> list[FilterRule]:
                 raise ValueError(f"Multiple colons found on line {lineno}: '{line}'")
 
             scope, pattern = line.split(":", 1)
-            scope = scope.strip().lower()
+            try:
+                scope, nested = parse_scope(scope.strip().lower())
+            except ValueError as e:
+                raise ValueError(f"{e} on line {lineno}") from e
             pattern = pattern.strip()
 
             if not ScopeEnum.has_value(scope):
@@ -196,7 +209,7 @@ def load_filter_rules(path: Path) -> list[FilterRule]:
             if not pattern:
                 raise ValueError(f"Empty pattern on line {lineno}")
 
-            rules.append(FilterRule(scope=ScopeEnum(scope), pattern=pattern))
+            rules.append(FilterRule(scope=ScopeEnum(scope), pattern=pattern, nested=nested))
 
     return rules
 
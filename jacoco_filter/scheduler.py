@@ -0,0 +1,174 @@
+"""
+This module implements the size-aware scheduler, which orders and packs the input reports under a memory budget.
+
+The peak memory of a file is estimated from its size with a factor per engine, calibrated by
+tests/test_memory_estimate.py. Jobs are started largest first; a job is started only while the estimates of all
+running jobs fit into the budget. Files whose in-memory estimate exceeds the budget are switched to the streaming
+processor, whose footprint is bounded by the largest top-level unit instead of the whole report.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Peak resident memory per input byte, measured on generated reports and rounded up
+MEMORY_FACTORS = {"model": 25.0, "tree": 23.0, "xslt": 42.0, "lexical": 2.0, "stream": 1.5}
+# Fixed overhead of processing one file (interpreter allocations, buffers)
+BASE_MEMORY = 8 << 20
+
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$", re.IGNORECASE)
+_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_memory_size(text: str) -> int:
+    """
+    Parses a memory size such as '512M', '2G', '1.5GiB' or a plain number of bytes.
+
+    Parameters:
+        text (str): The size.
+    Returns:
+        int: The size in bytes.
+    Raises:
+        ValueError: If the size cannot be parsed.
+    """
+    match = _SIZE.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid memory size '{text}', expected e.g. '512M' or '2G'.")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def estimate_memory(size: int, engine: str) -> int:
+    """
+    Estimates the peak memory of processing a file of the given size with an engine ('stream' for streaming).
+    """
+    return BASE_MEMORY + int(size * MEMORY_FACTORS.get(engine, MEMORY_FACTORS["model"]))
+
+
+@dataclass
+class Job:
+    """
+    One input file with its size, estimated memory and whether it is streamed.
+    """
+
+    path: Path
+    size: int
+    memory: int
+    stream: bool = False
+
+
+def plan_jobs(files: list[Path], engine: str, max_memory: Optional[int], can_stream: bool = True) -> list[Job]:
+    """
+    Orders the files largest first and switches files too large for the budget to streaming.
+
+    Parameters:
+        files (list[Path]): The input files.
+        engine (str): The engine the estimates are based on.
+        max_memory (Optional[int]): The memory budget in bytes, or None for no budget.
+        can_stream (bool): Whether files may be switched to streaming.
+    Returns:
+        list[Job]: The jobs, largest first.
+    """
+    jobs = []
+    for path in files:
+        size = path.stat().st_size
+        job = Job(path, size, estimate_memory(size, engine), engine == "stream")
+
+        if max_memory is not None and job.memory > max_memory and can_stream and not job.stream:
+            logger.info(
+                "'%s' (%s MiB) exceeds the memory budget with the %s engine, streaming it.", path, size >> 20, engine
+            )
+            job.stream = True
+            job.memory = estimate_memory(size, "stream")
+
+        if max_memory is not None and job.memory > max_memory:
+            # Runs alone; the budget cannot be honored for this file
+            logger.warning("'%s' is estimated to need more than the memory budget.", path)
+            job.memory = max_memory
+        jobs.append(job)
+
+    jobs.sort(key=lambda job: job.size, reverse=True)
+    return jobs
+
+
+class MemoryScheduler:
+    """
+    Runs jobs largest first in a process pool, keeping the summed estimates of the running jobs under the budget.
+    """
+
+    def __init__(
+        self,
+        max_memory: Optional[int] = None,
+        workers: int = 1,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+    ):
+        self.max_memory = max_memory
+        self.workers = max(1, workers)
+        # Called in every worker process at start, e.g. to set up logging
+        self.initializer = initializer
+        self.initargs = initargs
+        self.peak_memory = 0
+
+    def run(self, jobs: list[Job], worker: Callable[[Job], Any], on_result: Callable[[Job, Any], None]):
+        """
+        Runs the worker for every job and passes each result to on_result in the calling process.
+
+        With a single worker, the jobs run in order in the calling process.
+
+        Parameters:
+            jobs (list[Job]): The planned jobs, largest first.
+            worker (Callable[[Job], Any]): A picklable function processing one job.
+            on_result (Callable[[Job, Any], None]): Called with every job and its result.
+        Returns:
+            None
+        Raises:
+            Exception: The first exception raised by a worker.
+        """
+        if self.workers == 1 or len(jobs) <= 1:
+            for job in jobs:
+                self.peak_memory = max(self.peak_memory, job.memory)
+                on_result(job, worker(job))
+            return
+
+        # Loading multiprocessing is left to runs with several workers
+        # pylint: disable-next=import-outside-toplevel
+        from concurrent import futures
+
+        pending = list(jobs)
+        running: dict["Future", Job] = {}
+        in_use = 0
+
+        with futures.ProcessPoolExecutor(self.workers, initializer=self.initializer, initargs=self.initargs) as pool:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    candidate = self._next_fitting(pending, in_use, not running)
+                    if candidate is None:
+                        break
+                    pending.remove(candidate)
+                    running[pool.submit(worker, candidate)] = candidate
+                    in_use += candidate.memory
+                    self.peak_memory = max(self.peak_memory, in_use)
+
+                done, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    finished = running.pop(future)
+                    in_use -= finished.memory
+                    on_result(finished, future.result())
+
+    def _next_fitting(self, pending: list[Job], in_use: int, idle: bool) -> Optional[Job]:
+        """
+        Returns the largest pending job fitting into the remaining budget; any job fits when nothing runs.
+        """
+        if self.max_memory is None or idle:
+            return pending[0]
+        for job in pending:
+            if in_use + job.memory <= self.max_memory:
+                return job
+        return None
@@ -3,29 +3,98 @@ This module provides functionality to serialize a JacocoReport object to an XML
 """
 
 import logging
+from dataclasses import dataclass
 from pathlib import Path
-from lxml import etree
+from typing import Optional
+
 from jacoco_filter.model import JacocoReport
+from jacoco_filter.report_output import AtomicOutput
 
 
 logger = logging.getLogger(__name__)
 
+OUTPUT_PROFILES = ("full", "slim")
+
+
+@dataclass
+class OutputOptions:
+    """
+    Controls what is written to the filtered report.
+
+    The 'full' profile keeps every element and pretty-prints the output. The 'slim' profile leaves out counters
+    with nothing missed or covered (such as the zeroed non-INSTRUCTION counters) and <sessioninfo>, and writes
+    compact XML without indentation. With drop_lines, the <line> entries of sourcefiles are left out as well.
+    Both profiles produce documents that are valid against the JaCoCo report DTD.
+    """
+
+    profile: str = "full"
+    drop_lines: bool = False
+
+    @property
+    def slim(self) -> bool:
+        """
+        True for the slim profile.
+        """
+        return self.profile == "slim"
+
+
+def apply_output_options(elem, options: OutputOptions):
+    """
+    Removes what the output options leave out from an element subtree, in place.
+
+    Parameters:
+        elem: The element to prepare, e.g. <report> or a <package> being streamed.
+        options (OutputOptions): The output options.
+    Returns:
+        None
+    """
+    if not options.slim and not options.drop_lines:
+        return
+
+    removed = []
+    for child in elem.iter():
+        tag = child.tag
+        if options.slim:
+            child.text = None
+            child.tail = None
+            if tag == "counter" and child.get("missed") == "0" and child.get("covered") == "0":
+                removed.append(child)
+            elif tag == "sessioninfo":
+                removed.append(child)
+        if options.drop_lines and tag == "line":
+            removed.append(child)
+
+    for child in removed:
+        parent = child.getparent()
+        if parent is not None:
+            parent.remove(child)
+
 
 class ReportSerializer:
     """
     A class to serialize a JacocoReport object to an XML file.
     """
 
-    def __init__(self, report: JacocoReport):
+    def __init__(self, report: JacocoReport, options: Optional[OutputOptions] = None):
         self.report = report
+        self.options = options or OutputOptions()
 
     def write_to_file(self, output_path: Path):
         """
         Serializes the JacocoReport object to an XML file.
+
+        The elements left out by the output options are removed from the tree before writing it. The file is
+        replaced atomically, see AtomicOutput.
+
         Parameters:
             output_path (Path): The path where the XML file will be saved.
         Returns:
             None
         """
+        # Imported here, so the CLI can read OUTPUT_PROFILES without loading lxml
+        from lxml import etree  # pylint: disable=import-outside-toplevel
+
+        apply_output_options(self.report.xml_element, self.options)
         tree = etree.ElementTree(self.report.xml_element)
-        tree.write(str(output_path), encoding="utf-8", pretty_print=True, xml_declaration=True)
+        with AtomicOutput(output_path) as out:
+            tree.write(out, encoding="utf-8", pretty_print=not self.options.slim, xml_declaration=True)
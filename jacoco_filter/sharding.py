@@ -0,0 +1,183 @@
+"""
+This module implements input sharding across CI nodes, and merging the metrics of the shards into one summary.
+
+Every node resolves the same inputs and keeps its share, so the nodes need no shared state. The 'hash' strategy
+assigns each file by a CRC-32 of its path relative to the working directory, which is stable across checkouts and
+interpreters. The 'size' strategy balances the summed file sizes of the shards, and needs every node to see the
+same files with the same sizes.
+"""
+
+import json
+import logging
+import zlib
+from pathlib import Path
+
+from jacoco_filter.rule_stats import RuleStats
+
+logger = logging.getLogger(__name__)
+
+SHARD_STRATEGIES = ("hash", "size")
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    """
+    Parses a shard specification 'i/N' with 1 <= i <= N.
+
+    Parameters:
+        text (str): The specification, e.g. '2/4'.
+    Returns:
+        tuple[int, int]: The 1-based shard index and the number of shards.
+    Raises:
+        ValueError: If the specification is invalid.
+    """
+    index, _, count = str(text).partition("/")
+    try:
+        shard = int(index), int(count)
+    except ValueError:
+        shard = (0, 0)
+    if not 1 <= shard[0] <= shard[1]:
+        raise ValueError(f"Invalid shard '{text}', expected 'i/N' with 1 <= i <= N, e.g. '1/4'.")
+    return shard
+
+
+def shard_label(shard: tuple[int, int]) -> str:
+    """
+    Returns the 'i/N' label of a shard.
+    """
+    return f"{shard[0]}/{shard[1]}"
+
+
+def _relative_key(path: Path, root_dir: Path) -> str:
+    try:
+        return path.resolve().relative_to(root_dir.resolve()).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
+def assign_shards(files: list[Path], count: int, root_dir: Path, strategy: str = "hash") -> dict[Path, int]:
+    """
+    Assigns every file to a 0-based shard.
+
+    Parameters:
+        files (list[Path]): The resolved input files.
+        count (int): The number of shards.
+        root_dir (Path): The directory the paths are hashed relative to.
+        strategy (str): 'hash' to assign by path hash, 'size' to balance the summed file sizes.
+    Returns:
+        dict[Path, int]: The shard of every file.
+    """
+    keys = {path: _relative_key(path, root_dir) for path in files}
+    if strategy != "size":
+        return {path: zlib.crc32(key.encode("utf-8")) % count for path, key in keys.items()}
+
+    # Largest first onto the least loaded shard; ties are broken by path, so all nodes agree
+    sizes = {path: path.stat().st_size for path in files}
+    loads = [0] * count
+    assignment = {}
+    for path in sorted(files, key=lambda p: (-sizes[p], keys[p])):
+        shard = min(range(count), key=lambda i: (loads[i], i))
+        loads[shard] += sizes[path]
+        assignment[path] = shard
+    return assignment
+
+
+def select_shard(files: list[Path], shard: tuple[int, int], root_dir: Path, strategy: str = "hash") -> list[Path]:
+    """
+    Returns the files of one shard, in their original order.
+
+    Parameters:
+        files (list[Path]): The resolved input files.
+        shard (tuple[int, int]): The 1-based shard index and the number of shards.
+        root_dir (Path): The directory the paths are hashed relative to.
+        strategy (str): The sharding strategy, see assign_shards().
+    Returns:
+        list[Path]: The files of the shard.
+    """
+    index, count = shard
+    assignment = assign_shards(files, count, root_dir, strategy)
+    return [path for path in files if assignment[path] == index - 1]
+
+
+def _add_counters(totals: dict, counters: dict):
+    for name, value in counters.items():
+        totals[name] = totals.get(name, 0) + value
+
+
+def merge_metrics(runs: list[dict]) -> dict:
+    """
+    Merges the metrics of several runs, e.g. the shards of one CI pipeline, into one summary.
+
+    Counters are summed, also the per-rule counters of '--rule-stats', from which the dead and shadowed rules are
+    derived again; the peak estimated memory is the maximum over the runs. If the runs are shards, every shard of
+    the same split must be present exactly once.
+
+    Parameters:
+        runs (list[dict]): The metrics written by '--metrics'.
+    Returns:
+        dict: The summary.
+    Raises:
+        ValueError: If the runs mix splits, or a shard is missing or given twice.
+    """
+    shards = [run["shard"] for run in runs if run.get("shard")]
+    if shards:
+        _check_shards(shards, len(runs))
+
+    summary: dict = {
+        "runs": len(runs),
+        "shards": shards,
+        "files": 0,
+        "violations": 0,
+        "stats": {},
+        "io": {},
+        "scheduler": {"peak_estimated_memory": 0, "streamed_files": 0},
+    }
+    rule_stats = RuleStats()
+    for run in runs:
+        summary["files"] += run.get("files", 0)
+        summary["violations"] += run.get("violations", 0)
+        _add_counters(summary["stats"], run.get("stats", {}))
+        _add_counters(summary["io"], run.get("io", {}))
+
+        scheduler = run.get("scheduler", {})
+        summary["scheduler"]["peak_estimated_memory"] = max(
+            summary["scheduler"]["peak_estimated_memory"], scheduler.get("peak_estimated_memory", 0)
+        )
+        summary["scheduler"]["streamed_files"] += scheduler.get("streamed_files", 0)
+        if "rules" in run:
+            rule_stats.add(run["rules"]["counters"])
+
+    if rule_stats.rules:
+        summary["rules"] = rule_stats.as_dict()
+    return summary
+
+
+def _check_shards(labels: list[str], runs: int):
+    parsed = [parse_shard(label) for label in labels]
+    counts = {count for _, count in parsed}
+    if len(counts) > 1 or len(parsed) != runs:
+        raise ValueError(f"Cannot merge shards of different splits or unsharded runs: {', '.join(labels)}.")
+
+    count = counts.pop()
+    indexes = [index for index, _ in parsed]
+    duplicates = sorted({index for index in indexes if indexes.count(index) > 1})
+    missing = sorted(set(range(1, count + 1)) - set(indexes))
+    if duplicates:
+        raise ValueError(f"Shard(s) given more than once: {', '.join(f'{i}/{count}' for i in duplicates)}.")
+    if missing:
+        raise ValueError(f"Missing metrics of shard(s): {', '.join(f'{i}/{count}' for i in missing)}.")
+
+
+def load_metrics(paths: list[Path]) -> list[dict]:
+    """
+    Reads metrics files written by '--metrics'.
+
+    Raises:
+        ValueError: If a file is not valid JSON.
+    """
+    runs = []
+    for path in paths:
+        try:
+            runs.append(json.loads(path.read_text(encoding="utf-8")))
+        except ValueError as e:
+            raise ValueError(f"Invalid metrics file {path}: {e}") from e
+    return runs
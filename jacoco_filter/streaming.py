@@ -0,0 +1,203 @@
+"""
+This module implements the StreamingProcessor, which filters a report one top-level unit at a time.
+
+A unit is a direct <group> or <package> child of <report>. Units are independent: each one is parsed with
+iterparse, filtered by FilterEngine, recounted by the configured counter updater and written out before the
+next one is read, so the peak memory is bounded by the largest unit instead of the whole report. The report
+counters are the sums of the written units; a unit without counters is summed from its classes and sourcefiles.
+"""
+
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+from lxml import etree
+
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.gate import CoverageGate, display_path
+from jacoco_filter.model import Group, JacocoReport, Package
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.report_input import ParserOptions, ReportInput
+from jacoco_filter.report_output import AtomicOutput
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.serializer import OutputOptions, apply_output_options
+
+logger = logging.getLogger(__name__)
+
+UNIT_TAGS = ("group", "package")
+
+
+class StreamingProcessor:  # pylint: disable=too-many-instance-attributes
+    """
+    StreamingProcessor filters and recounts a report unit by unit and writes the result incrementally.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        rules: list[FilterRule],
+        updater: Optional[CounterUpdater] = None,
+        prune_lines: bool = False,
+        gate: Optional[CoverageGate] = None,
+        output: Optional[OutputOptions] = None,
+        parser_options: Optional[ParserOptions] = None,
+    ):
+        self.engine = FilterEngine(rules, prune_lines)
+        self.parser_options = parser_options or ParserOptions()
+        self.updater = updater or CounterUpdater()
+        self.gate = gate
+        self.output = output or OutputOptions()
+        self.source = ""
+        self.stats = self.engine.stats
+        self.units = 0
+
+    def process(  # pylint: disable=too-many-locals
+        self, input_path: Path, output_path: Path, report_input: Optional[ReportInput] = None
+    ) -> dict:
+        """
+        Filters the report at input_path into output_path.
+
+        Parameters:
+            input_path (Path): The JaCoCo XML report.
+            output_path (Path): The filtered report to write.
+            report_input (Optional[ReportInput]): The memory-mapped input; the report is mapped if None.
+        Returns:
+            dict: The filtering statistics.
+        """
+        if report_input is None:
+            with ReportInput(input_path) as mapped_input:
+                return self.process(input_path, output_path, mapped_input)
+
+        logger.info("Streaming %s", input_path)
+        parser = JacocoParser(input_path, options=self.parser_options)
+        self.source = display_path(output_path)
+        events = etree.iterparse(report_input.reader(), events=("start", "end"), **self.parser_options.settings())
+
+        _, root = next(events)
+        report_counters = []
+        totals: dict[str, list[int]] = {}
+        depth = 1
+
+        with AtomicOutput(output_path) as out, etree.xmlfile(out, encoding="utf-8") as xf:
+            xf.write_declaration()
+            doctype = root.getroottree().docinfo.doctype
+            if doctype:
+                xf.write_doctype(doctype)
+
+            with xf.element(root.tag, dict(root.attrib)):
+                if not self.output.slim:
+                    xf.write("\n")
+                for event, elem in events:
+                    if event == "start":
+                        depth += 1
+                        continue
+
+                    depth -= 1
+                    if depth != 1:
+                        continue
+
+                    if elem.tag == "counter":
+                        # The report counters come last and are written once all units are done
+                        report_counters.append(elem)
+                        continue
+
+                    if self._keep(parser, root, elem, totals):
+                        apply_output_options(elem, self.output)
+                        xf.write(elem, pretty_print=not self.output.slim)
+
+                    if elem.getparent() is not None:
+                        root.remove(elem)
+                    elem.clear()
+
+                self._write_report_counters(xf, report_counters, totals, self.output.slim)
+
+        if self.gate is not None:
+            self.gate.check_totals(totals, self.source)
+
+        logger.info("Streamed %s unit(s) into %s", self.units, output_path)
+        return self.stats
+
+    def _keep(self, parser: JacocoParser, root, elem, totals: dict[str, list[int]]) -> bool:
+        """
+        Processes a direct child of <report> and returns whether it is written.
+        """
+        if elem.tag in UNIT_TAGS:
+            return self.process_unit(parser, root, elem, totals)
+        # <sessioninfo> is left out of slim outputs
+        return not (self.output.slim and elem.tag == "sessioninfo")
+
+    @staticmethod
+    def _write_report_counters(xf, report_counters: list, totals: dict[str, list[int]], slim: bool):
+        for counter_elem in report_counters:
+            missed, covered = totals.get(counter_elem.get("type"), (0, 0))
+            if slim and not missed and not covered:
+                continue
+            counter_elem.set("missed", str(missed))
+            counter_elem.set("covered", str(covered))
+            xf.write(counter_elem, pretty_print=not slim)
+
+    def process_unit(self, parser: JacocoParser, root, unit_elem, totals: dict[str, list[int]]) -> bool:
+        """
+        Filters and recounts one unit and adds its counters to the totals.
+
+        Parameters:
+            parser (JacocoParser): The parser building the unit model.
+            root: The <report> element the unit belongs to.
+            unit_elem: The <group> or <package> element.
+            totals (dict[str, list[int]]): Counter totals per type of the processed units, updated in place.
+        Returns:
+            bool: False if the unit was removed for lack of coverage.
+        """
+        report = JacocoReport(xml_element=root)
+        if unit_elem.tag == "group":
+            report.groups.append(parser.build_group(unit_elem))
+        else:
+            report.packages.append(parser.build_package(unit_elem))
+
+        self.engine.apply(report)
+        self.updater.apply(report)
+        self.units += 1
+        if self.gate is not None:
+            # The report totals are only known once all units are done
+            self.gate.check(report, self.source, include_total=False)
+
+        if unit_elem.getparent() is None:
+            return False
+
+        for counter_type, (missed, covered) in unit_totals((report.groups or report.packages)[0]).items():
+            counter_totals = totals.setdefault(counter_type, [0, 0])
+            counter_totals[0] += missed
+            counter_totals[1] += covered
+        return True
+
+
+def unit_totals(unit: Union[Group, Package]) -> dict[str, tuple[int, int]]:
+    """
+    Returns the counters of a processed unit by type.
+
+    A unit without counters of its own, as written by some report generators, is summed from its children: the
+    nested groups and packages of a group, the sourcefiles of a package and its classes without a counted
+    sourcefile.
+
+    Parameters:
+        unit (Union[Group, Package]): The unit, after filtering and recounting.
+    Returns:
+        dict[str, tuple[int, int]]: The (missed, covered) values per counter type.
+    """
+    if unit.counters:
+        return {counter.type: (counter.missed, counter.covered) for counter in unit.counters}
+
+    totals: dict[str, tuple[int, int]] = {}
+    if isinstance(unit, Group):
+        parts = [unit_totals(child) for child in unit.groups]
+        parts.extend(unit_totals(package) for package in unit.packages)
+    else:
+        counted = {sourcefile.name for sourcefile in unit.sourcefiles if sourcefile.counters}
+        counters = [sourcefile.counters for sourcefile in unit.sourcefiles]
+        counters.extend(cls.counters for cls in unit.classes if cls.source_filename not in counted)
+        parts = [{counter.type: (counter.missed, counter.covered) for counter in items} for items in counters]
+    for part in parts:
+        for counter_type, (missed, covered) in part.items():
+            total_missed, total_covered = totals.get(counter_type, (0, 0))
+            totals[counter_type] = (total_missed + missed, total_covered + covered)
+    return totals
@@ -0,0 +1,116 @@
+"""
+This module provides structured tracing of hot-path events (e.g. removed classes and methods).
+
+Tracing replaces per-element debug logging: call sites guard every event with `if TRACER.enabled:`, so a
+disabled tracer costs a single attribute check and no argument formatting. When enabled, events are
+sampled and written as JSON lines.
+"""
+
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+
+class Tracer:
+    """
+    Writes sampled, structured trace events as JSON lines.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self._stride = 1
+        self._seen: dict[str, int] = {}
+        self._context: dict[str, Any] = {}
+        self._stream: Optional[TextIO] = None
+        self._owns_stream = False
+
+    def configure(self, output: Optional[str], sample_rate: float = 1.0):
+        """
+        Enables tracing into the given output, or disables it when no output is given.
+
+        Parameters:
+            output (Optional[str]): Path of the JSON lines file, '-' for stdout, or None to disable tracing.
+            sample_rate (float): Share of events to record per event type, in the range (0, 1].
+        Returns:
+            None
+        Raises:
+            ValueError: If the sample rate is out of range.
+        """
+        self.close()
+
+        if not 0 < sample_rate <= 1:
+            raise ValueError(f"Trace sample rate must be in range (0, 1], got {sample_rate}")
+
+        self.sample_rate = sample_rate
+        self._stride = max(1, round(1 / sample_rate))
+        self._seen = {}
+        self._context = {}
+
+        if not output:
+            self.enabled = False
+            return
+
+        if output == "-":
+            self._stream = sys.stdout
+            self._owns_stream = False
+        else:
+            # pylint: disable=consider-using-with
+            self._stream = Path(output).open("w", encoding="utf-8")
+            self._owns_stream = True
+
+        self.enabled = True
+        logger.info("Tracing enabled: output=%s, sample rate=%s", output, sample_rate)
+
+    def bind(self, **context):
+        """
+        Sets fields (e.g. the processed file) that are added to every following event.
+        """
+        self._context = context
+
+    def emit(self, event: str, **fields):
+        """
+        Records an event if it is selected by sampling. Call sites should check `enabled` first.
+
+        Parameters:
+            event (str): The event type, e.g. 'class_removed'.
+            fields: Event payload; values must be JSON serializable.
+        Returns:
+            None
+        """
+        if self._stream is None:
+            return
+
+        seen = self._seen.get(event, 0)
+        self._seen[event] = seen + 1
+        if seen % self._stride:
+            return
+
+        record = {"event": event, **self._context, **fields}
+        self._stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def counts(self) -> dict[str, int]:
+        """
+        Returns the number of emitted (pre-sampling) events per event type.
+        """
+        return dict(self._seen)
+
+    def close(self):
+        """
+        Flushes and closes the trace output and disables tracing.
+        """
+        if self._stream is not None:
+            if self._owns_stream:
+                self._stream.close()
+            else:
+                self._stream.flush()
+        self._stream = None
+        self._owns_stream = False
+        self.enabled = False
+
+
+TRACER = Tracer()
@@ -0,0 +1,227 @@
+"""
+This module implements the TreeFilterEngine, a model-free alternative to FilterEngine + CounterUpdater.
+
+The engine works directly on the lxml tree, including the nested <group> elements of aggregate reports:
+compiled XPath selectors find the elements and a single post-order walk removes matching classes/methods and
+rewrites the INSTRUCTION counters in place. The output is identical to the model-based pipeline.
+"""
+
+import logging
+
+from lxml import etree
+
+from jacoco_filter.removals import RemovalRecorder
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+_PACKAGES = etree.XPath("package")
+_GROUPS = etree.XPath("group")
+_CLASSES = etree.XPath("class")
+_METHODS = etree.XPath("method")
+_SOURCEFILES = etree.XPath("sourcefile")
+_COUNTERS = etree.XPath("counter")
+
+
+class TreeFilterEngine:
+    """
+    TreeFilterEngine filters a parsed JaCoCo XML tree and recomputes INSTRUCTION counters without a model.
+    """
+
+    def __init__(self, rules: list[FilterRule]):
+        self.rules = rules
+        self.removals = RemovalRecorder(rules)
+        self.stats = self.removals.stats
+
+    def apply(self, root):
+        """
+        Apply filtering rules and counter updates to the report root element in place.
+
+        Parameters:
+            root: The <report> element.
+        Returns:
+            None
+        """
+        report_counters = _COUNTERS(root)
+        self._zero_counters(report_counters)
+
+        report_missed, report_covered = self._apply_container(root)
+        self._set_instruction(report_counters, report_missed, report_covered)
+
+    def _apply_container(self, elem) -> tuple[int, int]:
+        """
+        Filter the packages and nested groups of the report or of a group, and remove the ones left without
+        coverage.
+
+        Parameters:
+            elem: The <report> or <group> element.
+        Returns:
+            tuple[int, int]: Instruction (missed, covered) of the element.
+        """
+        missed = covered = 0
+        zero_children = []
+
+        for pkg_elem in _PACKAGES(elem):
+            pkg_missed, pkg_covered, is_zero = self._apply_package(pkg_elem)
+            missed += pkg_missed
+            covered += pkg_covered
+            if is_zero:
+                zero_children.append(pkg_elem)
+
+        for group_elem in _GROUPS(elem):
+            group_counters = _COUNTERS(group_elem)
+            self._zero_counters(group_counters)
+            group_missed, group_covered = self._apply_container(group_elem)
+            self._set_instruction(group_counters, group_missed, group_covered)
+            missed += group_missed
+            covered += group_covered
+            if group_missed == 0 and group_covered == 0 and any(c.get("type") == "INSTRUCTION" for c in group_counters):
+                zero_children.append(group_elem)
+
+        for child in zero_children:
+            if TRACER.enabled:
+                if child.tag == "package":
+                    TRACER.emit("package_removed", package=child.get("name", ""), reason="zero_instruction_coverage")
+                else:
+                    TRACER.emit("group_removed", group=child.get("name", ""), reason="zero_instruction_coverage")
+            elem.remove(child)
+
+        return missed, covered
+
+    def _apply_package(self, pkg_elem) -> tuple[int, int, bool]:
+        """
+        Filter one package and rewrite its class, sourcefile and package counters.
+
+        Parameters:
+            pkg_elem: The <package> element.
+        Returns:
+            tuple[int, int, bool]: Instruction (missed, covered) of the package and whether it is to be removed.
+        """
+        package_counters = _COUNTERS(pkg_elem)
+        self._zero_counters(package_counters)
+        sourcefiles = _SOURCEFILES(pkg_elem)
+        for sourcefile_elem in sourcefiles:
+            self._zero_counters(_COUNTERS(sourcefile_elem))
+
+        sourcefile_totals = self._apply_classes(pkg_elem)
+        has_classes = bool(sourcefile_totals)
+        pkg_missed = sum(missed for missed, _ in sourcefile_totals.values())
+        pkg_covered = sum(covered for _, covered in sourcefile_totals.values())
+
+        self._update_sourcefiles(pkg_elem, sourcefiles, sourcefile_totals)
+
+        if has_classes:
+            self._update_instruction(pkg_elem, package_counters, pkg_missed, pkg_covered)
+
+        has_instruction = has_classes or any(c.get("type") == "INSTRUCTION" for c in package_counters)
+        return pkg_missed, pkg_covered, has_instruction and pkg_missed == 0 and pkg_covered == 0
+
+    def _apply_classes(self, pkg_elem) -> dict[str, tuple[int, int]]:
+        """
+        Filter the classes of a package and sum the INSTRUCTION counters of the remaining ones per sourcefile.
+
+        Returns:
+            dict[str, tuple[int, int]]: Instruction (missed, covered) per sourcefile name; empty if no class remains.
+        """
+        sourcefile_totals: dict[str, tuple[int, int]] = {}
+
+        for cls_elem in _CLASSES(pkg_elem):
+            if self._remove_class(pkg_elem, cls_elem):
+                continue
+
+            missed, covered = self._apply_class(cls_elem)
+            sourcefilename = cls_elem.get("sourcefilename") or ""
+            sf_missed, sf_covered = sourcefile_totals.get(sourcefilename, (0, 0))
+            sourcefile_totals[sourcefilename] = (sf_missed + missed, sf_covered + covered)
+
+        return sourcefile_totals
+
+    def _update_sourcefiles(self, pkg_elem, sourcefiles: list, sourcefile_totals: dict[str, tuple[int, int]]):
+        """
+        Write the aggregated INSTRUCTION counters to the sourcefiles and remove the ones left without coverage.
+        """
+        for sourcefile_elem in sourcefiles:
+            missed, covered = sourcefile_totals.get(sourcefile_elem.get("name") or "", (0, 0))
+            instruction = [c for c in _COUNTERS(sourcefile_elem) if c.get("type") == "INSTRUCTION"]
+            self._set_instruction(instruction, missed, covered)
+            if instruction and missed == 0 and covered == 0:
+                if TRACER.enabled:
+                    TRACER.emit(
+                        "sourcefile_removed",
+                        package=pkg_elem.get("name", ""),
+                        sourcefile=sourcefile_elem.get("name", ""),
+                        reason="zero_instruction_coverage",
+                    )
+                pkg_elem.remove(sourcefile_elem)
+
+    def _remove_class(self, pkg_elem, cls_elem) -> bool:
+        """
+        Remove the class element if a class or file rule matches it.
+
+        Returns:
+            bool: True if the class was removed.
+        """
+        fqcn = (cls_elem.get("name") or "").replace("/", ".")
+        if self.removals.class_rule(pkg_elem.get("name", ""), fqcn, cls_elem.get("sourcefilename", "")) is None:
+            return False
+
+        pkg_elem.remove(cls_elem)
+        return True
+
+    def _apply_class(self, cls_elem) -> tuple[int, int]:
+        """
+        Remove matching methods and rewrite the class counters from the remaining ones.
+
+        Returns:
+            tuple[int, int]: Instruction (missed, covered) the class contributes to its parents.
+        """
+        fqcn = (cls_elem.get("name") or "").replace("/", ".")
+        simple_class_name = fqcn.split(".")[-1]
+        missed = covered = 0
+        has_methods = False
+
+        for meth_elem in _METHODS(cls_elem):
+            if self.removals.method_rule(fqcn, simple_class_name, meth_elem.get("name") or "") is not None:
+                cls_elem.remove(meth_elem)
+                continue
+
+            has_methods = True
+            for counter_elem in _COUNTERS(meth_elem):
+                if counter_elem.get("type") == "INSTRUCTION":
+                    missed += int(counter_elem.get("missed"))
+                    covered += int(counter_elem.get("covered"))
+                else:
+                    counter_elem.set("missed", "0")
+                    counter_elem.set("covered", "0")
+
+        class_counters = _COUNTERS(cls_elem)
+        self._zero_counters(class_counters)
+        if not has_methods:
+            return 0, 0
+
+        self._update_instruction(cls_elem, class_counters, missed, covered)
+        return missed, covered
+
+    @staticmethod
+    def _zero_counters(counters: list):
+        for counter_elem in counters:
+            counter_elem.set("missed", "0")
+            counter_elem.set("covered", "0")
+
+    @staticmethod
+    def _set_instruction(counters: list, missed: int, covered: int):
+        for counter_elem in counters:
+            if counter_elem.get("type") == "INSTRUCTION":
+                counter_elem.set("missed", str(missed))
+                counter_elem.set("covered", str(covered))
+
+    @classmethod
+    def _update_instruction(cls, parent_elem, counters: list, missed: int, covered: int):
+        """
+        Update the INSTRUCTION counter of the element in place, or add one after its counters if it has none.
+        """
+        if any(c.get("type") == "INSTRUCTION" for c in counters):
+            cls._set_instruction(counters, missed, covered)
+        else:
+            etree.SubElement(parent_elem, "counter", type="INSTRUCTION", missed=str(missed), covered=str(covered))
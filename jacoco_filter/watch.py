@@ -0,0 +1,140 @@
+"""
+This module implements the watch mode, which re-filters reports whenever a test run rewrites them.
+
+The resolved inputs are polled with os.stat(), so no OS-specific file notifier is needed. A report is re-filtered
+once its modification time or size changed and then stayed the same for the debounce time, so reports still being
+written are not read. The input globs are resolved again only every few polls, and the rules stay loaded (and
+compiled) for the whole session.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Suffix of the filtered reports, which are never inputs of the watch mode
+OUTPUT_SUFFIX = ".filtered.xml"
+# The input globs are resolved again after this many polls
+RESCAN_POLLS = 10
+
+Signature = tuple[int, int]
+
+
+def _signature(path: Path) -> Optional[Signature]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class ChangeTracker:
+    """
+    The watched inputs and their stability state: the signature of every input when it was last processed, and the
+    changed inputs waiting to be stable for the debounce time.
+    """
+
+    debounce: float
+    inputs: list[Path] = field(default_factory=list)
+    processed: dict[Path, Signature] = field(default_factory=dict)
+    # The new signature of a changed input and when it was first seen
+    pending: dict[Path, tuple[Signature, float]] = field(default_factory=dict)
+
+    def is_ready(self, path: Path, signature: Optional[Signature], now: float) -> bool:
+        """
+        Records the current signature of an input and returns whether it changed since it was last processed and
+        stayed unchanged for the debounce time.
+        """
+        if signature is None or signature == self.processed.get(path):
+            self.pending.pop(path, None)
+            return False
+
+        pending = self.pending.get(path)
+        if pending is None or pending[0] != signature:
+            # New or still being written; wait until it is stable
+            pending = self.pending[path] = (signature, now)
+        return now - pending[1] >= self.debounce
+
+    def take(self, paths: list[Path]) -> dict[Path, Signature]:
+        """
+        Removes ready inputs from the pending ones and returns their signatures.
+        """
+        return {path: self.pending.pop(path)[0] for path in paths}
+
+
+class ReportWatcher:
+    """
+    ReportWatcher polls the inputs and passes the changed, stable ones to a processing function.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        resolve: Callable[[], list[Path]],
+        process: Callable[[list[Path]], None],
+        interval: float = 1.0,
+        debounce: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.resolve = resolve
+        self.process = process
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep
+        self.changes = ChangeTracker(interval if debounce is None else debounce)
+        self.polls = 0
+
+    def discover(self):
+        """
+        Resolves the inputs again, leaving out filtered reports.
+        """
+        self.changes.inputs = [path for path in self.resolve() if not path.name.endswith(OUTPUT_SUFFIX)]
+        logger.debug("Watching %s input file(s).", len(self.changes.inputs))
+
+    def poll(self) -> list[Path]:
+        """
+        Checks the inputs once.
+
+        Returns:
+            list[Path]: The inputs changed since they were last processed and unchanged for the debounce time.
+        """
+        if self.polls % RESCAN_POLLS == 0:
+            self.discover()
+        self.polls += 1
+
+        now = self.clock()
+        return [path for path in self.changes.inputs if self.changes.is_ready(path, _signature(path), now)]
+
+    def process_ready(self, ready: list[Path]):
+        """
+        Processes the ready inputs and records their signatures, also if processing failed, so a broken report is
+        processed again only after its next change.
+        """
+        signatures = self.changes.take(ready)
+        logger.info("Filtering %s changed report(s) ...", len(ready))
+        try:
+            self.process(ready)
+        # pylint: disable=broad-except
+        except Exception as e:
+            logger.error("Error: %s", e)
+        self.changes.processed.update(signatures)
+
+    def run(self, polls: Optional[int] = None):
+        """
+        Polls the inputs until interrupted, or for the given number of polls.
+
+        Parameters:
+            polls (Optional[int]): The number of polls; unlimited if None.
+        Returns:
+            None
+        """
+        logger.info("Watching the inputs for changes every %ss (Ctrl+C to stop) ...", self.interval)
+        while polls is None or self.polls < polls:
+            ready = self.poll()
+            if ready:
+                self.process_ready(ready)
+            self.sleep(self.interval)
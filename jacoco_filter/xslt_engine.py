@@ -0,0 +1,226 @@
+"""
+This module implements the XsltFilterEngine, which compiles a rule list into an XSLT stylesheet executed by
+libxslt through lxml.etree.XSLT.
+
+Patterns using only '*' wildcards are translated into XPath 1.0 string functions, so their evaluation stays in
+C. Patterns with '?' or '[...]' fall back to the EXSLT 're:test' function. The generated stylesheet is cached
+on disk by the hash of the rules; counters are recomputed afterwards by CounterUpdater.
+"""
+
+import logging
+from fnmatch import translate
+from pathlib import Path
+from typing import Optional
+
+from lxml import etree
+
+from jacoco_filter.cache import content_hash, write_atomic
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.model import JacocoReport
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule, ScopeEnum
+
+logger = logging.getLogger(__name__)
+
+# Bump when the generated stylesheet changes, to invalidate cached stylesheets.
+STYLESHEET_VERSION = "1"
+
+XSL_NS = "http://www.w3.org/1999/XSL/Transform"
+STR_NS = "http://exslt.org/strings"
+RE_NS = "http://exslt.org/regular-expressions"
+
+_FQCN = "translate(@name, '/', '.')"
+_OWNER_FQCN = "translate(../@name, '/', '.')"
+_OWNER_SIMPLE = f"string(str:tokenize({_OWNER_FQCN}, '.')[last()])"
+
+_CLASSES = etree.XPath(".//package/class")
+_METHODS = etree.XPath(".//package/class/method")
+
+_compiled: dict[str, etree.XSLT] = {}
+
+
+def xpath_literal(value: str) -> str:
+    """
+    Quotes a string as an XPath 1.0 literal.
+    """
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return "concat(" + ', "\'", '.join(f"'{part}'" for part in value.split("'")) + ")"
+
+
+def glob_to_xpath(value: str, pattern: str) -> str:
+    """
+    Translates an fnmatchcase() pattern into an XPath 1.0 boolean expression over the given string expression.
+
+    Parameters:
+        value (str): XPath expression of the tested string, e.g. '@sourcefilename'.
+        pattern (str): The shell-style pattern.
+    Returns:
+        str: The XPath expression.
+    """
+    if "?" in pattern or "[" in pattern:
+        return f"re:test({value}, {xpath_literal('^' + translate(pattern))})"
+
+    parts = pattern.split("*")
+    if len(parts) == 1:
+        return f"{value} = {xpath_literal(pattern)}"
+
+    prefix, middles, suffix = parts[0], [p for p in parts[1:-1] if p], parts[-1]
+    min_length = len(prefix) + len(suffix) + sum(len(m) for m in middles)
+    conditions = [f"string-length({value}) >= {min_length}"] if min_length else []
+
+    if prefix:
+        conditions.append(f"starts-with({value}, {xpath_literal(prefix)})")
+    if suffix:
+        conditions.append(f"substring({value}, string-length({value}) - {len(suffix) - 1}) = {xpath_literal(suffix)}")
+    if middles:
+        # The middle segments must occur in order between prefix and suffix; leftmost matching is sufficient.
+        rest = f"substring({value}, {len(prefix) + 1}, string-length({value}) - {len(prefix) + len(suffix)})"
+        for middle in middles:
+            conditions.append(f"contains({rest}, {xpath_literal(middle)})")
+            rest = f"substring-after({rest}, {xpath_literal(middle)})"
+
+    return "(" + " and ".join(conditions) + ")" if conditions else "true()"
+
+
+def _rule_condition(rule: FilterRule) -> str:
+    match rule.scope:
+        case ScopeEnum.FILE:
+            return glob_to_xpath("string(@sourcefilename)", rule.pattern)
+        case ScopeEnum.CLASS:
+            return glob_to_xpath(_FQCN, rule.pattern)
+        case ScopeEnum.METHOD:
+            method_match = glob_to_xpath("string(@name)", rule.target_method_pattern or "")
+            if not rule.target_class_pattern:
+                return method_match
+            class_match = (
+                f"({glob_to_xpath(_OWNER_FQCN, rule.target_class_pattern)}"
+                f" or {glob_to_xpath(_OWNER_SIMPLE, rule.target_class_pattern)})"
+            )
+            return f"({class_match} and {method_match})"
+        case _:
+            return "false()"
+
+
+def build_stylesheet(rules: list[FilterRule]) -> bytes:
+    """
+    Generates the XSLT stylesheet that copies a report and drops classes and methods matched by the rules.
+
+    Parameters:
+        rules (list[FilterRule]): The rules to compile.
+    Returns:
+        bytes: The serialized stylesheet.
+    """
+    nsmap = {"xsl": XSL_NS, "str": STR_NS, "re": RE_NS}
+    stylesheet = etree.Element(f"{{{XSL_NS}}}stylesheet", nsmap=nsmap, version="1.0")
+    stylesheet.set("extension-element-prefixes", "str re")
+
+    identity = etree.SubElement(stylesheet, f"{{{XSL_NS}}}template", match="@*|node()")
+    copy = etree.SubElement(identity, f"{{{XSL_NS}}}copy")
+    etree.SubElement(copy, f"{{{XSL_NS}}}apply-templates", select="@*|node()")
+
+    class_conditions = [_rule_condition(r) for r in rules if r.scope in (ScopeEnum.CLASS, ScopeEnum.FILE)]
+    method_conditions = [_rule_condition(r) for r in rules if r.scope == ScopeEnum.METHOD]
+
+    if class_conditions:
+        etree.SubElement(stylesheet, f"{{{XSL_NS}}}template", match=f"package/class[{' or '.join(class_conditions)}]")
+    if method_conditions:
+        etree.SubElement(
+            stylesheet, f"{{{XSL_NS}}}template", match=f"package/class/method[{' or '.join(method_conditions)}]"
+        )
+
+    return etree.tostring(stylesheet, xml_declaration=True, encoding="utf-8", pretty_print=True)
+
+
+def rules_hash(rules: list[FilterRule]) -> str:
+    """
+    Returns the cache key of a rule list.
+    """
+    return content_hash([STYLESHEET_VERSION] + [r.text for r in rules])
+
+
+def load_stylesheet(rules: list[FilterRule], cache_dir: Optional[Path] = None) -> etree.XSLT:
+    """
+    Returns the compiled stylesheet for the rules, reusing the in-process and on-disk caches.
+
+    Parameters:
+        rules (list[FilterRule]): The rules to compile.
+        cache_dir (Optional[Path]): Cache directory for generated stylesheets; no disk cache if None.
+    Returns:
+        etree.XSLT: The compiled transformation.
+    """
+    key = rules_hash(rules)
+    if key in _compiled:
+        return _compiled[key]
+
+    cached_file = cache_dir / "xslt" / f"{key}.xsl" if cache_dir is not None else None
+
+    if cached_file is not None and cached_file.is_file():
+        logger.debug("Using cached stylesheet %s", cached_file)
+        xslt_doc = etree.parse(str(cached_file))
+    else:
+        source = build_stylesheet(rules)
+        if cached_file is not None:
+            write_atomic(cached_file, source)
+        xslt_doc = etree.fromstring(source).getroottree()
+
+    _compiled[key] = etree.XSLT(xslt_doc)
+    return _compiled[key]
+
+
+class XsltFilterEngine:
+    """
+    XsltFilterEngine removes matching classes and methods with a compiled XSLT stylesheet.
+    """
+
+    def __init__(
+        self, rules: list[FilterRule], cache_dir: Optional[Path] = None, updater: Optional[CounterUpdater] = None
+    ):
+        self.rules = rules
+        self.updater = updater or CounterUpdater()
+        self.transform = load_stylesheet(rules, cache_dir)
+        self.stats = {"methods_removed": 0, "classes_removed": 0}
+
+    def apply(self, root) -> JacocoReport:
+        """
+        Filters the report tree and recomputes the counters of the result.
+
+        Parameters:
+            root: The <report> element of the input.
+        Returns:
+            JacocoReport: The model of the filtered report, with updated counters.
+        """
+        source = root.getroottree()
+        result = self.transform(source)
+        result_root = result.getroot()
+
+        if source.docinfo.system_url or source.docinfo.public_id:
+            result.docinfo.public_id = source.docinfo.public_id
+            result.docinfo.system_url = source.docinfo.system_url
+
+        self._collect_stats(root, result_root)
+
+        report = JacocoParser(Path(source.docinfo.URL or "")).build_report(result_root)
+        self.updater.apply(report)
+        return report
+
+    def _collect_stats(self, root, result_root):
+        """
+        Derives the removal statistics by comparing the input and the output tree.
+        """
+        # Aggregate reports may contain the same class in several groups
+        surviving = {_class_path(c) for c in _CLASSES(result_root)}
+        removed_classes = [c for c in _CLASSES(root) if _class_path(c) not in surviving]
+        methods_in_removed = sum(len(c.findall("method")) for c in removed_classes)
+
+        self.stats["classes_removed"] = len(removed_classes)
+        self.stats["methods_removed"] = len(_METHODS(root)) - len(_METHODS(result_root)) - methods_in_removed
+
+
+def _class_path(class_elem) -> tuple[str, ...]:
+    """
+    Returns the names of the groups and the package of a <class> element, and its own name.
+    """
+    return (*(elem.get("name", "") for elem in class_elem.iterancestors("group", "package")), class_elem.get("name"))
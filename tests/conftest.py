@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+# Set to run the tests marked 'benchmark', which assert on wall time and resident memory
+BENCHMARKS_ENV = "JACOCO_FILTER_BENCHMARKS"
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", f"benchmark: timing or memory assertion, only run if {BENCHMARKS_ENV} is set")
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.getenv(BENCHMARKS_ENV):
+        return
+    skip = pytest.mark.skip(reason=f"benchmark, set {BENCHMARKS_ENV}=1 to run it")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    # Keep cached artifacts (e.g. compiled rules) of the tests out of the user's cache directory
+    monkeypatch.setenv("JACOCO_FILTER_CACHE_DIR", str(tmp_path / "cache"))
@@ -0,0 +1,176 @@
+"""
+Generator of synthetic, internally consistent JaCoCo XML reports used by tests and benchmarks.
+"""
+
+import random
+from pathlib import Path
+
+DOCTYPE = '<!DOCTYPE report PUBLIC "-//JACOCO//DTD Report 1.1//EN" "report.dtd">'
+
+# Element declarations of the JaCoCo report DTD (report.dtd 1.1), to validate written reports
+REPORT_DTD = """
+<!ELEMENT report (sessioninfo*, (group* | package*), counter*)>
+<!ATTLIST report name CDATA #REQUIRED>
+<!ELEMENT sessioninfo EMPTY>
+<!ATTLIST sessioninfo id CDATA #REQUIRED start CDATA #REQUIRED dump CDATA #REQUIRED>
+<!ELEMENT group ((group* | package*), counter*)>
+<!ATTLIST group name CDATA #REQUIRED>
+<!ELEMENT package ((class | sourcefile)*, counter*)>
+<!ATTLIST package name CDATA #REQUIRED>
+<!ELEMENT class (method*, counter*)>
+<!ATTLIST class name CDATA #REQUIRED sourcefilename CDATA #IMPLIED>
+<!ELEMENT method (counter*)>
+<!ATTLIST method name CDATA #REQUIRED desc CDATA #REQUIRED line CDATA #IMPLIED>
+<!ELEMENT sourcefile (line*, counter*)>
+<!ATTLIST sourcefile name CDATA #REQUIRED>
+<!ELEMENT line EMPTY>
+<!ATTLIST line nr CDATA #REQUIRED mi CDATA #IMPLIED ci CDATA #IMPLIED mb CDATA #IMPLIED cb CDATA #IMPLIED>
+<!ELEMENT counter EMPTY>
+<!ATTLIST counter type (INSTRUCTION|BRANCH|LINE|COMPLEXITY|METHOD|CLASS) #REQUIRED
+                  missed CDATA #REQUIRED covered CDATA #REQUIRED>
+"""
+
+
+def _counter(counter_type: str, missed: int, covered: int) -> str:
+    return f'<counter type="{counter_type}" missed="{missed}" covered="{covered}"/>'
+
+
+def _counters(totals: dict) -> str:
+    return "".join(_counter(t, m, c) for t, (m, c) in totals.items() if m or c)
+
+
+def _add(totals: dict, other: dict):
+    for counter_type, (missed, covered) in other.items():
+        m, c = totals.get(counter_type, (0, 0))
+        totals[counter_type] = (m + missed, c + covered)
+
+
+def generate_report_xml(
+    n_classes: int,
+    methods_per_class: int = 4,
+    classes_per_package: int = 50,
+    classes_per_sourcefile: int = 2,
+    lines_per_method: int = 3,
+    packages_per_group: int = 0,
+    seed: int = 42,
+) -> bytes:
+    """
+    Generates a JaCoCo report whose counters are consistent at every level (method, class, sourcefile,
+    package and report), including the <line> data of every sourcefile.
+
+    Class names follow the pattern 'com/example/pkg<P>/Class<N>'; every third class is nested
+    ('Class<N>$Inner') and every fifth method is a getter, so rule sets can target a predictable share.
+
+    Parameters:
+        n_classes (int): Total number of classes in the report.
+        methods_per_class (int): Number of methods per class.
+        classes_per_package (int): Number of classes per package.
+        classes_per_sourcefile (int): Number of consecutive classes sharing one sourcefile.
+        lines_per_method (int): Number of source lines owned by every method.
+        packages_per_group (int): If set, packages are put into '<group name="module<G>">' elements nested in
+            one '<group name="aggregate">', as in aggregate reports.
+        seed (int): Seed of the pseudo-random coverage values.
+    Returns:
+        bytes: The UTF-8 encoded XML document.
+    """
+    rnd = random.Random(seed)
+    parts = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>', DOCTYPE, '<report name="generated">']
+    parts.append('<sessioninfo id="generated" start="1" dump="2"/>')
+    report_totals: dict = {}
+    packages: list[tuple[list[str], dict]] = []
+
+    for pkg_start in range(0, n_classes, classes_per_package):
+        pkg_index = pkg_start // classes_per_package
+        pkg_name = f"com/example/pkg{pkg_index}"
+        pkg_totals: dict = {}
+        class_parts = []
+        sourcefiles: dict = {}
+
+        for cls_index in range(pkg_start, min(pkg_start + classes_per_package, n_classes)):
+            simple = f"Class{cls_index}$Inner" if cls_index % 3 == 2 else f"Class{cls_index}"
+            sf_name = f"Source{cls_index // classes_per_sourcefile}.java"
+            sf_lines, sf_totals = sourcefiles.setdefault(sf_name, ([], {}))
+            next_line = 10 + len(sf_lines) * 2
+            cls_totals: dict = {}
+            method_parts = []
+
+            for meth_index in range(methods_per_class):
+                name = f"getValue{meth_index}" if meth_index % 5 == 0 else f"method{meth_index}"
+                first_line = next_line
+                meth_totals: dict = {}
+                any_covered = False
+                line_missed = line_covered = branches_missed = branches_covered = 0
+                instr_missed = instr_covered = 0
+
+                for nr in range(first_line, first_line + lines_per_method):
+                    mi, ci = (rnd.randint(0, 4), rnd.randint(0, 4))
+                    if mi == 0 and ci == 0:
+                        ci = 1
+                    mb, cb = (rnd.randint(0, 1), rnd.randint(0, 1)) if nr % 4 == 0 else (0, 0)
+                    sf_lines.append(f'<line nr="{nr}" mi="{mi}" ci="{ci}" mb="{mb}" cb="{cb}"/>')
+                    instr_missed += mi
+                    instr_covered += ci
+                    branches_missed += mb
+                    branches_covered += cb
+                    if ci > 0:
+                        line_covered += 1
+                        any_covered = True
+                    else:
+                        line_missed += 1
+
+                next_line += lines_per_method + 1
+                meth_totals["INSTRUCTION"] = (instr_missed, instr_covered)
+                meth_totals["BRANCH"] = (branches_missed, branches_covered)
+                meth_totals["LINE"] = (line_missed, line_covered)
+                complexity = 1 + (branches_missed + branches_covered) // 2
+                meth_totals["COMPLEXITY"] = (0, complexity) if any_covered else (complexity, 0)
+                meth_totals["METHOD"] = (0, 1) if any_covered else (1, 0)
+                _add(cls_totals, meth_totals)
+                method_parts.append(
+                    f'<method name="{name}" desc="()V" line="{first_line}">{_counters(meth_totals)}</method>'
+                )
+
+            cls_totals["CLASS"] = (0, 1) if cls_totals["METHOD"][1] else (1, 0)
+            _add(sf_totals, cls_totals)
+            _add(pkg_totals, cls_totals)
+            class_parts.append(
+                f'<class name="{pkg_name}/{simple}" sourcefilename="{sf_name}">'
+                f"{''.join(method_parts)}{_counters(cls_totals)}</class>"
+            )
+
+        pkg_parts = [f'<package name="{pkg_name}">']
+        pkg_parts.extend(class_parts)
+        for sf_name, (sf_lines, sf_totals) in sourcefiles.items():
+            pkg_parts.append(f'<sourcefile name="{sf_name}">{"".join(sf_lines)}{_counters(sf_totals)}</sourcefile>')
+        pkg_parts.append(_counters(pkg_totals))
+        pkg_parts.append("</package>")
+        packages.append((pkg_parts, pkg_totals))
+        _add(report_totals, pkg_totals)
+
+    if not packages_per_group:
+        for pkg_parts, _ in packages:
+            parts.extend(pkg_parts)
+    else:
+        parts.append('<group name="aggregate">')
+        for group_start in range(0, len(packages), packages_per_group):
+            group_totals: dict = {}
+            parts.append(f'<group name="module{group_start // packages_per_group}">')
+            for pkg_parts, pkg_totals in packages[group_start : group_start + packages_per_group]:
+                parts.extend(pkg_parts)
+                _add(group_totals, pkg_totals)
+            parts.append(_counters(group_totals))
+            parts.append("</group>")
+        parts.append(_counters(report_totals))
+        parts.append("</group>")
+
+    parts.append(_counters(report_totals))
+    parts.append("</report>")
+    return "\n".join(parts).encode("utf-8")
+
+
+def write_report(path: Path, n_classes: int, **kwargs) -> Path:
+    """
+    Writes a generated report to the given path and returns the path.
+    """
+    path.write_bytes(generate_report_xml(n_classes, **kwargs))
+    return path
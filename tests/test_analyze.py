@@ -0,0 +1,76 @@
+from jacoco_filter.analyze import CoverageIndex, analyze, format_impact, percent
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule
+from tests.report_factory import write_report
+
+CANDIDATE = [
+    FilterRule.parse("class:*$Inner"),
+    FilterRule.parse("method:get*"),
+    FilterRule.parse("class:com.example.nothing.*"),
+]
+
+
+def filtered_instruction(path, rules) -> tuple[int, int]:
+    report = JacocoParser(path).parse()
+    FilterEngine(rules).apply(report)
+    CounterUpdater().apply(report)
+    counter = next(c for c in report.counters if c.type == "INSTRUCTION")
+    return counter.missed, counter.covered
+
+
+def test_analyze_matches_filtered_reports(tmp_path):
+    reports = {
+        "module0": write_report(tmp_path / "a.xml", 60, classes_per_package=20),
+        "module1": write_report(tmp_path / "b.xml", 30, classes_per_package=10, seed=7),
+    }
+
+    before, impacts = analyze(reports, {"candidate": CANDIDATE, "none": []})
+
+    candidate, none = impacts
+    for module, path in reports.items():
+        assert candidate.after[module] == filtered_instruction(path, CANDIDATE)
+        assert none.after[module] == before[module] == filtered_instruction(path, [])
+    assert [f"{r.scope.value}:{r.pattern}" for r in candidate.unused_rules()] == ["class:com.example.nothing.*"]
+
+
+def test_analyze_removes_nested_classes_with_their_owner(tmp_path):
+    classes = "".join(
+        f'<class name="com/example/{name}" sourcefilename="Outer.scala">'
+        f'<method name="run" desc="()V"><counter type="INSTRUCTION" missed="1" covered="{covered}"/></method></class>'
+        for covered, name in enumerate(["Outer", "Outer$", "Outer$Inner", "Outer$$anonfun$1", "OuterHelper"], 1)
+    )
+    path = tmp_path / "jacoco.xml"
+    path.write_text(
+        f'<report name="r"><package name="com/example">{classes}</package>'
+        '<counter type="INSTRUCTION" missed="5" covered="15"/></report>'
+    )
+    rules = [FilterRule.parse("class[nested]:com.example.Outer")]
+
+    _, impacts = analyze({"module0": path}, {"nested": rules})
+
+    assert impacts[0].after["module0"] == filtered_instruction(path, rules) == (1, 5)
+
+
+def test_analyze_reuses_saved_index(tmp_path, monkeypatch):
+    reports = {"module0": write_report(tmp_path / "a.xml", 20)}
+    index_path = tmp_path / "cache" / "index.json"
+    first = analyze(reports, {"candidate": CANDIDATE}, index_path)
+    assert index_path.is_file()
+
+    def fail(_):
+        raise AssertionError("report indexed again")
+
+    monkeypatch.setattr(CoverageIndex, "index_report", staticmethod(fail))
+    second = analyze(reports, {"candidate": CANDIDATE}, index_path)
+
+    assert second[0] == first[0]
+    assert second[1][0].after == first[1][0].after
+
+
+def test_format_impact():
+    before, impacts = {"module0": (1, 3)}, []
+    text = format_impact(before, impacts)
+    assert "module0" in text and "75.00%" in text and text.splitlines()[-1].startswith("Total")
+    assert percent((0, 0)) == "-"
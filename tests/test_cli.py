@@ -7,6 +7,8 @@ from jacoco_filter.cli import (
     parse_arguments,
     resolve_globs,
     apply_excludes, evaluate_parsed_arguments,
+    parse_analyze_arguments,
+    evaluate_analyze_arguments,
 )
 
 
@@ -103,6 +105,7 @@ def test_parse_arguments_rules(monkeypatch):
     monkeypatch.setattr("jacoco_filter.cli.load_config", lambda path: raw_config)
     monkeypatch.setattr("jacoco_filter.cli.FilterRule.is_valid_line", lambda line: True)
     monkeypatch.setattr("jacoco_filter.cli.FilterRule.parse", lambda line: f"PARSED({line})")
+    monkeypatch.setattr("jacoco_filter.cli.load_compiled_rules", lambda source, parse, cache_dir: parse())
 
     parsed_args, config = parse_arguments()
     result = evaluate_parsed_arguments(parsed_args, config)
@@ -186,6 +189,7 @@ def test_parse_arguments_skips_comment_rules(monkeypatch, caplog):
     monkeypatch.setattr("jacoco_filter.cli.load_config", lambda _: config_data)
     monkeypatch.setattr("jacoco_filter.cli.FilterRule.is_valid_line", lambda line: True)
     monkeypatch.setattr("jacoco_filter.cli.FilterRule.parse", lambda line: f"PARSED({line})")
+    monkeypatch.setattr("jacoco_filter.cli.load_compiled_rules", lambda source, parse, cache_dir: parse())
 
     parsed_args, config = parse_arguments()
     result = evaluate_parsed_arguments(parsed_args, config)
@@ -235,3 +239,164 @@ def test_parse_arguments_handles_parse_exception(monkeypatch, caplog):
 
     assert result["rules"] == []
     assert "Failed to parse rule rule 'CLASS:com.example.*': Mock parse error" in caplog.text
+
+
+def test_parse_arguments_engine_from_cli_and_config(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "dummy.toml"])
+    monkeypatch.setattr("jacoco_filter.cli.load_config", lambda _: {"inputs": ["a.xml"], "engine": "tree"})
+
+    parsed_args, config = parse_arguments()
+    assert evaluate_parsed_arguments(parsed_args, config)["engine"] == "tree"
+
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "dummy.toml", "--engine", "model"])
+    parsed_args, config = parse_arguments()
+    assert evaluate_parsed_arguments(parsed_args, config)["engine"] == "model"
+
+
+def test_parse_arguments_rejects_unknown_engine_in_config(monkeypatch, caplog):
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "dummy.toml"])
+    monkeypatch.setattr("jacoco_filter.cli.load_config", lambda _: {"inputs": ["a.xml"], "engine": "magic"})
+
+    parsed_args, config = parse_arguments()
+    with pytest.raises(SystemExit):
+        evaluate_parsed_arguments(parsed_args, config)
+    assert "Unsupported engine 'magic'" in caplog.text
+
+
+def test_parse_arguments_recount_from_cli_and_config(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "dummy.toml"])
+    monkeypatch.setattr("jacoco_filter.cli.load_config", lambda _: {"inputs": ["a.xml"]})
+
+    parsed_args, config = parse_arguments()
+    assert evaluate_parsed_arguments(parsed_args, config)["recount"] is False
+
+    monkeypatch.setattr("jacoco_filter.cli.load_config", lambda _: {"inputs": ["a.xml"], "recount": True})
+    parsed_args, config = parse_arguments()
+    assert evaluate_parsed_arguments(parsed_args, config)["recount"] is True
+
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--inputs", "a.xml", "--recount"])
+    parsed_args, config = parse_arguments()
+    assert evaluate_parsed_arguments(parsed_args, config)["recount"] is True
+
+
+def test_parse_arguments_stream_from_cli(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--inputs", "a.xml", "--stream"])
+    parsed_args, config = parse_arguments()
+    assert evaluate_parsed_arguments(parsed_args, config)["stream"] is True
+
+
+def test_parse_arguments_profiles_from_config(monkeypatch, caplog):
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "dummy.toml"])
+    config = {"inputs": ["a.xml"], "profiles": {"strict": ["class:com.*", "method:get*"], "lenient": ["file:*Spec.scala"]}}
+    monkeypatch.setattr("jacoco_filter.cli.load_config", lambda _: config)
+
+    parsed_args, config = parse_arguments()
+    result = evaluate_parsed_arguments(parsed_args, config)
+
+    assert list(result["profiles"]) == ["strict", "lenient"]
+    assert [r.pattern for r in result["profiles"]["strict"]] == ["com.*", "get*"]
+    assert "No rules provided" not in caplog.text
+
+
+def test_evaluate_analyze_arguments_rule_sets(tmp_path, monkeypatch):
+    strict = tmp_path / "strict.txt"
+    strict.write_text("class:com.*\n")
+    lenient = tmp_path / "lenient.txt"
+    lenient.write_text("method:get*\n")
+    monkeypatch.chdir(tmp_path)
+
+    args, config = parse_analyze_arguments(["-i", "a.xml", "-r", str(strict), "-r", str(lenient), "--cache-dir", "c"])
+    result = evaluate_analyze_arguments(args, config)
+    assert list(result["rule_sets"]) == ["strict", "lenient"]
+    assert result["index"] == Path("c") / "analyze" / "index.json"
+
+    monkeypatch.setattr("jacoco_filter.cli.load_config", lambda _: {"rules": ["file:*.scala"], "profiles": {"p": []}})
+    args, config = parse_analyze_arguments(["-i", "a.xml", "-c", "x.toml"])
+    assert list(evaluate_analyze_arguments(args, config)["rule_sets"]) == ["rules", "p"]
+
+
+def test_evaluate_analyze_arguments_requires_rule_sets(caplog):
+    args, config = parse_analyze_arguments(["-i", "a.xml"])
+    with pytest.raises(SystemExit):
+        evaluate_analyze_arguments(args, config)
+    assert "No rule sets to analyze" in caplog.text
+
+
+def test_thresholds_without_recount_keep_instruction_only(monkeypatch, caplog):
+    config = {"inputs": ["a.xml"], "rules": ["method:get*"], "thresholds": {"total": {"INSTRUCTION": 80, "LINE": 70}}}
+    monkeypatch.setattr("jacoco_filter.cli.load_config", lambda _: config)
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "x.toml"])
+    args = evaluate_parsed_arguments(*parse_arguments())
+    assert [(t.level, t.counter_type) for t in args["thresholds"]] == [("total", "INSTRUCTION")]
+    assert "Skipping threshold total.LINE" in caplog.text
+
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "x.toml", "--recount"])
+    args = evaluate_parsed_arguments(*parse_arguments())
+    assert len(args["thresholds"]) == 2
+
+
+def test_invalid_thresholds_exit(monkeypatch):
+    config = {"inputs": ["a.xml"], "rules": ["method:get*"], "thresholds": {"module": {"INSTRUCTION": 80}}}
+    monkeypatch.setattr("jacoco_filter.cli.load_config", lambda _: config)
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "x.toml"])
+    with pytest.raises(SystemExit):
+        evaluate_parsed_arguments(*parse_arguments())
+
+
+def test_parse_arguments_output_profile(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--inputs", "a.xml"])
+    result = evaluate_parsed_arguments(*parse_arguments())
+    assert (result["output_profile"], result["drop_lines"]) == ("full", False)
+
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--inputs", "a.xml", "--output-profile", "slim", "--drop-lines"])
+    result = evaluate_parsed_arguments(*parse_arguments())
+    assert (result["output_profile"], result["drop_lines"]) == ("slim", True)
+
+    monkeypatch.setattr("jacoco_filter.cli.load_config", lambda _: {"inputs": ["a.xml"], "output_profile": "tiny"})
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "x.toml"])
+    with pytest.raises(SystemExit):
+        evaluate_parsed_arguments(*parse_arguments())
+
+
+def test_parse_arguments_scheduling_options(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--inputs", "a.xml"])
+    result = evaluate_parsed_arguments(*parse_arguments())
+    assert (result["jobs"], result["max_memory"]) == (1, None)
+
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--inputs", "a.xml", "-j", "4", "--max-memory", "2G"])
+    result = evaluate_parsed_arguments(*parse_arguments())
+    assert (result["jobs"], result["max_memory"]) == (4, 2 << 30)
+
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--inputs", "a.xml", "--max-memory", "plenty"])
+    with pytest.raises(SystemExit):
+        evaluate_parsed_arguments(*parse_arguments())
+
+
+def test_parse_arguments_shard(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--inputs", "a.xml", "--shard", "2/3", "--shard-by", "size"])
+    result = evaluate_parsed_arguments(*parse_arguments())
+    assert (result["shard"], result["shard_by"]) == ((2, 3), "size")
+
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--inputs", "a.xml"])
+    result = evaluate_parsed_arguments(*parse_arguments())
+    assert (result["shard"], result["shard_by"]) == (None, "hash")
+
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--inputs", "a.xml", "--shard", "4/3"])
+    with pytest.raises(SystemExit):
+        evaluate_parsed_arguments(*parse_arguments())
+
+
+def test_rules_are_only_cached_in_a_configured_cache_dir(monkeypatch, tmp_path):
+    rules_file = tmp_path / "rules.txt"
+    rules_file.write_text("class:*Test\n")
+    monkeypatch.delenv("JACOCO_FILTER_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    monkeypatch.setattr("jacoco_filter.cli.load_config", lambda path: {})
+
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "-i", "a.xml", "-r", str(rules_file)])
+    evaluate_parsed_arguments(*parse_arguments())
+    assert not (tmp_path / "xdg").exists()
+
+    monkeypatch.setattr(sys, "argv", [*sys.argv, "--cache-dir", str(tmp_path / "cache")])
+    evaluate_parsed_arguments(*parse_arguments())
+    assert len(list((tmp_path / "cache" / "rules").glob("*.json"))) == 1
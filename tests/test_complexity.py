@@ -0,0 +1,145 @@
+"""
+Complexity regression tests: the Python lines every pipeline phase executes are counted on generated reports of
+size n and 4n, and must grow roughly linearly. The count is deterministic and always checked; timing every phase
+on reports of doubling size is a 'benchmark'.
+"""
+
+import math
+import sys
+import time
+from pathlib import Path
+
+import jacoco_filter
+
+import pytest
+
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.serializer import ReportSerializer
+from tests.report_factory import write_report
+
+SIZES = [250, 500, 1000, 2000]
+REPEATS = 3
+# Linear phases fit ~1.0; a quadratic path fits ~2.0. The margin absorbs timer noise and cache effects.
+MAX_EXPONENT = 1.35
+# The executed lines have no noise; the margin covers the coverage values that differ between the reports
+MAX_LINES_EXPONENT = 1.15
+PACKAGE_DIR = str(Path(jacoco_filter.__file__).parent)
+
+RULES = [
+    FilterRule.parse("class:*$Inner"),
+    FilterRule.parse("file:Source1?.java"),
+    FilterRule.parse("method:get*"),
+    FilterRule.parse("method:Class1*#method3"),
+]
+
+
+def _fit_exponent(sizes: list[int], timings: list[float]) -> float:
+    """Least-squares slope of log(time) over log(size)."""
+    xs = [math.log(s) for s in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in timings]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    num = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    den = sum((x - mean_x) ** 2 for x in xs)
+    return num / den
+
+
+def _phases(path, out_path):
+    """Yields the name of every pipeline phase, running it when the iteration continues."""
+    report = JacocoParser(path).parse()
+    yield "parse"
+    FilterEngine(RULES).apply(report)
+    yield "filter"
+    CounterUpdater().apply(report)
+    yield "counters"
+    ReportSerializer(report).write_to_file(out_path)
+    yield "serialize"
+
+
+def _run_phases(path, out_path) -> dict[str, float]:
+    timings = {}
+    phases = _phases(path, out_path)
+    start = time.perf_counter()
+    for phase in phases:
+        timings[phase] = time.perf_counter() - start
+        start = time.perf_counter()
+    return timings
+
+
+def _count_lines(path, out_path) -> dict[str, int]:
+    """Counts the lines of the package executed by every phase."""
+    counts = {}
+    executed = 0
+
+    def trace_lines(_frame, event, _arg):
+        nonlocal executed
+        if event == "line":
+            executed += 1
+        return trace_lines
+
+    def trace_calls(frame, _event, _arg):
+        return trace_lines if frame.f_code.co_filename.startswith(PACKAGE_DIR) else None
+
+    phases = _phases(path, out_path)
+    # Restored afterwards, e.g. the tracer of pytest-cov
+    previous = sys.gettrace()
+    sys.settrace(trace_calls)
+    try:
+        for phase in phases:
+            counts[phase] = executed
+            executed = 0
+    finally:
+        sys.settrace(previous)
+    return counts
+
+
+@pytest.fixture(scope="module")
+def phase_timings(tmp_path_factory) -> dict[str, list[float]]:
+    tmp_path = tmp_path_factory.mktemp("complexity")
+    result: dict[str, list[float]] = {}
+
+    for size in SIZES:
+        # A single package is the worst case for per-package scans.
+        path = write_report(tmp_path / f"report_{size}.xml", size, classes_per_package=size)
+        best: dict[str, float] = {}
+        for _ in range(REPEATS):
+            for phase, seconds in _run_phases(path, tmp_path / "out.xml").items():
+                best[phase] = min(best.get(phase, math.inf), seconds)
+        for phase, seconds in best.items():
+            result.setdefault(phase, []).append(seconds)
+
+    return result
+
+
+@pytest.fixture(scope="module")
+def executed_lines(tmp_path_factory) -> dict[str, list[int]]:
+    tmp_path = tmp_path_factory.mktemp("executed_lines")
+    result: dict[str, list[int]] = {}
+
+    for size in (SIZES[0], 4 * SIZES[0]):
+        path = write_report(tmp_path / f"report_{size}.xml", size, classes_per_package=size)
+        for phase, count in _count_lines(path, tmp_path / "out.xml").items():
+            result.setdefault(phase, []).append(count)
+
+    return result
+
+
+def test_fit_exponent_detects_quadratic():
+    assert _fit_exponent(SIZES, [s * 1e-6 for s in SIZES]) == pytest.approx(1.0)
+    assert _fit_exponent(SIZES, [s * s * 1e-9 for s in SIZES]) == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize("phase", ["parse", "filter", "counters", "serialize"])
+def test_phase_executes_linearly_many_lines(executed_lines, phase):
+    exponent = _fit_exponent([SIZES[0], 4 * SIZES[0]], executed_lines[phase])
+    assert exponent < MAX_LINES_EXPONENT, f"Phase '{phase}' runs O(n^{exponent:.2f}) lines: {executed_lines[phase]}"
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("phase", ["parse", "filter", "counters", "serialize"])
+def test_phase_scales_linearly(phase_timings, phase):
+    exponent = _fit_exponent(SIZES, phase_timings[phase])
+    assert exponent < MAX_EXPONENT, f"Phase '{phase}' scales as O(n^{exponent:.2f}): {phase_timings[phase]}"
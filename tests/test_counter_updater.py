@@ -1,7 +1,11 @@
 import pytest
 from lxml import etree
 from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
 from jacoco_filter.model import Counter, JacocoReport
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule
+from tests.report_factory import write_report
 
 
 class DummyMethod:
@@ -52,6 +56,10 @@ def test_clean_non_instruction_counters():
     ]
     updater._clean_non_instruction_counters(counters)
 
+    # The XML attributes are written on flush
+    assert counters[0].xml_element.get("missed") == "5"
+    updater.flush()
+
     assert counters[0].missed == 0
     assert counters[0].covered == 0
     assert counters[0].xml_element.get("missed") == "0"
@@ -73,10 +81,10 @@ def test_aggregate_instruction_counters_basic():
 
     # Attach class XML to simulate a real DOM
     parent_elem = cls.xml_element
-    parent_elem.append(m1.xml_element)
-    parent_elem.append(m2.xml_element)
+    parent_elem.append(cls.counters[0].xml_element)
 
     updater._aggregate_instruction_counters(parent=cls, children=cls.methods)
+    updater.flush()
 
     assert len(cls.counters) == 1
     counter = cls.counters[0]
@@ -145,12 +153,12 @@ def test_apply_updates_all_levels():
                     assert counter.covered == 0
 
 
-def test_aggregate_instruction_counters_removes_old_xml():
+def test_aggregate_instruction_counters_updates_xml_in_place():
     updater = CounterUpdater()
 
     # Method with real values
     method = DummyMethod([make_counter("INSTRUCTION", 2, 2)], name="get")
-    # DummyClass with an old counter that should be replaced
+    # DummyClass with an old counter that should be updated
     old_counter = make_counter("INSTRUCTION", 999, 999)
     cls = DummyClass([method], counters=[old_counter], name="C")
 
@@ -162,8 +170,9 @@ def test_aggregate_instruction_counters_removes_old_xml():
     assert len(cls.xml_element.findall("counter")) == 1
 
     updater._aggregate_instruction_counters(parent=cls, children=cls.methods)
+    updater.flush()
 
-    # Ensure the XML counter was replaced
+    # Ensure the XML counter was updated in place
     xml_counters = cls.xml_element.findall("counter")
     assert len(xml_counters) == 1
     updated_elem = xml_counters[0]
@@ -175,3 +184,98 @@ def test_aggregate_instruction_counters_removes_old_xml():
     assert cls.counters[0].missed == 2
     assert cls.counters[0].covered == 2
     assert cls.counters[0].xml_element is updated_elem
+
+
+def test_instruction_totals_by_sourcefile_groups_classes():
+    updater = CounterUpdater()
+
+    c1 = DummyClass([], counters=[make_counter("INSTRUCTION", 1, 2)], name="A", source_filename="A.java")
+    c2 = DummyClass([], counters=[make_counter("INSTRUCTION", 3, 4)], name="A$1", source_filename="A.java")
+    c3 = DummyClass([], counters=[make_counter("LINE", 9, 9)], name="B", source_filename="B.java")
+
+    totals = updater._instruction_totals_by_sourcefile([c1, c2, c3])
+
+    assert totals == {"A.java": (4, 6)}
+
+
+def test_apply_rolls_up_nested_groups_and_removes_empty_ones(tmp_path):
+    path = write_report(tmp_path / "grouped.xml", 40, classes_per_package=10, packages_per_group=2)
+    report = JacocoParser(path).parse()
+    FilterEngine([FilterRule.parse("class:com.example.pkg2.*"), FilterRule.parse("class:com.example.pkg3.*")]).apply(
+        report
+    )
+
+    CounterUpdater().apply(report)
+
+    root = report.xml_element
+    aggregate = root.find("group")
+    assert [g.get("name") for g in aggregate.findall("group")] == ["module0"]
+    assert [g.name for g in report.groups[0].groups] == ["module0"]
+
+    def instruction(elem):
+        counter = elem.find("counter[@type='INSTRUCTION']")
+        return int(counter.get("missed")), int(counter.get("covered"))
+
+    packages = [instruction(p) for p in root.iter("package")]
+    expected = tuple(sum(values) for values in zip(*packages))
+    assert instruction(aggregate.find("group")) == expected
+    assert instruction(aggregate) == expected
+    assert instruction(root) == expected
+    assert aggregate.find("counter[@type='LINE']").get("covered") == "0"
+
+
+def test_aggregate_instruction_counters_keeps_element_order():
+    updater = CounterUpdater()
+
+    method = DummyMethod([make_counter("INSTRUCTION", 2, 3)], name="get")
+    instruction = make_counter("INSTRUCTION", 9, 9)
+    line = make_counter("LINE", 1, 1)
+    cls = DummyClass([method], counters=[instruction, line], name="C")
+    cls.xml_element.append(instruction.xml_element)
+    cls.xml_element.append(line.xml_element)
+
+    updater._aggregate_instruction_counters(parent=cls, children=cls.methods)
+    updater.flush()
+
+    assert [child.get("type") for child in cls.xml_element.iter("counter")] == ["INSTRUCTION", "LINE"]
+    assert cls.xml_element[1] is instruction.xml_element
+    assert instruction.xml_element.get("missed") == "2"
+
+
+def test_aggregate_instruction_counters_adds_missing_counter():
+    updater = CounterUpdater()
+
+    method = DummyMethod([make_counter("INSTRUCTION", 2, 3)], name="get")
+    cls = DummyClass([method], counters=[], name="C")
+
+    updater._aggregate_instruction_counters(parent=cls, children=cls.methods)
+
+    assert [(c.type, c.missed, c.covered) for c in cls.counters] == [("INSTRUCTION", 2, 3)]
+    assert cls.counters[0].xml_element.getparent() is cls.xml_element
+
+
+def test_apply_writes_only_changed_counters(tmp_path):
+    report = JacocoParser(write_report(tmp_path / "jacoco.xml", 5)).parse()
+    cls = report.packages[0].classes[0]
+    instruction = next(c for c in cls.counters if c.type == "INSTRUCTION")
+    elements = list(cls.xml_element)
+    updater = CounterUpdater()
+
+    updater.apply(report)
+
+    # Nothing was filtered, so the aggregated INSTRUCTION counters are unchanged and the elements stay in place
+    assert list(cls.xml_element) == elements
+    assert not instruction.dirty
+    assert updater.dirty == []
+    assert all(c.xml_element.get("missed") == "0" for c in cls.counters if c.type != "INSTRUCTION")
+
+
+def test_apply_removes_empty_packages_from_the_model(tmp_path):
+    report = JacocoParser(write_report(tmp_path / "jacoco.xml", 30, classes_per_package=10)).parse()
+    FilterEngine([FilterRule.parse("class:com.example.pkg1.*")]).apply(report)
+
+    CounterUpdater().apply(report)
+
+    names = [package.get("name") for package in report.xml_element.iter("package")]
+    assert "com/example/pkg1" not in names
+    assert [package.name for package in report.packages] == names
@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+from jacoco_filter.diff import diff_reports, diff_reports_streaming
+from jacoco_filter.main import main
+from jacoco_filter.pipeline import process_file
+from jacoco_filter.rules import FilterRule
+from tests.report_factory import write_report
+
+EXAMPLES = Path(__file__).parent.parent / "examples"
+RULES = [FilterRule.parse("class:*$Inner"), FilterRule.parse("method:get*")]
+
+
+@pytest.fixture
+def reports(tmp_path):
+    base = write_report(tmp_path / "base.xml", 40, classes_per_package=10)
+    # One more package, filtered: nested classes and getters are removed
+    head = write_report(tmp_path / "head.xml", 50, classes_per_package=10)
+    process_file(head, {"rules": RULES})
+    return base, tmp_path / "head.filtered.xml"
+
+
+def test_diff_levels(reports):
+    result = diff_reports(*reports)
+
+    assert [p["name"] for p in result["packages"]["added"]] == ["com.example.pkg4"]
+    assert result["packages"]["removed"] == []
+    assert len(result["packages"]["changed"]) == 4
+    assert {c["name"].split(".")[-1] for c in result["classes"]["removed"]} == {
+        f"Class{n}$Inner" for n in range(40) if n % 3 == 2
+    }
+    assert all(m["name"].split("#")[1].startswith("get") for m in result["methods"]["removed"])
+    assert result["report"]["INSTRUCTION"]["base"] != result["report"]["INSTRUCTION"]["head"]
+
+
+def test_streaming_diff_matches_in_memory_diff(reports):
+    assert diff_reports_streaming(*reports) == diff_reports(*reports)
+
+
+def test_diff_of_identical_grouped_reports_is_empty(tmp_path):
+    path = write_report(tmp_path / "a.xml", 40, classes_per_package=10, packages_per_group=2)
+
+    for result in (diff_reports(path, path), diff_reports_streaming(path, path)):
+        assert all(not entries for level in ("packages", "classes", "methods") for entries in result[level].values())
+        assert all(side["base"] == side["head"] for side in result["report"].values())
+
+
+def test_streaming_diff_of_unsorted_packages_matches_in_memory_diff(tmp_path):
+    # 'pkg10' sorts before 'pkg9' but is written after it
+    base = write_report(tmp_path / "base.xml", 11, classes_per_package=1)
+    head = write_report(tmp_path / "head.xml", 12, classes_per_package=1)
+    process_file(head, {"rules": RULES})
+
+    result = diff_reports_streaming(base, tmp_path / "head.filtered.xml")
+
+    assert result == diff_reports(base, tmp_path / "head.filtered.xml")
+    assert result["packages"]["changed"]
+
+
+def test_streaming_diff_of_example_report(tmp_path):
+    # The packages of the example are in analysis order, not sorted
+    shutil.copy(EXAMPLES / "atum-agent" / "jacoco.xml", tmp_path / "jacoco.xml")
+    process_file(tmp_path / "jacoco.xml", {"rules": RULES})
+    reports = (EXAMPLES / "atum-agent" / "jacoco.xml", tmp_path / "jacoco.filtered.xml")
+
+    assert diff_reports_streaming(*reports) == diff_reports(*reports)
+
+
+def test_main_diff_writes_json(reports, tmp_path, monkeypatch):
+    output = tmp_path / "diff.json"
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "diff", str(reports[0]), str(reports[1]), "-o", str(output)])
+    main()
+    assert json.loads(output.read_text()) == diff_reports(*reports)
+
+
+def test_main_diff_keeps_the_previous_output_if_interrupted(reports, tmp_path, monkeypatch):
+    output = tmp_path / "diff.json"
+    output.write_text("{}\n")
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "diff", str(reports[0]), str(reports[1]), "-o", str(output)])
+
+    def interrupted(src, dst):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(os, "replace", interrupted)
+    with pytest.raises((KeyboardInterrupt, SystemExit)):
+        main()
+
+    assert output.read_text() == "{}\n"
+    assert [path.name for path in tmp_path.glob("*diff.json*")] == ["diff.json"]
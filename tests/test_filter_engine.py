@@ -2,6 +2,8 @@ import pytest
 from lxml import etree
 
 from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.pipeline import select_engine
 from jacoco_filter.rules import FilterRule, ScopeEnum
 from jacoco_filter.model import JacocoReport, Counter
 
@@ -19,12 +21,15 @@ class DummyClass:
         self.methods = methods
         self.xml_element = etree.Element("class", name=name)
         self.sourcefilename = sourcefilename
+        self.removed_methods = []
         for method in methods:
             self.xml_element.append(method.xml_element)
 
 class DummyPackage:
     def __init__(self, classes):
+        self.name = "pkg"
         self.classes = classes
+        self.removed_classes = []
         self.xml_element = etree.Element("package", name="pkg")
         for cls in classes:
             self.xml_element.append(cls.xml_element)
@@ -105,10 +110,84 @@ def test_does_not_remove_if_no_match():
 
 def test_matches_applies_scope_filter():
     rule1 = FilterRule(scope=ScopeEnum.CLASS, pattern="Match")
-    rule2 = FilterRule(scope=ScopeEnum.METHOD, pattern="Ignore")
-    rule1.matches = lambda target: True
-    rule2.matches = lambda target: True  # should be skipped due to wrong scope
+    rule2 = FilterRule(scope=ScopeEnum.METHOD, pattern="Match")  # should be skipped due to wrong scope
 
     engine = FilterEngine([rule1, rule2])
-    assert engine._matches({"some": "thing"}, "class") is True
-    assert engine._matches({"some": "thing"}, "file") is False
+    target = {"fully_qualified_classname": "Match", "sourcefilename": "Match", "method_name": "Other"}
+    assert engine._matches(target, "class") is True
+    assert engine._matches(target, "file") is False
+    assert engine._matches(target, "method") is False
+
+
+NESTED_CLASSES = [
+    "com/example/Outer",
+    "com/example/Outer$",
+    "com/example/Outer$$anonfun$1",
+    "com/example/Outer$Inner",
+    "com/example/Outer$Inner$Deep",
+    "com/example/OuterHelper",
+    "com/example/OuterHelper$1",
+]
+
+
+def parse_nested_report(tmp_path):
+    classes = "".join(
+        f'<class name="{name}" sourcefilename="Outer.scala"><method name="run" desc="()V"/></class>'
+        for name in NESTED_CLASSES
+    )
+    path = tmp_path / "jacoco.xml"
+    path.write_text(f'<report name="r"><package name="com/example">{classes}</package></report>')
+    return JacocoParser(path).parse()
+
+
+def test_parser_indexes_nested_classes_by_owner(tmp_path):
+    package = parse_nested_report(tmp_path).packages[0]
+
+    assert {owner: [cls.name for cls in nested] for owner, nested in package.nested.items()} == {
+        "com/example/Outer": NESTED_CLASSES[1:5],
+        "com/example/OuterHelper": ["com/example/OuterHelper$1"],
+    }
+
+
+@pytest.mark.parametrize(
+    "rule, kept",
+    [
+        ("class[nested]:com.example.Outer", ["com/example/OuterHelper", "com/example/OuterHelper$1"]),
+        ("class:com.example.Outer", NESTED_CLASSES[1:]),
+        (
+            "class[nested]:*$Inner",
+            ["com/example/Outer", "com/example/Outer$", "com/example/Outer$$anonfun$1", *NESTED_CLASSES[5:]],
+        ),
+    ],
+)
+def test_nested_rule_removes_nested_classes_with_their_owner(tmp_path, rule, kept):
+    report = parse_nested_report(tmp_path)
+
+    engine = FilterEngine([FilterRule.parse(rule)])
+    engine.apply(report)
+
+    assert [cls.name for cls in report.packages[0].classes] == kept
+    assert [elem.get("name") for elem in report.packages[0].xml_element.iter("class")] == kept
+    assert engine.stats["classes_removed"] == len(NESTED_CLASSES) - len(kept)
+
+
+def test_nested_classes_are_not_matched_again(tmp_path, monkeypatch):
+    report = parse_nested_report(tmp_path)
+    engine = FilterEngine([FilterRule.parse("class[nested]:com.example.Outer")])
+    evaluated = []
+    original = engine.matcher.first_class_match
+    monkeypatch.setattr(engine.matcher, "first_class_match", lambda target: evaluated.append(target) or original(target))
+
+    engine.apply(report)
+
+    assert [target["fully_qualified_classname"] for target in evaluated] == [
+        "com.example.Outer",
+        "com.example.OuterHelper",
+        "com.example.OuterHelper$1",
+    ]
+
+
+@pytest.mark.parametrize("engine", ["tree", "lexical", "xslt"])
+def test_nested_rules_use_the_model_engine(engine):
+    assert select_engine({"engine": engine, "rules": [FilterRule.parse("class[nested]:*Fixture")]}) == "model"
+    assert select_engine({"engine": engine, "rules": [FilterRule.parse("class:*Fixture")]}) == engine
@@ -0,0 +1,135 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+from jacoco_filter.gate import CoverageGate, Threshold, parse_thresholds
+from jacoco_filter.main import main
+from jacoco_filter.pipeline import process_file
+from jacoco_filter.model import Class, Counter, JacocoReport, Package
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule
+from tests.report_factory import write_report
+
+EXAMPLES = Path(__file__).parent.parent / "examples"
+
+RULES = [FilterRule.parse("class:*$Inner"), FilterRule.parse("method:get*")]
+
+
+def counter(counter_type, missed, covered):
+    return Counter(counter_type, missed, covered, None)
+
+
+def test_parse_thresholds():
+    thresholds = parse_thresholds({"total": {"INSTRUCTION": 80}, "class": {"line": 50.5}})
+    assert thresholds == [Threshold("total", "INSTRUCTION", 80.0), Threshold("class", "LINE", 50.5)]
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"module": {"INSTRUCTION": 80}},
+        {"total": {"STATEMENT": 80}},
+        {"total": {"INSTRUCTION": 120}},
+        {"total": {"INSTRUCTION": "80"}},
+        {"total": 80},
+    ],
+)
+def test_parse_thresholds_rejects_invalid(config):
+    with pytest.raises(ValueError):
+        parse_thresholds(config)
+
+
+def test_gate_checks_every_level():
+    report = JacocoReport(
+        counters=[counter("INSTRUCTION", 30, 70)],
+        packages=[
+            Package(
+                name="com/example",
+                counters=[counter("INSTRUCTION", 30, 70)],
+                classes=[
+                    Class("com/example/A", "A.java", counters=[counter("INSTRUCTION", 25, 25)]),
+                    Class("com/example/B", "B.java", counters=[counter("INSTRUCTION", 5, 45)]),
+                    Class("com/example/Empty", "Empty.java", counters=[counter("INSTRUCTION", 0, 0)]),
+                ],
+            )
+        ],
+    )
+    gate = CoverageGate(parse_thresholds({"total": {"INSTRUCTION": 75}, "class": {"INSTRUCTION": 60}}))
+
+    violations = gate.check(report, "a.xml")
+
+    assert [str(v) for v in violations] == [
+        "a.xml: total INSTRUCTION 70.00% < 75.00%",
+        "a.xml: class com.example.A INSTRUCTION 50.00% < 60.00%",
+    ]
+    assert gate.violations == violations
+    assert gate.check(report, "a.xml", include_total=False) == violations[1:]
+
+
+def test_gate_without_violations(caplog):
+    gate = CoverageGate([Threshold("total", "INSTRUCTION", 0.0)])
+    assert gate.check(JacocoReport(counters=[counter("INSTRUCTION", 10, 0)]), "a.xml") == []
+    assert not gate.report_violations()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{"engine": "model"}, {"engine": "xslt"}, {"engine": "tree"}, {"stream": True}, {"recount": True}],
+)
+def test_gate_matches_written_report(tmp_path, options):
+    path = write_report(tmp_path / "jacoco.xml", 60, classes_per_package=20, packages_per_group=2)
+    thresholds = parse_thresholds({"total": {"INSTRUCTION": 99}, "package": {"INSTRUCTION": 60}, "class": {"INSTRUCTION": 55}})
+    args = {"rules": RULES, "thresholds": thresholds, "cache_dir": str(tmp_path / "cache"), **options}
+
+    gate = CoverageGate(thresholds)
+    process_file(path, args, gate)
+
+    # The same checks on the written output, which the gate never reads
+    expected = CoverageGate(thresholds)
+    expected.check(JacocoParser(tmp_path / "jacoco.filtered.xml").parse(), "")
+    assert gate.violations
+    assert sorted((v.level, v.name, v.actual) for v in gate.violations) == sorted(
+        (v.level, v.name, v.actual) for v in expected.violations
+    )
+
+
+def test_main_exits_on_violations(tmp_path, monkeypatch, caplog):
+    write_report(tmp_path / "jacoco.xml", 20)
+    (tmp_path / "jacoco_filter.toml").write_text(
+        'inputs = ["jacoco.xml"]\nrules = ["method:get*"]\n\n[thresholds]\ntotal = { INSTRUCTION = 100 }\n'
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "jacoco_filter.toml"])
+
+    with pytest.raises(SystemExit) as exc:
+        main()
+
+    assert exc.value.code == 2
+    assert "jacoco.filtered.xml: total INSTRUCTION" in caplog.text
+    assert (tmp_path / "jacoco.filtered.xml").is_file()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        [],
+        ["--output-profile", "slim"],
+        ["--drop-lines"],
+        ["--output-profile", "slim", "--drop-lines"],
+    ],
+)
+def test_main_checks_thresholds_with_the_lexical_engine(tmp_path, monkeypatch, caplog, options):
+    shutil.copy(EXAMPLES / "atum-agent" / "jacoco.xml", tmp_path / "jacoco.xml")
+    (tmp_path / "jacoco_filter.toml").write_text(
+        'inputs = ["jacoco.xml"]\nrules = ["class:*NoSuchClass"]\n\n[thresholds]\ntotal = { INSTRUCTION = 100 }\n'
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "--config", "jacoco_filter.toml", "--engine", "lexical", *options])
+
+    with pytest.raises(SystemExit) as exc:
+        main()
+
+    assert exc.value.code == 2
+    assert "jacoco.filtered.xml: total INSTRUCTION" in caplog.text
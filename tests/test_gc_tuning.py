@@ -0,0 +1,145 @@
+"""
+Tests of the GC-aware batch mode.
+
+The benchmark processes many generated reports in a fresh interpreter with and without '--batch-gc' and compares
+the wall time, the peak resident memory and the time spent in the cyclic garbage collector; it is marked
+'benchmark' and prints its numbers with '-s'.
+"""
+
+import gc
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from jacoco_filter.gc_tuning import frozen_heap, paused_gc
+from jacoco_filter.model import release_report
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.pipeline import process_inputs
+from jacoco_filter.rules import FilterRule
+from tests.report_factory import write_report
+
+pytest.importorskip("resource")
+
+N_FILES = 20
+N_CLASSES = 300
+
+_MEASURE = """
+import gc, json, resource, sys, time
+from pathlib import Path
+from jacoco_filter.pipeline import process_inputs
+from jacoco_filter.rules import FilterRule
+
+files = sorted(Path(sys.argv[1]).glob("r*[0-9].xml"))
+args = {
+    "batch_gc": sys.argv[2] == "batch",
+    "rules": [FilterRule.parse("class:*$Inner"), FilterRule.parse("method:get*")],
+}
+measured = {"collections": 0, "gc_time": 0.0}
+started = []
+
+def on_gc(phase, info):
+    if phase == "start":
+        started.append(time.perf_counter())
+    else:
+        measured["collections"] += 1
+        measured["gc_time"] += time.perf_counter() - started.pop()
+
+gc.callbacks.append(on_gc)
+start = time.perf_counter()
+process_inputs(files, args)
+measured["time"] = time.perf_counter() - start
+# ru_maxrss is reported in KiB on Linux and in bytes on macOS
+measured["peak"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (
+    1 if sys.platform == "darwin" else 1024
+)
+print(json.dumps(measured))
+"""
+
+
+def test_paused_gc_restores_the_collector():
+    assert gc.isenabled()
+    with paused_gc(True):
+        assert not gc.isenabled()
+    assert gc.isenabled()
+
+    with paused_gc(False):
+        assert gc.isenabled()
+
+
+def test_paused_gc_keeps_a_disabled_collector_disabled():
+    gc.disable()
+    try:
+        with paused_gc(True):
+            pass
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+
+def test_frozen_heap_unfreezes_on_exit():
+    with frozen_heap(True):
+        assert gc.get_freeze_count() > 0
+    assert gc.get_freeze_count() == 0
+
+
+def test_release_report_tears_down_model_and_tree(tmp_path):
+    report = JacocoParser(write_report(tmp_path / "jacoco.xml", 3)).parse()
+    root = report.xml_element
+
+    release_report(report)
+
+    assert report.packages == [] and report.counters == [] and report.xml_element is None
+    assert len(root) == 0
+
+
+def test_batch_mode_writes_the_same_outputs(tmp_path):
+    rules = [FilterRule.parse("class:*$Inner"), FilterRule.parse("method:get*")]
+    outputs = {}
+    for batch_gc in (False, True):
+        files = [write_report(tmp_path / f"r{i}.xml", 20, seed=i) for i in range(3)]
+        stats: dict = {}
+        process_inputs(files, {"rules": rules, "batch_gc": batch_gc}, stats=stats)
+        outputs[batch_gc] = ([(tmp_path / f"r{i}.filtered.xml").read_bytes() for i in range(3)], stats)
+
+    assert outputs[True] == outputs[False]
+    assert gc.isenabled() and gc.get_freeze_count() == 0
+
+
+@pytest.fixture(scope="module")
+def reports(tmp_path_factory) -> Path:
+    directory = tmp_path_factory.mktemp("batch")
+    for i in range(N_FILES):
+        write_report(directory / f"r{i}.xml", N_CLASSES, seed=i)
+    return directory
+
+
+def _measure(directory: Path, mode: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _MEASURE, str(directory), mode],
+        capture_output=True,
+        check=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.benchmark
+def test_batch_mode_benchmark(reports):
+    default = _measure(reports, "default")
+    batch = _measure(reports, "batch")
+
+    for mode, measured in (("default", default), ("batch", batch)):
+        print(
+            f"{mode:>8}: {measured['time'] * 1000:7.1f} ms, peak RSS {measured['peak'] >> 20} MiB, "
+            f"{measured['collections']} collection(s) taking {measured['gc_time'] * 1000:.1f} ms"
+        )
+
+    # One collection of the young generations per report instead of the automatic ones during model construction
+    assert batch["collections"] <= N_FILES + 2 < default["collections"]
+    assert batch["gc_time"] < default["gc_time"]
+    # Releasing every report after writing keeps the peak at that of the largest report
+    assert batch["peak"] <= default["peak"] * 1.1
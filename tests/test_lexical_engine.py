@@ -0,0 +1,119 @@
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.lexical_engine import LexicalFilterEngine, UnsupportedInputError
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.serializer import ReportSerializer
+from tests.report_factory import write_report
+
+EXAMPLES = Path(__file__).parent.parent / "examples"
+
+RULES = [
+    FilterRule.parse("file:*Spec.scala"),
+    FilterRule.parse("file:Source1?.java"),
+    FilterRule.parse("class:*$Inner"),
+    FilterRule.parse("class:com.example.MyClass"),
+    FilterRule.parse("class:za.co.absa.atum.agent.model.*"),
+    FilterRule.parse("class:com.example.pkg2.*"),
+]
+
+
+def canonical(path: Path) -> bytes:
+    # Counter positions and whitespace may differ between engines; the values may not
+    root = etree.parse(str(path)).getroot()
+    for elem in root.iter():
+        elem.text = (elem.text or "").strip() or None
+        elem.tail = None
+    for elem in list(root.iter()):
+        counters = sorted(elem.findall("counter"), key=lambda c: c.get("type"))
+        for counter in counters:
+            elem.remove(counter)
+            elem.append(counter)
+    return etree.tostring(root)
+
+
+def run_model(path: Path, out: Path) -> dict:
+    report = JacocoParser(path).parse()
+    engine = FilterEngine(RULES)
+    engine.apply(report)
+    CounterUpdater().apply(report)
+    ReportSerializer(report).write_to_file(out)
+    return engine.stats
+
+
+@pytest.mark.parametrize(
+    "report", ["atum-agent/jacoco.xml", "atum-reader/jacoco.xml", "module_A/target/sample.xml", "generated"]
+)
+def test_lexical_engine_matches_model_engine(report, tmp_path):
+    if report == "generated":
+        path = write_report(tmp_path / "generated.xml", 150, classes_per_package=30)
+    else:
+        path = EXAMPLES / report
+
+    model_stats = run_model(path, tmp_path / "model.xml")
+    lexical_stats = LexicalFilterEngine(RULES).apply(path, tmp_path / "lexical.xml")
+
+    assert lexical_stats == model_stats
+    assert canonical(tmp_path / "lexical.xml") == canonical(tmp_path / "model.xml")
+
+
+def test_lexical_engine_keeps_untouched_bytes(tmp_path):
+    path = write_report(tmp_path / "generated.xml", 20, classes_per_package=10)
+    out = tmp_path / "out.xml"
+
+    LexicalFilterEngine([FilterRule.parse("class:NothingMatches")]).apply(path, out)
+
+    assert out.read_bytes().startswith(path.read_bytes()[:120])
+
+
+def test_supports_only_file_and_class_rules():
+    assert LexicalFilterEngine.supports([FilterRule.parse("file:*.java"), FilterRule.parse("class:a.*")])
+    assert not LexicalFilterEngine.supports([FilterRule.parse("method:get*")])
+
+
+@pytest.mark.parametrize(
+    "content, reason",
+    [
+        ("<report><!-- x --><package name='p'></package></report>", "comments"),
+        ("<report><group name='g'><package name='p'></package></group></report>", "group"),
+        ("<?xml version='1.0' encoding='ISO-8859-1'?><report/>", "encoding"),
+        ("<!DOCTYPE report [<!ENTITY a 'b'>]><report/>", "internal DTD subset"),
+        (
+            "<report><package name='p'><class name='p/A'><counter missed='1' type='LINE' covered='1'/></class>"
+            "</package></report>",
+            "unexpected attribute layout",
+        ),
+    ],
+)
+def test_unsupported_input_raises(tmp_path, content, reason):
+    path = tmp_path / "in.xml"
+    path.write_text(content)
+
+    with pytest.raises(UnsupportedInputError, match=reason):
+        LexicalFilterEngine([FilterRule.parse("class:x")]).apply(path, tmp_path / "out.xml")
+
+    assert not (tmp_path / "out.xml").exists()
+
+
+def test_process_file_falls_back_to_tree_engine(tmp_path, caplog):
+    from jacoco_filter.pipeline import process_file
+
+    caplog.set_level("INFO")
+    path = tmp_path / "jacoco.xml"
+    path.write_text(
+        "<report><!-- generated --><package name='p'><class name='p/A' sourcefilename='A.java'>"
+        "<method name='run' desc='()V'><counter type='INSTRUCTION' missed='1' covered='2'/></method>"
+        "<counter type='INSTRUCTION' missed='1' covered='2'/></class>"
+        "<counter type='INSTRUCTION' missed='1' covered='2'/></package></report>"
+    )
+
+    stats = process_file(path, {"engine": "lexical", "rules": [FilterRule.parse("class:p.B")]})
+
+    assert stats == {"classes_removed": 0, "methods_removed": 0}
+    assert "falling back to the tree engine" in caplog.text
+    assert (tmp_path / "jacoco.filtered.xml").exists()
@@ -0,0 +1,86 @@
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.line_index import SourceLines, released_lines
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule
+from tests.report_factory import write_report
+
+
+def line_numbers(report, sourcefile_name: str) -> list[int]:
+    sourcefile = report.xml_element.find(f"package/sourcefile[@name='{sourcefile_name}']")
+    return [int(line.get("nr")) for line in sourcefile.findall("line")]
+
+
+def test_source_lines_span_and_between():
+    lines = SourceLines([14, 10, 11, 12, 15])
+
+    assert len(lines) == 5
+    assert list(lines.span(11, 2)) == [11, 12]
+    assert list(lines.span(13, 5)) == [14, 15]
+    assert list(lines.between(11, 14)) == [11, 12]
+    assert list(lines.between(12, None)) == [12, 14, 15]
+
+
+def anonymous_class_report(tmp_path):
+    # A.foo has the lines 10, 11, 14 and 15; the anonymous class A$1 created in it has the lines 12 and 13
+    path = tmp_path / "report.xml"
+    path.write_text(
+        '<report name="r"><package name="p">'
+        '<class name="p/A" sourcefilename="A.java">'
+        '<method name="foo" desc="()V" line="10"><counter type="LINE" missed="0" covered="4"/></method>'
+        '<method name="bar" desc="()V" line="20"><counter type="LINE" missed="1" covered="0"/></method>'
+        "</class>"
+        '<class name="p/A$1" sourcefilename="A.java">'
+        '<method name="run" desc="()V" line="12"><counter type="LINE" missed="0" covered="2"/></method>'
+        "</class>"
+        '<sourcefile name="A.java">'
+        + "".join(f'<line nr="{nr}" mi="0" ci="1" mb="0" cb="0"/>' for nr in (10, 11, 12, 13, 14, 15))
+        + '<line nr="20" mi="1" ci="0" mb="0" cb="0"/>'
+        "</sourcefile></package></report>"
+    )
+    return JacocoParser(path).parse()
+
+
+def test_lines_of_a_kept_method_after_an_anonymous_class_are_kept(tmp_path):
+    report = anonymous_class_report(tmp_path)
+
+    FilterEngine([FilterRule.parse("class:*$1")], True).apply(report)
+
+    # 12 and 13 may be lines of foo as well, and the lines after the anonymous class are
+    assert line_numbers(report, "A.java") == [10, 11, 12, 13, 14, 15, 20]
+
+
+def test_lines_claimed_only_by_removed_methods_are_released(tmp_path):
+    report = anonymous_class_report(tmp_path)
+
+    FilterEngine([FilterRule.parse("method:A#bar"), FilterRule.parse("class:*$1")], True).apply(report)
+    released = released_lines(report.packages[0])
+
+    assert released.by_sourcefile == {"A.java": {20}}
+    assert released.by_class == {id(report.packages[0].classes[0]): {20}}
+    assert line_numbers(report, "A.java") == [10, 11, 12, 13, 14, 15]
+
+
+def test_filter_engine_prunes_lines_of_removed_methods_and_classes(tmp_path):
+    # Every method owns 3 lines followed by one empty line
+    path = write_report(tmp_path / "report.xml", 4, methods_per_class=2, lines_per_method=3)
+    report = JacocoParser(path).parse()
+    before = line_numbers(report, "Source0.java")
+
+    engine = FilterEngine([FilterRule.parse("method:Class0#getValue*"), FilterRule.parse("class:*Class3")], True)
+    engine.apply(report)
+
+    # Class0: getValue0 at 10 (removed), method1 at 14; Class1: getValue0 at 22, method1 at 26
+    assert before == [10, 11, 12, 14, 15, 16, 22, 23, 24, 26, 27, 28]
+    assert line_numbers(report, "Source0.java") == [14, 15, 16, 22, 23, 24, 26, 27, 28]
+    # Class3 is removed, Class2 keeps its lines
+    assert line_numbers(report, "Source1.java") == [10, 11, 12, 14, 15, 16]
+
+
+def test_filter_engine_keeps_lines_by_default(tmp_path):
+    path = write_report(tmp_path / "report.xml", 2, methods_per_class=2)
+    report = JacocoParser(path).parse()
+    before = line_numbers(report, "Source0.java")
+
+    FilterEngine([FilterRule.parse("method:getValue*")]).apply(report)
+
+    assert line_numbers(report, "Source0.java") == before
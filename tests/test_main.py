@@ -35,7 +35,7 @@ def test_main_success(monkeypatch, tmp_path, caplog):
         def parse(self): return dummy_report
 
     class DummyEngine:
-        def __init__(self, rules): self.stats = {"classes_removed": 1, "methods_removed": 2}
+        def __init__(self, rules, prune_lines=False): self.stats = {"classes_removed": 1, "methods_removed": 2}
         def apply(self, report): pass
 
     class DummyUpdater:
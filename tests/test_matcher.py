@@ -0,0 +1,133 @@
+import json
+import logging
+
+import pytest
+
+from jacoco_filter.matcher import RuleMatcher, load_compiled_rules, matcher_for
+from jacoco_filter.rules import FilterRule, ScopeEnum
+
+RULES = [
+    FilterRule.parse("file:*Spec.scala"),
+    FilterRule.parse("class:com.example.internal.*"),
+    FilterRule.parse("class:*$Inner"),
+    FilterRule.parse("method:get*"),
+    FilterRule.parse("method:Helper#set?alue"),
+    FilterRule.parse("method:com.example.*Service#handle[AB]*"),
+]
+
+CLASSES = [
+    ("com.example.internal.Foo", "Foo.java"),
+    ("com.example.Foo$Inner", "Foo.java"),
+    ("com.example.FooSpec", "FooSpec.scala"),
+    ("com.example.Helper", "Helper.java"),
+    ("com.example.api.UserService", "UserService.java"),
+]
+
+METHODS = ["getValue", "setValue", "setXalue", "handleA", "handleC", "<init>", "toString"]
+
+
+def find_matching_rule(rules, target, scope):
+    # Oracle: the first rule of the scope matching on its own, without the combined expressions
+    return next((rule for rule in rules if rule.scope == scope and rule.matches(target)), None)
+
+
+@pytest.mark.parametrize("fqcn, sourcefilename", CLASSES)
+def test_rule_matcher_agrees_with_rules(fqcn, sourcefilename):
+    matcher = RuleMatcher(RULES)
+    class_attrs = {"fully_qualified_classname": fqcn, "sourcefilename": sourcefilename}
+    expected = find_matching_rule(RULES, class_attrs, "class") or find_matching_rule(RULES, class_attrs, "file")
+    assert matcher.class_removed(fqcn, sourcefilename) is (expected is not None)
+
+    simple = fqcn.split(".")[-1]
+    for method in METHODS:
+        method_attrs = {"fully_qualified_classname": fqcn, "simple_class_name": simple, "method_name": method}
+        expected = find_matching_rule(RULES, method_attrs, "method")
+        assert matcher.method_removed(fqcn, simple, method) is (expected is not None), method
+
+
+def test_rule_matcher_without_rules_removes_nothing():
+    matcher = RuleMatcher([])
+    assert not matcher.class_removed("a.B", "B.java")
+    assert not matcher.method_removed("a.B", "B", "get")
+
+
+def test_matching_positions():
+    matcher = RuleMatcher(RULES)
+    target = {"fully_qualified_classname": "com.example.internal.A$Inner", "sourcefilename": "A.java"}
+    assert matcher.matching_positions(target, (ScopeEnum.CLASS, ScopeEnum.FILE)) == [1, 2]
+
+
+@pytest.mark.parametrize("fqcn, sourcefilename", CLASSES)
+def test_first_match_agrees_with_find_matching_rule(fqcn, sourcefilename):
+    matcher = RuleMatcher(RULES)
+    class_attrs = {"fully_qualified_classname": fqcn, "sourcefilename": sourcefilename}
+    for scope in ("class", "file"):
+        assert matcher.first_match(class_attrs, scope) == find_matching_rule(RULES, class_attrs, scope)
+
+    simple = fqcn.split(".")[-1]
+    for method in METHODS:
+        method_attrs = {"fully_qualified_classname": fqcn, "simple_class_name": simple, "method_name": method}
+        assert matcher.first_match(method_attrs, "method") == find_matching_rule(RULES, method_attrs, "method")
+
+
+def test_matcher_round_trip():
+    restored = RuleMatcher.from_dict(json.loads(json.dumps(RuleMatcher(RULES).to_dict())))
+    assert restored.rules == RULES
+    assert restored.class_removed("com.example.Foo$Inner", "Foo.java")
+    assert restored.method_removed("com.example.Helper", "Helper", "setValue")
+    assert not restored.method_removed("com.example.Helper", "Helper", "toString")
+
+
+def test_load_compiled_rules_reuses_artifact(tmp_path):
+    calls = []
+
+    def parse():
+        calls.append(1)
+        return [FilterRule.parse("class:*Test"), FilterRule.parse("method:Helper#get*")]
+
+    first = load_compiled_rules(["file", "rules v1"], parse, tmp_path)
+    second = load_compiled_rules(["file", "rules v1"], parse, tmp_path)
+    assert first == second
+    assert len(calls) == 1
+    assert len(list((tmp_path / "rules").glob("*.json"))) == 1
+
+    # A changed source has a new key
+    load_compiled_rules(["file", "rules v2"], parse, tmp_path)
+    assert len(calls) == 2
+
+
+def test_load_compiled_rules_registers_matcher(tmp_path):
+    rules = load_compiled_rules(["config", "class:*Loaded"], lambda: [FilterRule.parse("class:*Loaded")], tmp_path)
+    matcher = matcher_for(rules)
+    assert matcher_for(list(rules)) is matcher
+    assert matcher.first_match({"fully_qualified_classname": "a.Loaded"}, "class") == rules[0]
+
+
+def test_load_compiled_rules_ignores_corrupt_artifact(tmp_path, caplog):
+    parse = lambda: [FilterRule.parse("class:*Test")]
+    load_compiled_rules(["file", "x"], parse, tmp_path)
+    artifact = next((tmp_path / "rules").glob("*.json"))
+    artifact.write_text("{not json")
+
+    assert load_compiled_rules(["file", "x"], parse, tmp_path) == parse()
+    assert "Ignoring unreadable compiled rules" in caplog.text
+    assert json.loads(artifact.read_text())["rules"] == [["class", "*Test", False]]
+
+
+def test_load_compiled_rules_without_cache_dir():
+    assert load_compiled_rules(["file", "x"], lambda: [], None) == []
+
+
+def test_load_compiled_rules_logs_the_parse_warnings_again(tmp_path, caplog):
+    def parse():
+        logging.getLogger("jacoco_filter.cli").warning("Skipping invalid rule rule: '%s'", "nonsense")
+        return [FilterRule.parse("class:*Test")]
+
+    load_compiled_rules(["config", "nonsense", "class:*Test"], parse, tmp_path)
+    caplog.clear()
+
+    with caplog.at_level(logging.WARNING):
+        rules = load_compiled_rules(["config", "nonsense", "class:*Test"], lambda: pytest.fail("parsed"), tmp_path)
+
+    assert rules == [FilterRule.parse("class:*Test")]
+    assert "Skipping invalid rule rule: 'nonsense'" in caplog.text
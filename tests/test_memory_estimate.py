@@ -0,0 +1,63 @@
+"""
+Calibration of the scheduler memory estimates: every engine processes a generated report in a fresh interpreter,
+and the growth of its peak resident memory must stay within the estimate of jacoco_filter.scheduler. The peak
+depends on the allocator and the platform, so the whole module is a 'benchmark'; '-s' prints the measured bytes
+per input byte, from which the factors of the estimate are derived.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from jacoco_filter.scheduler import estimate_memory
+from tests.report_factory import write_report
+
+pytest.importorskip("resource")
+pytestmark = pytest.mark.benchmark
+
+N_CLASSES = 2000
+
+_MEASURE = """
+import json, resource, sys
+from pathlib import Path
+from jacoco_filter.pipeline import process_file
+from jacoco_filter.rules import FilterRule
+
+path, engine, cache_dir = Path(sys.argv[1]), sys.argv[2], sys.argv[3]
+rules = ["class:*$Inner"] if engine == "lexical" else ["class:*$Inner", "method:get*"]
+args = {
+    "engine": "model" if engine == "stream" else engine,
+    "stream": engine == "stream",
+    "rules": [FilterRule.parse(rule) for rule in rules],
+    "cache_dir": cache_dir,
+}
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+process_file(path, args)
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is reported in KiB on Linux and in bytes on macOS
+print(json.dumps((after - before) * (1 if sys.platform == "darwin" else 1024)))
+"""
+
+
+@pytest.fixture(scope="module")
+def report(tmp_path_factory) -> Path:
+    return write_report(tmp_path_factory.mktemp("memory") / "report.xml", N_CLASSES)
+
+
+@pytest.mark.parametrize("engine", ["model", "tree", "xslt", "lexical", "stream"])
+def test_memory_estimate_covers_measured_peak(engine, report, tmp_path):
+    result = subprocess.run(
+        [sys.executable, "-c", _MEASURE, str(report), engine, str(tmp_path / "cache")],
+        capture_output=True,
+        check=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    size = report.stat().st_size
+
+    print(f"{engine:>8}: {measured / size:6.2f} bytes per input byte")
+    assert measured <= estimate_memory(size, engine)
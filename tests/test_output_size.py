@@ -0,0 +1,73 @@
+"""
+Output size benchmark: the filtered report of a generated project is written with every output profile, and
+the file size and the parse time of a downstream consumer are compared with the full profile. The sizes are
+deterministic and always checked; the parse time is a 'benchmark'.
+"""
+
+import math
+import time
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.serializer import OutputOptions, ReportSerializer
+from tests.report_factory import write_report
+
+N_CLASSES = 1500
+REPEATS = 5
+RULES = [FilterRule.parse("class:*$Inner"), FilterRule.parse("method:get*")]
+
+PROFILES = {
+    "full": OutputOptions(),
+    "slim": OutputOptions("slim"),
+    "slim+drop-lines": OutputOptions("slim", drop_lines=True),
+}
+
+
+def _consumer_parse_time(path) -> float:
+    best = math.inf
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        etree.parse(str(path))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.fixture(scope="module")
+def outputs(tmp_path_factory) -> dict[str, Path]:
+    tmp_path = tmp_path_factory.mktemp("output_size")
+    path = write_report(tmp_path / "report.xml", N_CLASSES)
+    result = {}
+
+    for name, options in PROFILES.items():
+        report = JacocoParser(path).parse()
+        FilterEngine(RULES).apply(report)
+        CounterUpdater().apply(report)
+        result[name] = tmp_path / f"{name}.xml"
+        ReportSerializer(report, options).write_to_file(result[name])
+
+    full_size = result["full"].stat().st_size
+    for name, out_path in result.items():
+        size = out_path.stat().st_size
+        print(f"{name:>16}: {size:>10} bytes ({100 * size / full_size:5.1f}%)")
+    return result
+
+
+def test_slim_profile_shrinks_output(outputs):
+    full_size = outputs["full"].stat().st_size
+    assert outputs["slim"].stat().st_size < 0.8 * full_size
+    assert outputs["slim+drop-lines"].stat().st_size < 0.5 * full_size
+
+
+@pytest.mark.benchmark
+def test_slim_profile_parses_faster(outputs):
+    timings = {name: _consumer_parse_time(path) for name, path in outputs.items()}
+    for name, seconds in timings.items():
+        print(f"{name:>16}: parse {1000 * seconds:7.2f} ms ({100 * seconds / timings['full']:5.1f}%)")
+
+    assert timings["slim+drop-lines"] < timings["full"]
@@ -54,3 +54,34 @@ def test_jacoco_parser_parses_structure(tmp_path):
 
     assert len(pkg.counters) == 1
     assert pkg.counters[0].type == "BRANCH"
+
+
+def test_jacoco_parser_parses_nested_groups(tmp_path):
+    xml_path = tmp_path / "aggregate.xml"
+    xml_path.write_text(
+        """
+    <report name="aggregate">
+      <group name="app">
+        <group name="core">
+          <package name="com/example/core">
+            <class name="com/example/core/A" sourcefilename="A.java"/>
+          </package>
+          <counter type="INSTRUCTION" missed="1" covered="2"/>
+        </group>
+        <package name="com/example/app"/>
+        <counter type="INSTRUCTION" missed="1" covered="2"/>
+      </group>
+    </report>
+    """.strip()
+    )
+
+    report = JacocoParser(xml_path).parse()
+
+    assert report.packages == []
+    app = report.groups[0]
+    assert app.name == "app"
+    assert [p.name for p in app.packages] == ["com/example/app"]
+    assert app.counters[0].covered == 2
+    core = app.groups[0]
+    assert core.name == "core"
+    assert core.packages[0].classes[0].name == "com/example/core/A"
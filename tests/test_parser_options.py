@@ -0,0 +1,124 @@
+"""
+Parser settings benchmark: the generated corpus, as written and re-indented, is parsed into the report model with
+every parser option, and the parse time and the resident memory of the tree and model are compared with the lxml
+defaults. The memory is measured in a fresh interpreter from /proc/self/statm, since the peak RSS of a child
+process on Linux starts at that of its parent.
+
+Only the check that every option builds the same model runs by default; the measurements are a 'benchmark'.
+"""
+
+import json
+import math
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.report_input import ParserOptions, ReportInput
+from tests.report_factory import write_report
+
+STATM = Path("/proc/self/statm")
+pytestmark = pytest.mark.skipif(not STATM.exists(), reason="/proc/self/statm is not available")
+
+N_CLASSES = 1000
+REPEATS = 3
+
+OPTIONS = {
+    "tuned": {},
+    "keep-blank-text": {"remove_blank_text": False},
+    "huge-tree": {"huge_tree": True},
+    "intern-attributes": {"intern_attributes": True},
+}
+
+_MEASURE = """
+import json, os, sys
+from pathlib import Path
+from lxml import etree
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.report_input import ParserOptions
+
+def resident():
+    return int(Path("/proc/self/statm").read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+path, options = Path(sys.argv[1]), json.loads(sys.argv[2])
+before = resident()
+if options is None:
+    # The lxml defaults, a new parser per report
+    report = JacocoParser(path).build_report(etree.parse(str(path)).getroot())
+else:
+    report = JacocoParser(path, options=ParserOptions(**options)).parse()
+print(json.dumps(resident() - before))
+"""
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory) -> dict[str, Path]:
+    directory = tmp_path_factory.mktemp("parser")
+    written = write_report(directory / "written.xml", N_CLASSES)
+    indented = directory / "indented.xml"
+    tree = etree.parse(str(written), etree.XMLParser(remove_blank_text=True))
+    tree.write(str(indented), encoding="utf-8", xml_declaration=True, pretty_print=True)
+    return {"written": written, "indented": indented}
+
+
+def _parse_time(path: Path, options) -> float:
+    best = math.inf
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        if options is None:
+            etree.parse(str(path))
+        else:
+            with ReportInput(path) as report_input:
+                report_input.parse_tree(options=ParserOptions(**options))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _model_memory(path: Path, options) -> int:
+    result = subprocess.run(
+        [sys.executable, "-c", _MEASURE, str(path), json.dumps(options)],
+        capture_output=True,
+        check=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.benchmark
+def test_parser_options_benchmark(corpus):
+    results = {}
+    for corpus_name, path in corpus.items():
+        for name, options in [("lxml-defaults", None), *OPTIONS.items()]:
+            results[corpus_name, name] = (_parse_time(path, options), _model_memory(path, options))
+            seconds, memory = results[corpus_name, name]
+            print(f"{corpus_name:>8} {name:>18}: parse {seconds * 1000:6.1f} ms, tree and model {memory / (1 << 20):.1f} MiB")
+
+    # Blank text nodes of indented reports are dropped instead of being kept in the tree
+    assert results["indented", "tuned"][1] <= results["indented", "keep-blank-text"][1]
+    # One string per distinct counter type and descriptor instead of one per attribute read
+    assert results["written", "intern-attributes"][1] <= results["written", "tuned"][1] * 1.05
+
+
+def test_parser_options_build_the_same_model(corpus):
+    reports = [JacocoParser(corpus["indented"], options=ParserOptions(**options)).parse() for options in OPTIONS.values()]
+
+    def summary(report):
+        return [
+            (cls.name, cls.source_filename, [(m.name, m.desc) for m in cls.methods], [c.type for c in cls.counters])
+            for package in report.packages
+            for cls in package.classes
+        ]
+
+    assert all(summary(report) == summary(reports[0]) for report in reports)
+
+
+def test_interned_attributes_share_one_string(corpus):
+    report = JacocoParser(corpus["written"], options=ParserOptions(intern_attributes=True)).parse()
+    types = [counter.type for package in report.packages for cls in package.classes for counter in cls.counters]
+
+    assert len({id(value) for value in types}) == len(set(types))
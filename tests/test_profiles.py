@@ -0,0 +1,124 @@
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.profiles import ProfileMatcher, TreeSnapshot, process_profiles, profile_output_path
+from jacoco_filter.recount import FullCounterUpdater
+from jacoco_filter.rule_stats import RULE_STATS
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.serializer import OutputOptions, ReportSerializer
+from tests.report_factory import write_report
+
+PROFILES = {
+    "strict": [
+        FilterRule.parse("class:*$Inner"),
+        FilterRule.parse("method:get*"),
+        FilterRule.parse("file:Source1?.java"),
+    ],
+    "lenient": [FilterRule.parse("class:*$Inner")],
+    "packages": [FilterRule.parse("class:com.example.pkg1.*"), FilterRule.parse("method:Class2*#method*")],
+}
+
+
+def run_single(path: Path, rules, out: Path, updater, prune_lines=False, output=None) -> tuple[bytes, dict]:
+    report = JacocoParser(path).parse()
+    engine = FilterEngine(rules, prune_lines)
+    engine.apply(report)
+    updater.apply(report)
+    ReportSerializer(report, output).write_to_file(out)
+    return out.read_bytes(), engine.stats
+
+
+def test_profile_matcher_returns_bitmask_per_profile():
+    matcher = ProfileMatcher(PROFILES)
+
+    assert matcher.bits == {"strict": 1, "lenient": 2, "packages": 4}
+    # 'class:*$Inner' is shared by two profiles and evaluated once
+    assert len(matcher.class_rules) == 3
+    attrs = {"fully_qualified_classname": "com.example.pkg1.Class1$Inner", "sourcefilename": "Source0.java"}
+    assert matcher.class_mask(attrs) == 0b111
+    attrs = {"fully_qualified_classname": "com.example.pkg0.Class0", "sourcefilename": "Source12.java"}
+    assert matcher.class_mask(attrs) == 0b001
+    method = {"fully_qualified_classname": "com.example.pkg0.Class2", "simple_class_name": "Class2"}
+    assert matcher.method_mask({**method, "method_name": "getValue0"}) == 0b001
+    assert matcher.method_mask({**method, "method_name": "method1"}) == 0b100
+
+
+@pytest.mark.parametrize("recount, prune_lines", [(False, False), (True, True)])
+def test_profiles_match_separate_runs(recount, prune_lines, tmp_path):
+    updater_class = FullCounterUpdater if recount else CounterUpdater
+    path = write_report(tmp_path / "report.xml", 120, classes_per_package=20, packages_per_group=3)
+
+    stats = process_profiles(path, PROFILES, updater_class(), prune_lines)
+
+    assert list(stats) == list(PROFILES)
+    for name, rules in PROFILES.items():
+        expected, expected_stats = run_single(path, rules, tmp_path / f"{name}.xml", updater_class(), prune_lines)
+        assert profile_output_path(path, name).read_bytes() == expected
+        assert stats[name] == expected_stats
+
+
+def test_profiles_with_slim_output_match_separate_runs(tmp_path):
+    path = write_report(tmp_path / "report.xml", 60, classes_per_package=20)
+    output = OutputOptions("slim", drop_lines=True)
+
+    process_profiles(path, PROFILES, output=output)
+
+    for name, rules in PROFILES.items():
+        expected, _ = run_single(path, rules, tmp_path / f"{name}.xml", CounterUpdater(), output=output)
+        assert profile_output_path(path, name).read_bytes() == expected
+
+
+def test_profiles_recounted_after_slim_output_match_separate_runs(tmp_path):
+    path = write_report(tmp_path / "report.xml", 60, classes_per_package=20, lines_per_method=1)
+    output = OutputOptions("slim")
+    # Only the getters are kept by the first profile, so the BRANCH counters of many sourcefiles become 0/0 and
+    # are left out of its slim output
+    profiles = {"getters": [FilterRule.parse("method:method*")], "lenient": PROFILES["lenient"]}
+
+    process_profiles(path, profiles, FullCounterUpdater(), output=output)
+
+    for name, rules in profiles.items():
+        expected, _ = run_single(path, rules, tmp_path / f"{name}.xml", FullCounterUpdater(), output=output)
+        assert profile_output_path(path, name).read_bytes() == expected
+
+
+def test_profiles_count_rule_evaluations_as_separate_runs(tmp_path):
+    path = write_report(tmp_path / "report.xml", 60, classes_per_package=20)
+
+    def evaluations():
+        return {rule: (c["evaluations"], c["matches"], c["removals"]) for rule, c in RULE_STATS.rules.items()}
+
+    RULE_STATS.reset()
+    RULE_STATS.enabled = True
+    try:
+        process_profiles(path, PROFILES)
+        counted = evaluations()
+        RULE_STATS.reset()
+        for name, rules in PROFILES.items():
+            run_single(path, rules, tmp_path / f"{name}.xml", CounterUpdater())
+        expected = evaluations()
+    finally:
+        RULE_STATS.enabled = False
+        RULE_STATS.reset()
+
+    assert counted == expected
+
+
+def test_tree_snapshot_restores_tree(tmp_path):
+    path = write_report(tmp_path / "report.xml", 40, classes_per_package=10)
+    root = JacocoParser(path).parse_tree()
+    original = etree.tostring(root)
+    snapshot = TreeSnapshot(root, include_sourcefiles=True)
+
+    report = JacocoParser(path).build_report(root)
+    FilterEngine(PROFILES["strict"] + PROFILES["packages"], True).apply(report)
+    CounterUpdater().apply(report)
+    assert etree.tostring(root) != original
+
+    snapshot.restore()
+    assert etree.tostring(root) == original
@@ -0,0 +1,162 @@
+import shutil
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.pipeline import process_file
+from jacoco_filter.recount import COUNTER_TYPES, FullCounterUpdater
+from jacoco_filter.rules import FilterRule, load_filter_rules
+from tests.report_factory import write_report
+
+EXAMPLES = Path(__file__).parent.parent / "examples"
+
+
+def counters_of(elem) -> dict:
+    # Counters with a zero total are omitted in JaCoCo reports
+    counters = dict.fromkeys(COUNTER_TYPES, (0, 0))
+    counters.update({c.get("type"): (int(c.get("missed")), int(c.get("covered"))) for c in elem.findall("counter")})
+    return counters
+
+
+def snapshot(root) -> dict:
+    result = {"report": counters_of(root)}
+    for pkg in root.findall("package"):
+        result[pkg.get("name")] = counters_of(pkg)
+        for child in pkg:
+            if child.tag in ("class", "sourcefile"):
+                result[f"{child.tag}:{child.get('name')}"] = counters_of(child)
+    return result
+
+
+def test_full_recount_without_rules_reproduces_original_counters(tmp_path):
+    path = write_report(tmp_path / "report.xml", 40, classes_per_package=10)
+    original = snapshot(JacocoParser(path).parse_tree())
+
+    report = JacocoParser(path).parse()
+    FullCounterUpdater().apply(report)
+
+    assert snapshot(report.xml_element) == original
+
+
+def test_full_recount_after_filtering_matches_reduced_report(tmp_path):
+    path = write_report(tmp_path / "report.xml", 6, methods_per_class=2, classes_per_package=6)
+    report = JacocoParser(path).parse()
+    FilterEngine([FilterRule.parse("class:*Class1"), FilterRule.parse("method:Class0#method1")]).apply(report)
+    FullCounterUpdater().apply(report)
+    counters = snapshot(report.xml_element)
+
+    root = JacocoParser(path).parse_tree()
+    original = snapshot(root)
+    method_counters = counters_of(root.find("package/class[@name='com/example/pkg0/Class0']/method[@name='getValue0']"))
+
+    # Class0 keeps only getValue0, whose counters become the class counters
+    class0 = counters["class:com/example/pkg0/Class0"]
+    for counter_type in ("INSTRUCTION", "BRANCH", "LINE", "COMPLEXITY", "METHOD"):
+        assert class0[counter_type] == method_counters[counter_type]
+    assert class0["CLASS"] == ((0, 1) if method_counters["METHOD"][1] else (1, 0))
+
+    # Source0.java holds Class0 and the removed Class1
+    source0 = counters["sourcefile:Source0.java"]
+    assert source0["LINE"] == class0["LINE"]
+    assert source0["BRANCH"] == class0["BRANCH"]
+
+    # Other sourcefiles are unchanged, and the package and report are the sums of their sourcefiles
+    assert counters["sourcefile:Source1.java"] == original["sourcefile:Source1.java"]
+    for counter_type in COUNTER_TYPES:
+        expected = tuple(
+            sum(counters[f"sourcefile:Source{i}.java"][counter_type][k] for i in range(3)) for k in (0, 1)
+        )
+        assert counters["com/example/pkg0"][counter_type] == expected
+        assert counters["report"][counter_type] == expected
+
+
+@pytest.mark.parametrize("example", sorted(str(path.relative_to(EXAMPLES)) for path in EXAMPLES.rglob("*.xml")))
+def test_full_recount_of_example_without_removals_keeps_its_counters(example):
+    path = EXAMPLES / example
+    original = snapshot(JacocoParser(path).parse_tree())
+
+    report = JacocoParser(path).parse()
+    FilterEngine([FilterRule.parse("class:*NeverMatches")]).apply(report)
+    FullCounterUpdater().apply(report)
+
+    assert snapshot(report.xml_element) == original
+
+
+def test_full_recount_takes_only_the_lines_of_removed_methods_from_an_example():
+    path = EXAMPLES / "atum-agent" / "jacoco.xml"
+    original = snapshot(JacocoParser(path).parse_tree())
+
+    report = JacocoParser(path).parse()
+    rules = ["class:*AtumContext$DatasetWrapper", "method:za.co.absa.atum.agent.AtumContext#copy"]
+    FilterEngine([FilterRule.parse(rule) for rule in rules]).apply(report)
+    FullCounterUpdater().apply(report)
+    counters = snapshot(report.xml_element)
+
+    # DatasetWrapper owns the covered lines 230 and 231 alone, copy() the missed line 203
+    assert original["sourcefile:AtumContext.scala"]["LINE"] == (11, 59)
+    assert counters["sourcefile:AtumContext.scala"]["LINE"] == (10, 57)
+    missed, covered = original["class:za/co/absa/atum/agent/AtumContext"]["LINE"]
+    assert counters["class:za/co/absa/atum/agent/AtumContext"]["LINE"] == (missed - 1, covered)
+    assert counters["class:za/co/absa/atum/agent/AtumContext$"] == original["class:za/co/absa/atum/agent/AtumContext$"]
+    missed, covered = original["report"]["LINE"]
+    assert counters["report"]["LINE"] == (missed - 1, covered - 2)
+
+
+# A.java has a covered line (e.g. a field initializer) outside of the span of its only method
+LINES_WITHOUT_METHOD = b"""<?xml version="1.0" encoding="UTF-8"?>
+<report name="r">
+<package name="p">
+<class name="p/A" sourcefilename="A.java">
+<method name="m" desc="()V" line="3"><counter type="INSTRUCTION" missed="0" covered="2"/>\
+<counter type="LINE" missed="0" covered="1"/><counter type="METHOD" missed="0" covered="1"/></method>
+<counter type="INSTRUCTION" missed="0" covered="4"/><counter type="LINE" missed="0" covered="2"/>\
+<counter type="METHOD" missed="0" covered="1"/><counter type="CLASS" missed="0" covered="1"/></class>
+<class name="p/B" sourcefilename="B.java">
+<method name="n" desc="()V" line="5"><counter type="INSTRUCTION" missed="3" covered="0"/>\
+<counter type="LINE" missed="1" covered="0"/><counter type="METHOD" missed="1" covered="0"/></method>
+<counter type="INSTRUCTION" missed="3" covered="0"/><counter type="LINE" missed="1" covered="0"/>\
+<counter type="METHOD" missed="1" covered="0"/><counter type="CLASS" missed="1" covered="0"/></class>
+<sourcefile name="A.java"><line nr="3" mi="0" ci="2"/><line nr="10" mi="0" ci="2"/>\
+<counter type="INSTRUCTION" missed="0" covered="4"/><counter type="LINE" missed="0" covered="2"/>\
+<counter type="METHOD" missed="0" covered="1"/><counter type="CLASS" missed="0" covered="1"/></sourcefile>
+<sourcefile name="B.java"><line nr="5" mi="3" ci="0"/>\
+<counter type="INSTRUCTION" missed="3" covered="0"/><counter type="LINE" missed="1" covered="0"/>\
+<counter type="METHOD" missed="1" covered="0"/><counter type="CLASS" missed="1" covered="0"/></sourcefile>
+<counter type="INSTRUCTION" missed="3" covered="4"/><counter type="LINE" missed="1" covered="2"/>\
+<counter type="METHOD" missed="1" covered="1"/><counter type="CLASS" missed="1" covered="1"/>
+</package>
+<counter type="INSTRUCTION" missed="3" covered="4"/><counter type="LINE" missed="1" covered="2"/>\
+<counter type="METHOD" missed="1" covered="1"/><counter type="CLASS" missed="1" covered="1"/>
+</report>
+"""
+
+
+def test_full_recount_drops_the_lines_of_a_removed_sourcefile_from_the_totals(tmp_path):
+    path = tmp_path / "report.xml"
+    path.write_bytes(LINES_WITHOUT_METHOD)
+    report = JacocoParser(path).parse()
+    FilterEngine([FilterRule.parse("file:A.java")], prune_lines=True).apply(report)
+    FullCounterUpdater().apply(report)
+    counters = snapshot(report.xml_element)
+
+    assert [sf.name for sf in report.packages[0].sourcefiles] == ["B.java"]
+    for counter_type in COUNTER_TYPES:
+        assert counters["p"][counter_type] == counters["sourcefile:B.java"][counter_type]
+        assert counters["report"][counter_type] == counters["sourcefile:B.java"][counter_type]
+
+
+@pytest.mark.parametrize("example", ["atum-agent", "atum-reader"])
+def test_recounted_line_counters_match_the_written_lines(example, tmp_path):
+    path = tmp_path / "jacoco.xml"
+    shutil.copy(EXAMPLES / example / "jacoco.xml", path)
+
+    # --recount without --prune-lines
+    process_file(path, {"rules": load_filter_rules(EXAMPLES / "rules.txt"), "recount": True})
+
+    root = etree.parse(str(tmp_path / "jacoco.filtered.xml")).getroot()
+    for sourcefile in root.iter("sourcefile"):
+        covered = [int(line.get("ci")) > 0 for line in sourcefile.findall("line")]
+        assert counters_of(sourcefile)["LINE"] == (covered.count(False), covered.count(True)), sourcefile.get("name")
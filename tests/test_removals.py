@@ -0,0 +1,13 @@
+from jacoco_filter.removals import RemovalRecorder
+from jacoco_filter.rules import FilterRule
+
+
+def test_recorder_counts_the_removals_of_matching_rules():
+    recorder = RemovalRecorder([FilterRule.parse("class:*.Gen"), FilterRule.parse("method:get*")])
+
+    assert recorder.class_rule("com/example", "com.example.Gen", "Gen.java").text == "class:*.Gen"
+    assert recorder.class_rule("com/example", "com.example.Keep", "Keep.java") is None
+    assert recorder.method_rule("com.example.Keep", "Keep", "getX").text == "method:get*"
+    assert recorder.method_rule("com.example.Keep", "Keep", "run") is None
+
+    assert recorder.stats == {"methods_removed": 1, "classes_removed": 1}
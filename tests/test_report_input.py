@@ -0,0 +1,163 @@
+import hashlib
+import json
+import sys
+
+import pytest
+from lxml import etree
+
+from jacoco_filter.main import main
+from jacoco_filter.pipeline import process_file, process_file_profiles
+from jacoco_filter.report_input import IO_METRICS, IOMetrics, ParserOptions, ReportInput, get_parser
+from jacoco_filter.rules import FilterRule
+from tests.report_factory import write_report
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    IO_METRICS.reset()
+    yield
+    IO_METRICS.reset()
+
+
+def test_parse_tree_in_chunks_matches_etree_parse(tmp_path):
+    path = write_report(tmp_path / "report.xml", 30, classes_per_package=10)
+
+    with ReportInput(path) as report_input:
+        root = report_input.parse_tree(chunk_size=4096)
+
+    expected = etree.parse(str(path), etree.XMLParser(remove_blank_text=True))
+    assert etree.tostring(root) == etree.tostring(expected.getroot())
+    assert root.getroottree().docinfo.doctype == expected.docinfo.doctype
+    assert IO_METRICS.bytes_parsed == path.stat().st_size
+
+
+def test_parse_tree_keeps_blank_text_if_configured(tmp_path):
+    path = write_report(tmp_path / "report.xml", 5)
+
+    with ReportInput(path) as report_input:
+        root = report_input.parse_tree(options=ParserOptions(remove_blank_text=False))
+
+    assert etree.tostring(root) == etree.tostring(etree.parse(str(path)).getroot())
+
+
+def test_parser_is_reused_per_options():
+    assert get_parser() is get_parser(ParserOptions())
+    assert get_parser(ParserOptions(huge_tree=True)) is not get_parser()
+
+
+def test_parse_tree_does_not_load_the_dtd(tmp_path, monkeypatch):
+    # The entity would be expanded from the DTD if it was loaded
+    (tmp_path / "report.dtd").write_text('<!ENTITY secret "from the dtd">')
+    path = tmp_path / "report.xml"
+    path.write_text('<?xml version="1.0"?><!DOCTYPE report SYSTEM "report.dtd"><report><sessioninfo>&secret;</sessioninfo></report>')
+    monkeypatch.chdir(tmp_path)
+    assert "from the dtd" in etree.tostring(etree.parse(str(path), etree.XMLParser(load_dtd=True))).decode()
+
+    with ReportInput(path) as report_input:
+        root = report_input.parse_tree()
+
+    assert "from the dtd" not in etree.tostring(root).decode()
+    assert root.getroottree().docinfo.system_url == "report.dtd"
+
+
+def test_parser_is_usable_after_a_syntax_error(tmp_path):
+    broken = tmp_path / "broken.xml"
+    broken.write_bytes(b"<report><package></report>" + b" " * 100)
+    valid = write_report(tmp_path / "valid.xml", 2)
+
+    with ReportInput(broken) as report_input:
+        with pytest.raises(etree.XMLSyntaxError):
+            report_input.parse_tree(chunk_size=8)
+    with ReportInput(valid) as report_input:
+        assert report_input.parse_tree().tag == "report"
+
+
+def test_content_hash_is_computed_once(tmp_path):
+    path = write_report(tmp_path / "report.xml", 10)
+    metrics = IOMetrics()
+
+    with ReportInput(path, metrics) as report_input:
+        first = report_input.content_hash()
+        assert report_input.content_hash() == first
+
+    assert first == hashlib.sha256(path.read_bytes()).hexdigest()
+    assert metrics.bytes_hashed == path.stat().st_size
+    assert IO_METRICS.files_mapped == 0
+
+
+def test_reader_feeds_iterparse(tmp_path):
+    path = write_report(tmp_path / "report.xml", 10, classes_per_package=5)
+
+    with ReportInput(path) as report_input:
+        packages = [elem.get("name") for _, elem in etree.iterparse(report_input.reader(), tag="package")]
+
+    assert packages == ["com/example/pkg0", "com/example/pkg1"]
+    assert IO_METRICS.bytes_parsed == path.stat().st_size
+
+
+def test_empty_input(tmp_path):
+    path = tmp_path / "empty.xml"
+    path.write_bytes(b"")
+
+    with ReportInput(path) as report_input:
+        assert len(report_input) == 0
+        assert report_input.content_hash() == hashlib.sha256(b"").hexdigest()
+
+
+def test_lexical_fallback_maps_the_input_once(tmp_path):
+    # Processing instructions are not handled by the lexical engine
+    path = write_report(tmp_path / "jacoco.xml", 20)
+    path.write_bytes(path.read_bytes().replace(b"<report ", b"<?pi data?><report ", 1))
+    size = path.stat().st_size
+
+    process_file(path, {"engine": "lexical", "rules": [FilterRule.parse("class:*$Inner")]})
+
+    assert IO_METRICS.as_dict() == {
+        "files_mapped": 1,
+        "bytes_mapped": size,
+        "bytes_parsed": size,
+        "bytes_hashed": 0,
+        "bytes_scanned": size,
+        "files_written": 1,
+        "files_unchanged": 0,
+        "bytes_written": (tmp_path / "jacoco.filtered.xml").stat().st_size,
+    }
+
+
+def test_profiles_read_the_shared_input(tmp_path):
+    path = write_report(tmp_path / "jacoco.xml", 20)
+    profiles = {"lenient": [FilterRule.parse("class:*$Inner")], "strict": [FilterRule.parse("method:get*")]}
+
+    with ReportInput(path) as report_input:
+        process_file_profiles(path, {"rules": [], "profiles": profiles}, None, report_input)
+
+    assert (IO_METRICS.files_mapped, IO_METRICS.bytes_parsed) == (1, path.stat().st_size)
+    assert IO_METRICS.files_written == 2
+
+
+def test_main_writes_metrics(tmp_path, monkeypatch):
+    path = write_report(tmp_path / "jacoco.xml", 20)
+    (tmp_path / "rules.txt").write_text("method:get*\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        sys, "argv", ["jacoco-filter", "-i", "jacoco.xml", "-r", "rules.txt", "--metrics", "metrics.json"]
+    )
+
+    main()
+
+    metrics = json.loads((tmp_path / "metrics.json").read_text())
+    assert metrics["files"] == 1
+    assert metrics["io"]["files_mapped"] == 1
+    assert metrics["io"]["bytes_parsed"] == path.stat().st_size
+
+
+def test_huge_tree_lifts_the_parser_limits(tmp_path):
+    path = tmp_path / "huge.xml"
+    path.write_bytes(b'<report><sessioninfo id="' + b"x" * (11 << 20) + b'"/></report>')
+
+    with ReportInput(path) as report_input:
+        with pytest.raises(etree.XMLSyntaxError):
+            report_input.parse_tree()
+        root = report_input.parse_tree(options=ParserOptions(huge_tree=True))
+
+    assert len(root[0].get("id")) == 11 << 20
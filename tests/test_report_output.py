@@ -0,0 +1,133 @@
+import json
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+from jacoco_filter.main import main
+from jacoco_filter.pipeline import writer_slots
+from jacoco_filter.report_input import IO_METRICS, IOMetrics
+from jacoco_filter.report_output import AtomicOutput, configure_writers
+from tests.report_factory import write_report
+
+
+@pytest.fixture(autouse=True)
+def reset_io_metrics():
+    IO_METRICS.reset()
+    yield
+    IO_METRICS.reset()
+    configure_writers(None)
+
+
+def test_output_is_renamed_over_the_target(tmp_path):
+    target = tmp_path / "out.xml"
+    target.write_bytes(b"old")
+    metrics = IOMetrics()
+
+    with AtomicOutput(target, buffer_size=4, metrics=metrics) as out:
+        out.write(b"<report>")
+        out.writelines([b"<a/>", memoryview(b"</report>")])
+        # Nothing of the new content is visible before the output is complete
+        assert target.read_bytes() == b"old"
+
+    assert target.read_bytes() == b"<report><a/></report>"
+    assert [path.name for path in tmp_path.iterdir()] == ["out.xml"]
+    assert (metrics.files_written, metrics.files_unchanged, metrics.bytes_written) == (1, 0, 21)
+
+
+def test_output_is_discarded_on_error(tmp_path):
+    target = tmp_path / "out.xml"
+    target.write_bytes(b"complete")
+
+    with pytest.raises(RuntimeError):
+        with AtomicOutput(target) as out:
+            out.write(b"trunc")
+            raise RuntimeError("killed")
+
+    assert target.read_bytes() == b"complete"
+    assert [path.name for path in tmp_path.iterdir()] == ["out.xml"]
+
+
+def test_unchanged_output_keeps_the_existing_file(tmp_path):
+    target = tmp_path / "out.xml"
+    target.write_bytes(b"<report/>")
+    os.utime(target, ns=(1_000_000_000, 1_000_000_000))
+    inode = target.stat().st_ino
+    metrics = IOMetrics()
+
+    with AtomicOutput(target, metrics=metrics) as out:
+        out.write(b"<report/>")
+
+    assert target.stat().st_mtime_ns == 1_000_000_000 and target.stat().st_ino == inode
+    assert (metrics.files_written, metrics.files_unchanged) == (0, 1)
+    assert [path.name for path in tmp_path.iterdir()] == ["out.xml"]
+
+    # Same size, different content
+    with AtomicOutput(target, metrics=metrics) as out:
+        out.write(b"<REPORT/>")
+
+    assert target.read_bytes() == b"<REPORT/>"
+    assert metrics.files_written == 1
+
+
+@pytest.mark.skipif(os.name != "posix", reason="file modes are POSIX")
+def test_output_has_the_mode_of_a_new_file(tmp_path):
+    umask = os.umask(0)
+    os.umask(umask)
+
+    with AtomicOutput(tmp_path / "out.xml") as out:
+        out.write(b"<report/>")
+
+    # Not the 0600 of the temporary file
+    assert (tmp_path / "out.xml").stat().st_mode & 0o777 == 0o666 & ~umask
+
+
+def test_output_takes_a_writer_slot_only_to_commit(tmp_path, monkeypatch):
+    slots = multiprocessing.BoundedSemaphore(1)
+    configure_writers(slots)
+    held = []
+    replace = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: held.append(not slots.acquire(block=False)) or replace(src, dst))
+
+    with AtomicOutput(tmp_path / "out.xml") as out:
+        out.write(b"<report/>")
+        # Producing the output does not wait for a slot
+        assert slots.acquire(block=False)
+        slots.release()
+
+    assert held == [True]
+    assert slots.acquire(block=False)
+    slots.release()
+
+
+def test_writer_slots_only_limit_more_workers_than_writers():
+    assert writer_slots(2, 2) is None
+    assert writer_slots(4, 2) is not None
+
+
+@pytest.mark.parametrize("engine", ["model", "lexical", "stream"])
+def test_rerun_keeps_unchanged_outputs(tmp_path, monkeypatch, engine):
+    for i in range(3):
+        write_report(tmp_path / f"r{i}.xml", 20, seed=i)
+    (tmp_path / "rules.txt").write_text("class:*$Inner\n")
+    monkeypatch.chdir(tmp_path)
+    options = ["--stream"] if engine == "stream" else ["--engine", engine]
+    argv = ["jacoco-filter", "-i", "r*[0-9].xml", "-r", "rules.txt", "-j", "3", "--max-writers", "1", *options]
+
+    monkeypatch.setattr(sys, "argv", [*argv, "--metrics", "first.json"])
+    main()
+    outputs = sorted(tmp_path.glob("*.filtered.xml"))
+    for output in outputs:
+        os.utime(output, ns=(1_000_000_000, 1_000_000_000))
+    IO_METRICS.reset()
+
+    monkeypatch.setattr(sys, "argv", [*argv, "--metrics", "second.json"])
+    main()
+
+    first = json.loads((tmp_path / "first.json").read_text())["io"]
+    second = json.loads((tmp_path / "second.json").read_text())["io"]
+    assert (first["files_written"], first["files_unchanged"]) == (3, 0)
+    assert (second["files_written"], second["files_unchanged"]) == (0, 3)
+    assert len(outputs) == 3 and all(output.stat().st_mtime_ns == 1_000_000_000 for output in outputs)
+    assert not list(tmp_path.glob(".*.tmp"))
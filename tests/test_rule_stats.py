@@ -0,0 +1,114 @@
+import json
+import sys
+
+import pytest
+
+from jacoco_filter.main import main
+from jacoco_filter.matcher import RuleMatcher
+from jacoco_filter.report_input import IO_METRICS
+from jacoco_filter.rule_stats import RULE_STATS, RuleStats
+from jacoco_filter.rules import FilterRule
+from tests.report_factory import write_report
+
+RULES = [
+    "class:*$Inner",
+    "class:com.example.pkg0.*$Inner",
+    "file:Source0.java",
+    "method:get*",
+    "method:Class*#get*",
+    "method:neverExists*",
+]
+
+
+@pytest.fixture(autouse=True)
+def reset_rule_stats():
+    RULE_STATS.reset()
+    yield
+    RULE_STATS.enabled = False
+    RULE_STATS.reset()
+    IO_METRICS.reset()
+
+
+def test_dead_and_shadowed_rules():
+    stats = RuleStats()
+    rules = [FilterRule.parse(rule) for rule in ["class:*Test", "class:*IT", "class:*Spec"]]
+    stats.register(rules)
+    stats.record(rules[0], True, True, 100)
+    stats.record(rules[1], True, False, 50)
+    stats.record(rules[2], False, False, 20)
+
+    summary = stats.as_dict()
+
+    assert summary["never_matched"] == ["class:*Spec"]
+    assert summary["shadowed"] == ["class:*IT"]
+    assert summary["counters"]["class:*Test"] == {"evaluations": 1, "matches": 1, "removals": 1, "time_ns": 100}
+
+
+def test_add_sums_counters():
+    stats = RuleStats()
+    stats.add({"class:*Test": {"evaluations": 2, "matches": 1, "removals": 1, "time_ns": 10}})
+    stats.add({"class:*Test": {"evaluations": 3, "matches": 0, "removals": 0, "time_ns": 5}})
+
+    assert stats.rules["class:*Test"] == {"evaluations": 5, "matches": 1, "removals": 1, "time_ns": 15}
+
+
+@pytest.mark.parametrize(
+    "target",
+    [
+        {"fully_qualified_classname": "com.example.pkg0.Class2$Inner", "sourcefilename": "Source1.java"},
+        {"fully_qualified_classname": "com.example.pkg1.Class60", "sourcefilename": "Source0.java"},
+        {"fully_qualified_classname": "com.example.pkg1.Class61", "sourcefilename": "Source30.java"},
+    ],
+)
+def test_counted_class_match_agrees_with_combined_expressions(target):
+    matcher = RuleMatcher([FilterRule.parse(rule) for rule in RULES])
+    expected = matcher.first_class_match(target)
+
+    RULE_STATS.enabled = True
+    assert matcher.first_class_match(target) is expected
+    assert sum(counters["evaluations"] for counters in RULE_STATS.rules.values()) == 3
+
+
+@pytest.mark.parametrize("method_name", ["getValue0", "method1", "neverExistsX"])
+def test_counted_method_match_agrees_with_combined_expressions(method_name):
+    matcher = RuleMatcher([FilterRule.parse(rule) for rule in RULES])
+    target = {
+        "fully_qualified_classname": "com.example.pkg0.Class1",
+        "simple_class_name": "Class1",
+        "method_name": method_name,
+    }
+    expected = matcher.first_match(target, "method")
+
+    RULE_STATS.enabled = True
+    assert matcher.first_match(target, "method") is expected
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_rule_stats_are_written_to_the_metrics(tmp_path, monkeypatch, jobs):
+    for i in range(3):
+        (tmp_path / f"m{i}").mkdir()
+        write_report(tmp_path / f"m{i}" / "jacoco.xml", 60, seed=i)
+    (tmp_path / "rules.txt").write_text("\n".join(RULES) + "\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["jacoco-filter", "-i", "m*/jacoco.xml", "-r", "rules.txt", "--rule-stats", "-j", jobs, "--metrics", "m.json"],
+    )
+
+    main()
+
+    rules = json.loads((tmp_path / "m.json").read_text())["rules"]
+    assert list(rules["counters"]) == RULES
+    assert rules["never_matched"] == ["method:neverExists*"]
+    assert rules["shadowed"] == ["class:com.example.pkg0.*$Inner", "method:Class*#get*"]
+
+    metrics = json.loads((tmp_path / "m.json").read_text())
+    counters = rules["counters"]
+    assert counters["class:*$Inner"]["removals"] + counters["file:Source0.java"]["removals"] == (
+        metrics["stats"]["classes_removed"]
+    )
+    assert counters["method:get*"]["removals"] == metrics["stats"]["methods_removed"]
+    # Every class is evaluated against every class and file rule
+    assert counters["class:*$Inner"]["evaluations"] == 180
+    assert all(counter["time_ns"] > 0 for counter in counters.values())
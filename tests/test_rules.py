@@ -154,3 +154,31 @@ def test_load_filter_rules_empty_pattern(tmp_path):
     with pytest.raises(ValueError, match="Empty pattern on line 1"):
         load_filter_rules(file)
 
+
+# ---------- nested option ----------
+
+def test_parse_nested_class_rule():
+    rule = FilterRule.parse("class[nested]:com.example.Outer")
+    assert rule.scope == ScopeEnum.CLASS
+    assert rule.pattern == "com.example.Outer"
+    assert rule.nested is True
+    assert rule.text == "class[nested]:com.example.Outer"
+    assert FilterRule.parse("class:com.example.Outer").text == "class:com.example.Outer"
+
+@pytest.mark.parametrize("line, message", [
+    ("class[inherit]:Foo", "Unsupported rule option 'inherit'"),
+    ("method[nested]:get*", "only supported by class rules"),
+])
+def test_parse_invalid_nested_option_raises(line, message):
+    with pytest.raises(ValueError, match=message):
+        FilterRule.parse(line)
+
+def test_load_filter_rules_nested_option(tmp_path):
+    rule_file = tmp_path / "rules.txt"
+    rule_file.write_text("CLASS[nested]:com.example.*Fixture\nfile[nested]:Foo.scala\n")
+
+    with pytest.raises(ValueError, match="only supported by class rules.* on line 2"):
+        load_filter_rules(rule_file)
+
+    rule_file.write_text("CLASS[nested]:com.example.*Fixture\nclass:*Test\n")
+    assert [rule.nested for rule in load_filter_rules(rule_file)] == [True, False]
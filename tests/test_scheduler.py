@@ -0,0 +1,123 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from jacoco_filter.gate import CoverageGate, parse_thresholds
+from jacoco_filter.pipeline import process_inputs
+from jacoco_filter.report_input import IO_METRICS
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.scheduler import (
+    BASE_MEMORY,
+    Job,
+    MemoryScheduler,
+    estimate_memory,
+    parse_memory_size,
+    plan_jobs,
+)
+from tests.report_factory import write_report
+
+RULES = [FilterRule.parse("class:*$Inner"), FilterRule.parse("method:get*")]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [("1024", 1024), ("512M", 512 << 20), ("2G", 2 << 30), ("1.5GiB", 3 << 29), ("64kb", 64 << 10)],
+)
+def test_parse_memory_size(text, expected):
+    assert parse_memory_size(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "lots", "12X", "-1G"])
+def test_parse_memory_size_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_memory_size(text)
+
+
+def _files(tmp_path, sizes):
+    files = []
+    for index, size in enumerate(sizes):
+        path = tmp_path / f"r{index}.xml"
+        path.write_bytes(b"x" * size)
+        files.append(path)
+    return files
+
+
+def test_plan_jobs_largest_first_and_streams_oversized_files(tmp_path):
+    files = _files(tmp_path, [1000, 400_000, 20_000])
+    budget = estimate_memory(100_000, "model")
+
+    jobs = plan_jobs(files, "model", budget)
+
+    assert [job.size for job in jobs] == [400_000, 20_000, 1000]
+    assert [job.stream for job in jobs] == [True, False, False]
+    assert jobs[0].memory == estimate_memory(400_000, "stream")
+    assert jobs[1].memory == estimate_memory(20_000, "model")
+
+
+def test_plan_jobs_caps_files_that_cannot_stream(tmp_path):
+    files = _files(tmp_path, [400_000])
+
+    (job,) = plan_jobs(files, "model", BASE_MEMORY + 1000, can_stream=False)
+
+    assert not job.stream
+    assert job.memory == BASE_MEMORY + 1000
+
+
+def _sleep_job(job: Job) -> str:
+    time.sleep(0.05)
+    return job.path.name
+
+
+def test_scheduler_keeps_running_jobs_under_budget():
+    jobs = [Job(Path(f"j{m}"), m, m) for m in (60, 50, 40, 30, 20, 10)]
+    results = []
+
+    scheduler = MemoryScheduler(max_memory=100, workers=3)
+    scheduler.run(jobs, _sleep_job, lambda job, result: results.append(result))
+
+    assert sorted(results) == sorted(job.path.name for job in jobs)
+    assert scheduler.peak_memory <= 100
+
+
+def test_scheduler_runs_in_order_with_one_worker():
+    jobs = [Job(Path(f"j{m}"), m, m) for m in (30, 20, 10)]
+    results = []
+
+    MemoryScheduler(max_memory=10, workers=1).run(jobs, lambda job: job.size, lambda job, result: results.append(result))
+
+    assert results == [30, 20, 10]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_inputs_streams_under_small_budget(tmp_path, workers):
+    big = write_report(tmp_path / "big.xml", 200, classes_per_package=20)
+    small = write_report(tmp_path / "small.xml", 20, classes_per_package=10, seed=3)
+    budget = estimate_memory(small.stat().st_size, "model") * 2
+    thresholds = parse_thresholds({"class": {"INSTRUCTION": 50}})
+    args = {"rules": RULES, "jobs": workers, "max_memory": budget, "thresholds": thresholds}
+    gate = CoverageGate(thresholds)
+    IO_METRICS.reset()
+
+    scheduling = process_inputs([small, big], args, gate)
+
+    assert scheduling["streamed_files"] == 1
+    assert scheduling["peak_estimated_memory"] <= budget
+    assert (tmp_path / "big.filtered.xml").is_file() and (tmp_path / "small.filtered.xml").is_file()
+    assert IO_METRICS.files_mapped == 2
+
+    # Same violations as a sequential run without a budget
+    expected = CoverageGate(thresholds)
+    process_inputs([small, big], {"rules": RULES, "thresholds": thresholds}, expected)
+    assert gate.violations
+    assert sorted(map(str, gate.violations)) == sorted(map(str, expected.violations))
+    IO_METRICS.reset()
+
+
+def test_process_inputs_logs_the_engine_switch_once(tmp_path, caplog):
+    path = write_report(tmp_path / "jacoco.xml", 10)
+
+    with caplog.at_level("INFO"):
+        process_inputs([path], {"rules": RULES, "engine": "tree", "prune_lines": True})
+
+    assert caplog.text.count("Line pruning is done on the report model") == 1
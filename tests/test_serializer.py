@@ -1,7 +1,14 @@
+import io
+
 import pytest
 from pathlib import Path
 from lxml import etree
-from jacoco_filter.serializer import ReportSerializer
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.serializer import OutputOptions, ReportSerializer
+from tests.report_factory import REPORT_DTD, write_report
 
 
 class DummyReport:
@@ -24,3 +31,56 @@ def test_write_to_file_creates_valid_xml(tmp_path):
 
     assert root.tag == "report"
     assert root.attrib["name"] == "dummy"
+
+
+def _filtered_report(tmp_path: Path, **kwargs):
+    report = JacocoParser(write_report(tmp_path / "report.xml", 40, classes_per_package=10, **kwargs)).parse()
+    FilterEngine([FilterRule.parse("method:get*")]).apply(report)
+    CounterUpdater().apply(report)
+    return report
+
+
+@pytest.mark.parametrize("packages_per_group", [0, 2])
+@pytest.mark.parametrize("options", [OutputOptions(), OutputOptions("slim"), OutputOptions("slim", drop_lines=True)])
+def test_outputs_are_valid_against_the_dtd(tmp_path, packages_per_group, options):
+    output_path = tmp_path / "out.xml"
+    ReportSerializer(_filtered_report(tmp_path, packages_per_group=packages_per_group), options).write_to_file(
+        output_path
+    )
+
+    dtd = etree.DTD(io.StringIO(REPORT_DTD))
+    assert dtd.validate(etree.parse(str(output_path))), dtd.error_log.filter_from_errors()
+
+
+def test_slim_profile_leaves_out_zero_counters_and_whitespace(tmp_path):
+    full_path, slim_path = tmp_path / "full.xml", tmp_path / "slim.xml"
+    ReportSerializer(_filtered_report(tmp_path)).write_to_file(full_path)
+    ReportSerializer(_filtered_report(tmp_path), OutputOptions("slim")).write_to_file(slim_path)
+
+    full = etree.parse(str(full_path)).getroot()
+    slim = etree.parse(str(slim_path)).getroot()
+    assert slim.find("sessioninfo") is None
+    assert all(c.get("missed") != "0" or c.get("covered") != "0" for c in slim.iter("counter"))
+    assert {c.get("type") for c in slim.iter("counter")} == {"INSTRUCTION"}
+    assert len(list(slim.iter("line"))) == len(list(full.iter("line")))
+    assert b"\n<" not in slim_path.read_bytes().split(b"<report", 1)[1]
+    assert slim_path.stat().st_size < full_path.stat().st_size
+
+    # The non-zero counters are unchanged
+    def nonzero(root):
+        return [
+            (c.getparent().get("name"), c.get("type"), c.get("missed"), c.get("covered"))
+            for c in root.iter("counter")
+            if c.get("missed") != "0" or c.get("covered") != "0"
+        ]
+
+    assert nonzero(slim) == nonzero(full)
+
+
+def test_drop_lines(tmp_path):
+    output_path = tmp_path / "out.xml"
+    ReportSerializer(_filtered_report(tmp_path), OutputOptions(drop_lines=True)).write_to_file(output_path)
+
+    root = etree.parse(str(output_path)).getroot()
+    assert root.find(".//line") is None
+    assert root.find("sessioninfo") is not None
@@ -0,0 +1,156 @@
+import json
+import sys
+
+import pytest
+
+from jacoco_filter.main import main
+from jacoco_filter.report_input import IO_METRICS
+from jacoco_filter.sharding import assign_shards, merge_metrics, parse_shard, select_shard
+from tests.report_factory import write_report
+
+
+def make_inputs(root, sizes):
+    files = []
+    for i, size in enumerate(sizes):
+        path = root / f"module{i}" / "jacoco.xml"
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"x" * size)
+        files.append(path)
+    return files
+
+
+def test_parse_shard():
+    assert parse_shard("1/4") == (1, 4)
+    assert parse_shard("4/4") == (4, 4)
+    for text in ["0/4", "5/4", "1", "a/b", "1/0", ""]:
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+@pytest.mark.parametrize("strategy", ["hash", "size"])
+def test_shards_partition_the_inputs(tmp_path, strategy):
+    files = make_inputs(tmp_path, [10 * (i + 1) for i in range(20)])
+    shards = [select_shard(files, (i, 3), tmp_path, strategy) for i in range(1, 4)]
+
+    assert sorted(path for shard in shards for path in shard) == sorted(files)
+    assert sum(len(shard) for shard in shards) == len(files)
+    # Original order is kept within a shard
+    assert all(shard == sorted(shard, key=files.index) for shard in shards)
+
+
+def test_hash_shards_do_not_depend_on_checkout_location(tmp_path):
+    first = make_inputs(tmp_path / "node1", [1] * 12)
+    second = make_inputs(tmp_path / "node2", [1] * 12)
+
+    assignment1 = assign_shards(first, 4, tmp_path / "node1")
+    assignment2 = assign_shards(list(reversed(second)), 4, tmp_path / "node2")
+
+    assert [assignment1[path] for path in first] == [assignment2[path] for path in second]
+
+
+def test_size_shards_are_balanced(tmp_path):
+    files = make_inputs(tmp_path, [900, 500, 400, 300, 300, 200, 100, 100])
+    assignment = assign_shards(files, 2, tmp_path, "size")
+
+    loads = [0, 0]
+    for path, shard in assignment.items():
+        loads[shard] += path.stat().st_size
+    assert loads == [1400, 1400]
+
+
+def test_merge_metrics_sums_the_shards():
+    runs = [
+        {
+            "shard": "2/2",
+            "files": 3,
+            "stats": {"classes_removed": 2, "methods_removed": 5},
+            "violations": 1,
+            "io": {"bytes_parsed": 100},
+            "scheduler": {"peak_estimated_memory": 50, "streamed_files": 1},
+        },
+        {
+            "shard": "1/2",
+            "files": 2,
+            "stats": {"classes_removed": 1, "methods_removed": 0},
+            "violations": 0,
+            "io": {"bytes_parsed": 40},
+            "scheduler": {"peak_estimated_memory": 80, "streamed_files": 0},
+        },
+    ]
+
+    summary = merge_metrics(runs)
+
+    assert summary["runs"] == 2
+    assert summary["files"] == 5
+    assert summary["stats"] == {"classes_removed": 3, "methods_removed": 5}
+    assert summary["violations"] == 1
+    assert summary["io"] == {"bytes_parsed": 140}
+    assert summary["scheduler"] == {"peak_estimated_memory": 80, "streamed_files": 1}
+
+
+@pytest.mark.parametrize(
+    "shards, message",
+    [
+        (["1/3", "2/3"], "Missing metrics of shard(s): 3/3"),
+        (["1/2", "1/2", "2/2"], "more than once: 1/2"),
+        (["1/2", "1/3"], "different splits"),
+        (["1/1", None], "different splits"),
+    ],
+)
+def test_merge_metrics_checks_shards(shards, message):
+    with pytest.raises(ValueError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        merge_metrics([{"shard": shard, "files": 1} for shard in shards])
+
+
+def test_merge_metrics_of_unsharded_runs():
+    assert merge_metrics([{"files": 1}, {"files": 2}])["files"] == 3
+
+
+def test_merge_metrics_merges_rule_stats():
+    def rules(matches, removals):
+        return {"counters": {"class:*IT": {"evaluations": 10, "matches": matches, "removals": removals, "time_ns": 5}}}
+
+    # Shadowed in the first shard only: the rule still removed classes in the second
+    summary = merge_metrics([{"files": 1, "rules": rules(2, 0)}, {"files": 1, "rules": rules(1, 1)}])
+
+    assert summary["rules"]["counters"]["class:*IT"] == {"evaluations": 20, "matches": 3, "removals": 1, "time_ns": 10}
+    assert summary["rules"]["shadowed"] == [] and summary["rules"]["never_matched"] == []
+    assert "rules" not in merge_metrics([{"files": 1}])
+
+
+def test_sharded_runs_merge_into_one_summary(tmp_path, monkeypatch):
+    for i in range(5):
+        (tmp_path / f"m{i}").mkdir()
+        write_report(tmp_path / f"m{i}" / "jacoco.xml", 10, seed=i)
+    (tmp_path / "rules.txt").write_text("method:get*\n")
+    monkeypatch.chdir(tmp_path)
+
+    for shard in ("1/2", "2/2"):
+        IO_METRICS.reset()
+        argv = ["jacoco-filter", "-i", "m*/jacoco.xml", "-r", "rules.txt", "--shard", shard, "--shard-by", "size"]
+        monkeypatch.setattr(sys, "argv", argv + ["--metrics", f"metrics{shard[0]}.json"])
+        main()
+
+    assert len(list(tmp_path.glob("m*/jacoco.filtered.xml"))) == 5
+
+    monkeypatch.setattr(
+        sys, "argv", ["jacoco-filter", "merge-metrics", "metrics1.json", "metrics2.json", "-o", "summary.json"]
+    )
+    main()
+
+    summary = json.loads((tmp_path / "summary.json").read_text())
+    shards = [json.loads((tmp_path / f"metrics{i}.json").read_text()) for i in (1, 2)]
+    assert summary["shards"] == ["1/2", "2/2"]
+    assert summary["files"] == 5
+    assert summary["stats"]["methods_removed"] == sum(run["stats"]["methods_removed"] for run in shards)
+    assert summary["stats"]["methods_removed"] > 0
+    IO_METRICS.reset()
+
+
+def test_merge_metrics_command_fails_on_missing_shard(tmp_path, monkeypatch):
+    (tmp_path / "metrics1.json").write_text(json.dumps({"shard": "1/2", "files": 1}))
+    monkeypatch.setattr(sys, "argv", ["jacoco-filter", "merge-metrics", str(tmp_path / "metrics1.json")])
+
+    with pytest.raises(SystemExit) as e:
+        main()
+    assert e.value.code == 1
@@ -0,0 +1,106 @@
+"""
+Startup benchmark of the CLI entry points, measured with '-X importtime' in a fresh interpreter.
+
+The budgets can be overridden with JACOCO_FILTER_STARTUP_BUDGET_MS and, for the PyInstaller build,
+JACOCO_FILTER_FROZEN_STARTUP_BUDGET_MS. The frozen build is measured when JACOCO_FILTER_BINARY points to the
+executable built from jacoco_filter.spec (build.sh does this). The budget checks are a 'benchmark'; the checks of
+the deferred imports always run.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Import time of the entry point for '--help', in milliseconds
+STARTUP_BUDGET_MS = float(os.getenv("JACOCO_FILTER_STARTUP_BUDGET_MS", "120"))
+# Wall time of '--help' of the PyInstaller build, in milliseconds
+FROZEN_STARTUP_BUDGET_MS = float(os.getenv("JACOCO_FILTER_FROZEN_STARTUP_BUDGET_MS", "600"))
+RUNS = 3
+
+# Modules only the processing phase needs
+DEFERRED_MODULES = {
+    "lxml.etree",
+    "tomli",
+    "concurrent.futures",
+    "tempfile",
+    "jacoco_filter.pipeline",
+    "jacoco_filter.parser",
+    "jacoco_filter.analyze",
+    "jacoco_filter.diff",
+}
+
+
+def import_times(*args: str, cwd: Path = ROOT) -> tuple[list[tuple[int, int, str]], str]:
+    """
+    Runs 'python -X importtime -m jacoco_filter <args>' and returns (cumulative microseconds, depth, module) of
+    every import, and the remaining output of stderr.
+    """
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "jacoco_filter", *args],
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+        env=env,
+        check=False,
+    )
+    entries, output = [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            output.append(line)
+        elif "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            entries.append((int(cumulative), (len(name) - len(name.lstrip())) // 2, name.strip()))
+    return entries, "\n".join(output)
+
+
+def startup_ms(entries: list[tuple[int, int, str]]) -> float:
+    """
+    Sums the top-level imports from the package onwards, i.e. everything the interpreter itself does not load.
+    """
+    start = next(i for i, (_, depth, name) in enumerate(entries) if depth == 0 and name.startswith("jacoco_filter"))
+    return sum(cumulative for cumulative, depth, _ in entries[start:] if depth == 0) / 1000
+
+
+def test_help_defers_pipeline_imports():
+    entries, _ = import_times("--help")
+    imported = {name for _, _, name in entries}
+    assert "jacoco_filter.cli" in imported
+    assert not imported & DEFERRED_MODULES
+
+
+def test_configuration_error_defers_pipeline_imports(tmp_path):
+    (tmp_path / "rules.txt").write_text("class:*Test\n")
+    entries, output = import_times("--inputs", "missing/*.xml", "--rules", "rules.txt", cwd=tmp_path)
+    imported = {name for _, _, name in entries}
+    assert "No input files remain after exclusions." in output
+    assert "jacoco_filter.cli" in imported
+    assert "jacoco_filter.pipeline" not in imported
+    assert "lxml.etree" not in imported
+
+
+@pytest.mark.benchmark
+def test_startup_within_budget():
+    best = min(startup_ms(import_times("--help")[0]) for _ in range(RUNS))
+    print(f"startup import time: {best:.1f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)")
+    assert best <= STARTUP_BUDGET_MS
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(not os.getenv("JACOCO_FILTER_BINARY"), reason="JACOCO_FILTER_BINARY is not set")
+def test_frozen_startup_within_budget():
+    binary = os.environ["JACOCO_FILTER_BINARY"]
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([binary, "--help"], capture_output=True, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(f"frozen startup: {min(timings):.1f} ms (budget {FROZEN_STARTUP_BUDGET_MS:.0f} ms)")
+    assert min(timings) <= FROZEN_STARTUP_BUDGET_MS
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.recount import FullCounterUpdater
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.serializer import OutputOptions, ReportSerializer
+from jacoco_filter.streaming import StreamingProcessor
+from tests.report_factory import write_report
+
+EXAMPLES = Path(__file__).parent.parent / "examples"
+
+RULES = [
+    FilterRule.parse("class:*$Inner"),
+    FilterRule.parse("method:get*"),
+    FilterRule.parse("class:com.example.pkg1.*"),
+]
+
+
+def canonical(path: Path) -> bytes:
+    root = etree.parse(str(path)).getroot()
+    for elem in root.iter():
+        elem.text = (elem.text or "").strip() or None
+        elem.tail = None
+    return etree.tostring(root)
+
+
+def run_model(path: Path, updater, out: Path, output=None) -> dict:
+    report = JacocoParser(path).parse()
+    engine = FilterEngine(RULES)
+    engine.apply(report)
+    updater.apply(report)
+    ReportSerializer(report, output).write_to_file(out)
+    return engine.stats
+
+
+@pytest.mark.parametrize("packages_per_group", [0, 2])
+@pytest.mark.parametrize("updater_class", [CounterUpdater, FullCounterUpdater])
+def test_streaming_matches_model_engine(packages_per_group, updater_class, tmp_path):
+    path = write_report(tmp_path / "report.xml", 120, classes_per_package=15, packages_per_group=packages_per_group)
+
+    model_stats = run_model(path, updater_class(), tmp_path / "model.xml")
+    processor = StreamingProcessor(RULES, updater_class())
+    stream_stats = processor.process(path, tmp_path / "stream.xml")
+
+    assert stream_stats == model_stats
+    assert canonical(tmp_path / "stream.xml") == canonical(tmp_path / "model.xml")
+
+
+@pytest.mark.parametrize("updater_class", [CounterUpdater, FullCounterUpdater])
+def test_streaming_totals_of_packages_without_counters_match_model_engine(updater_class, tmp_path):
+    # The packages of the example have no counters; the report counters are the sums of the classes
+    path = EXAMPLES / "module_A" / "target" / "sample.xml"
+
+    run_model(path, updater_class(), tmp_path / "model.xml")
+    StreamingProcessor(RULES, updater_class()).process(path, tmp_path / "stream.xml")
+
+    assert canonical(tmp_path / "stream.xml") == canonical(tmp_path / "model.xml")
+    counters = etree.parse(str(tmp_path / "stream.xml")).getroot().findall("counter")
+    assert {c.get("type"): c.get("covered") for c in counters}["INSTRUCTION"] != "0"
+
+
+@pytest.mark.parametrize("output", [OutputOptions("slim"), OutputOptions("slim", True), OutputOptions("full", True)])
+def test_streaming_output_options_match_model_engine(output, tmp_path):
+    path = write_report(tmp_path / "report.xml", 60, classes_per_package=15, packages_per_group=2)
+
+    run_model(path, CounterUpdater(), tmp_path / "model.xml", output)
+    StreamingProcessor(RULES, output=output).process(path, tmp_path / "stream.xml")
+
+    assert canonical(tmp_path / "stream.xml") == canonical(tmp_path / "model.xml")
+
+
+def test_streaming_processes_top_level_units_separately(tmp_path):
+    path = write_report(tmp_path / "report.xml", 60, classes_per_package=10)
+    processor = StreamingProcessor(RULES)
+
+    processor.process(path, tmp_path / "stream.xml")
+
+    assert processor.units == 6
+    # pkg1 is removed entirely
+    root = etree.parse(str(tmp_path / "stream.xml")).getroot()
+    assert [p.get("name") for p in root.findall("package")] == [f"com/example/pkg{i}" for i in (0, 2, 3, 4, 5)]
+    assert root.getroottree().docinfo.public_id == "-//JACOCO//DTD Report 1.1//EN"
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule
+from jacoco_filter.tracing import Tracer, TRACER
+
+
+@pytest.fixture
+def tracer():
+    t = Tracer()
+    yield t
+    t.close()
+
+
+def read_events(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_disabled_tracer_writes_nothing(tracer, tmp_path):
+    tracer.configure(None)
+    assert tracer.enabled is False
+    tracer.emit("class_removed", class_name="A")
+    assert tracer.counts() == {}
+
+
+def test_enabled_tracer_writes_json_lines_with_context(tracer, tmp_path):
+    out = tmp_path / "trace.jsonl"
+    tracer.configure(str(out))
+    tracer.bind(file="a.xml")
+    tracer.emit("class_removed", class_name="com.example.A", rule="class:com.*")
+    tracer.close()
+
+    assert read_events(out) == [
+        {"event": "class_removed", "file": "a.xml", "class_name": "com.example.A", "rule": "class:com.*"}
+    ]
+
+
+def test_sampling_keeps_every_nth_event_per_type(tracer, tmp_path):
+    out = tmp_path / "trace.jsonl"
+    tracer.configure(str(out), sample_rate=0.25)
+    for i in range(8):
+        tracer.emit("method_removed", index=i)
+    tracer.emit("class_removed", index=0)
+    tracer.close()
+
+    events = read_events(out)
+    assert [e["index"] for e in events if e["event"] == "method_removed"] == [0, 4]
+    assert [e["index"] for e in events if e["event"] == "class_removed"] == [0]
+    assert tracer.counts() == {"method_removed": 8, "class_removed": 1}
+
+
+@pytest.mark.parametrize("rate", [0, -1, 1.5])
+def test_invalid_sample_rate_raises(tracer, rate):
+    with pytest.raises(ValueError, match="sample rate"):
+        tracer.configure("-", sample_rate=rate)
+
+
+def test_filter_engine_emits_removed_class_and_method_with_rule(tmp_path):
+    xml = tmp_path / "jacoco.xml"
+    xml.write_text(
+        '<report><package name="com/example">'
+        '<class name="com/example/Gen" sourcefilename="Gen.java"/>'
+        '<class name="com/example/Keep" sourcefilename="Keep.java">'
+        '<method name="getX" desc="()I" line="3"/><method name="run" desc="()V" line="5"/></class>'
+        "</package></report>"
+    )
+    out = tmp_path / "trace.jsonl"
+    report = JacocoParser(xml).parse()
+
+    TRACER.configure(str(out))
+    try:
+        FilterEngine([FilterRule.parse("class:*.Gen"), FilterRule.parse("method:get*")]).apply(report)
+    finally:
+        TRACER.close()
+
+    events = read_events(out)
+    assert events[0]["event"] == "class_removed"
+    assert events[0]["class_name"] == "com.example.Gen"
+    assert events[0]["rule"] == "class:*.Gen"
+    assert events[1] == {
+        "event": "method_removed",
+        "class_name": "com.example.Keep",
+        "method": "getX",
+        "rule": "method:get*",
+    }
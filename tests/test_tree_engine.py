@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.model import JacocoReport
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.rules import FilterRule, load_filter_rules
+from jacoco_filter.serializer import ReportSerializer
+from jacoco_filter.tree_engine import TreeFilterEngine
+from tests.report_factory import write_report
+
+EXAMPLES = Path(__file__).parent.parent / "examples"
+
+GENERATED_RULES = [
+    FilterRule.parse("class:*$Inner"),
+    FilterRule.parse("file:Source1?.java"),
+    FilterRule.parse("method:get*"),
+    FilterRule.parse("method:Class1*#method*"),
+    FilterRule.parse("class:com.example.pkg3.*"),
+]
+
+
+def run_model_engine(path: Path, rules, out: Path) -> tuple[bytes, dict]:
+    report = JacocoParser(path).parse()
+    engine = FilterEngine(rules)
+    engine.apply(report)
+    CounterUpdater().apply(report)
+    ReportSerializer(report).write_to_file(out)
+    return out.read_bytes(), engine.stats
+
+
+def run_tree_engine(path: Path, rules, out: Path) -> tuple[bytes, dict]:
+    root = JacocoParser(path).parse_tree()
+    engine = TreeFilterEngine(rules)
+    engine.apply(root)
+    ReportSerializer(JacocoReport(xml_element=root)).write_to_file(out)
+    return out.read_bytes(), engine.stats
+
+
+def assert_same_output(path: Path, rules, tmp_path: Path):
+    model_bytes, model_stats = run_model_engine(path, rules, tmp_path / "model.xml")
+    tree_bytes, tree_stats = run_tree_engine(path, rules, tmp_path / "tree.xml")
+    assert tree_stats == model_stats
+    assert tree_bytes == model_bytes
+
+
+@pytest.mark.parametrize(
+    "report",
+    [
+        "atum-agent/jacoco.xml",
+        "atum-reader/jacoco.xml",
+        "module_A/target/sample.xml",
+        "project/module_B/another/sample.xml",
+    ],
+)
+def test_tree_engine_matches_model_engine_on_examples(report, tmp_path):
+    rules = load_filter_rules(EXAMPLES / "rules.txt") + [FilterRule.parse("class:*Measure*")]
+    assert_same_output(EXAMPLES / report, rules, tmp_path)
+
+
+def test_tree_engine_matches_model_engine_on_generated_report(tmp_path):
+    path = write_report(tmp_path / "generated.xml", 300, classes_per_package=40)
+    assert_same_output(path, GENERATED_RULES, tmp_path)
+
+
+def test_tree_engine_removes_emptied_package_and_sourcefile(tmp_path):
+    path = write_report(tmp_path / "generated.xml", 10, classes_per_package=5)
+    root = JacocoParser(path).parse_tree()
+
+    engine = TreeFilterEngine([FilterRule.parse("class:com.example.pkg0.*")])
+    engine.apply(root)
+
+    assert [p.get("name") for p in root.findall("package")] == ["com/example/pkg1"]
+    assert engine.stats == {"classes_removed": 5, "methods_removed": 0}
+
+    pkg_counter = root.find("package/counter[@type='INSTRUCTION']")
+    report_counter = root.find("counter[@type='INSTRUCTION']")
+    assert report_counter.get("missed") == pkg_counter.get("missed")
+    assert report_counter.get("covered") == pkg_counter.get("covered")
+
+
+def test_tree_engine_matches_model_engine_on_grouped_report(tmp_path):
+    path = write_report(tmp_path / "grouped.xml", 300, classes_per_package=20, packages_per_group=4)
+    rules = GENERATED_RULES + [FilterRule.parse("class:com.example.pkg4.*"), FilterRule.parse("class:*pkg5.*")]
+    assert_same_output(path, rules, tmp_path)
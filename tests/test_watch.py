@@ -0,0 +1,168 @@
+import os
+import sys
+
+import pytest
+
+from jacoco_filter.main import main
+from jacoco_filter.watch import RESCAN_POLLS, ReportWatcher
+from tests.report_factory import write_report
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_watcher(files, processed, interval=1.0):
+    clock = FakeClock()
+
+    def process(ready):
+        processed.append(list(ready))
+
+    return ReportWatcher(lambda: list(files), process, interval, clock=clock, sleep=clock.sleep)
+
+
+def touch(path, content, mtime_ns):
+    path.write_text(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_new_report_is_processed_once_stable(tmp_path):
+    report = tmp_path / "jacoco.xml"
+    touch(report, "<report/>", 1_000_000_000)
+    processed = []
+    watcher = make_watcher([report], processed)
+
+    watcher.run(polls=1)
+    assert not processed
+
+    watcher.run(polls=5)
+    assert processed == [[report]]
+
+
+def test_report_being_written_is_debounced(tmp_path):
+    report = tmp_path / "jacoco.xml"
+    processed = []
+    watcher = make_watcher([report], processed)
+
+    for i in range(4):
+        touch(report, "<report>" + "x" * i, 1_000_000_000 + i)
+        watcher.run(polls=watcher.polls + 1)
+    assert not processed
+
+    watcher.run(polls=watcher.polls + 2)
+    assert processed == [[report]]
+
+
+def test_changed_report_is_processed_again(tmp_path):
+    unchanged = tmp_path / "a.xml"
+    changed = tmp_path / "b.xml"
+    touch(unchanged, "<report/>", 1_000_000_000)
+    touch(changed, "<report/>", 1_000_000_000)
+    processed = []
+    watcher = make_watcher([unchanged, changed], processed)
+
+    watcher.run(polls=3)
+    assert processed == [[unchanged, changed]]
+
+    touch(changed, "<report></report>", 2_000_000_000)
+    watcher.run(polls=8)
+    assert processed == [[unchanged, changed], [changed]]
+
+
+def test_filtered_outputs_are_not_watched(tmp_path):
+    report = tmp_path / "jacoco.xml"
+    output = tmp_path / "jacoco.filtered.xml"
+    touch(report, "<report/>", 1_000_000_000)
+    touch(output, "<report/>", 1_000_000_000)
+    processed = []
+    watcher = make_watcher([report, output], processed)
+
+    watcher.run(polls=3)
+    assert processed == [[report]]
+    assert watcher.changes.inputs == [report]
+
+
+def test_processing_error_does_not_stop_watching(tmp_path, caplog):
+    report = tmp_path / "jacoco.xml"
+    touch(report, "<report/>", 1_000_000_000)
+    calls = []
+
+    def process(ready):
+        calls.append(ready)
+        raise ValueError("broken report")
+
+    clock = FakeClock()
+    watcher = ReportWatcher(lambda: [report], process, clock=clock, sleep=clock.sleep)
+
+    watcher.run(polls=5)
+    assert len(calls) == 1
+    assert "broken report" in caplog.text
+
+    touch(report, "<report></report>", 2_000_000_000)
+    watcher.run(polls=10)
+    assert len(calls) == 2
+
+
+def test_inputs_are_resolved_again_periodically(tmp_path):
+    first = tmp_path / "a.xml"
+    second = tmp_path / "b.xml"
+    touch(first, "<report/>", 1_000_000_000)
+    files = [first]
+    resolves = []
+    processed = []
+
+    def resolve():
+        resolves.append(1)
+        return list(files)
+
+    clock = FakeClock()
+    watcher = ReportWatcher(resolve, processed.append, clock=clock, sleep=clock.sleep)
+
+    watcher.run(polls=3)
+    touch(second, "<report/>", 1_000_000_000)
+    files.append(second)
+    watcher.run(polls=RESCAN_POLLS)
+    assert processed == [[first]]
+    assert len(resolves) == 1
+
+    watcher.run(polls=RESCAN_POLLS + 3)
+    assert processed == [[first], [second]]
+    assert len(resolves) == 2
+
+
+def test_main_watch_filters_changed_reports(tmp_path, monkeypatch):
+    (tmp_path / "module").mkdir()
+    report = write_report(tmp_path / "module" / "jacoco.xml", 5)
+    (tmp_path / "rules.txt").write_text("method:get*\n")
+    monkeypatch.chdir(tmp_path)
+    run = ReportWatcher.run
+    monkeypatch.setattr(ReportWatcher, "run", lambda self, polls=None: run(self, 4))
+    monkeypatch.setattr(
+        sys, "argv", ["jacoco-filter", "-i", "**/jacoco*.xml", "-r", "rules.txt", "--watch", "--watch-interval", "0.01"]
+    )
+    os.utime(report, ns=(1_000_000_000, 1_000_000_000))
+
+    main()
+
+    output = tmp_path / "module" / "jacoco.filtered.xml"
+    assert output.exists()
+    assert not (tmp_path / "module" / "jacoco.filtered.filtered.xml").exists()
+
+
+def test_watch_interval_must_be_positive(tmp_path, monkeypatch):
+    (tmp_path / "rules.txt").write_text("method:get*\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        sys, "argv", ["jacoco-filter", "-i", "*.xml", "-r", "rules.txt", "--watch", "--watch-interval", "-1"]
+    )
+
+    with pytest.raises(SystemExit) as e:
+        main()
+    assert e.value.code == 1
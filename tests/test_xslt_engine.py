@@ -0,0 +1,117 @@
+import copy
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from jacoco_filter.counter_updater import CounterUpdater
+from jacoco_filter.filter_engine import FilterEngine
+from jacoco_filter.parser import JacocoParser
+from jacoco_filter.pipeline import select_engine
+from jacoco_filter.rules import FilterRule, load_filter_rules
+from jacoco_filter.serializer import ReportSerializer
+from jacoco_filter.xslt_engine import XsltFilterEngine, glob_to_xpath, rules_hash, RE_NS, STR_NS
+from tests.report_factory import write_report
+
+EXAMPLES = Path(__file__).parent.parent / "examples"
+
+
+def canonical(path: Path) -> bytes:
+    # Whitespace left behind by removed elements differs between the engines and is irrelevant
+    root = etree.parse(str(path)).getroot()
+    for elem in root.iter():
+        elem.text = (elem.text or "").strip() or None
+        elem.tail = None
+    return etree.tostring(root)
+
+
+def run_model(path: Path, rules, out: Path) -> dict:
+    report = JacocoParser(path).parse()
+    engine = FilterEngine(rules)
+    engine.apply(report)
+    CounterUpdater().apply(report)
+    ReportSerializer(report).write_to_file(out)
+    return engine.stats
+
+
+def run_xslt(path: Path, rules, out: Path, cache_dir=None) -> dict:
+    engine = XsltFilterEngine(rules, cache_dir)
+    report = engine.apply(JacocoParser(path).parse_tree())
+    ReportSerializer(report).write_to_file(out)
+    return engine.stats
+
+
+@pytest.mark.parametrize("pattern", ["*", "Foo", "Foo*", "*Bar", "F*o*r", "*o*", "a*b*c", "F?o*", "[FB]*", "*Spec.scala"])
+@pytest.mark.parametrize("value", ["", "Foo", "FooBar", "Bar", "Fr", "abcabc", "acb", "MySpec.scala", "F'o\"o"])
+def test_glob_to_xpath_agrees_with_fnmatchcase(pattern, value):
+    elem = etree.Element("x", v=value)
+    expr = glob_to_xpath("string(@v)", pattern)
+    result = elem.xpath(expr, namespaces={"re": RE_NS, "str": STR_NS})
+    assert result is fnmatchcase(value, pattern), expr
+
+
+@pytest.mark.parametrize("report", ["atum-agent/jacoco.xml", "atum-reader/jacoco.xml", "module_A/target/sample.xml"])
+def test_xslt_engine_matches_model_engine(report, tmp_path):
+    rules = load_filter_rules(EXAMPLES / "rules.txt") + [FilterRule.parse("method:*Measure?#apply")]
+
+    model_stats = run_model(EXAMPLES / report, rules, tmp_path / "model.xml")
+    xslt_stats = run_xslt(EXAMPLES / report, rules, tmp_path / "xslt.xml")
+
+    assert xslt_stats == model_stats
+    assert canonical(tmp_path / "xslt.xml") == canonical(tmp_path / "model.xml")
+
+
+def test_xslt_engine_matches_model_engine_on_generated_report(tmp_path):
+    path = write_report(tmp_path / "generated.xml", 200, classes_per_package=30)
+    rules = [
+        FilterRule.parse("class:*$Inner"),
+        FilterRule.parse("file:Source1?.java"),
+        FilterRule.parse("method:get*"),
+        FilterRule.parse("method:Class1*#method*"),
+    ]
+
+    model_stats = run_model(path, rules, tmp_path / "model.xml")
+    xslt_stats = run_xslt(path, rules, tmp_path / "xslt.xml")
+
+    assert xslt_stats == model_stats
+    assert canonical(tmp_path / "xslt.xml") == canonical(tmp_path / "model.xml")
+
+
+def test_stylesheet_is_cached_on_disk_by_rule_hash(tmp_path):
+    rules = [FilterRule.parse("class:com.cached.*")]
+    cache_dir = tmp_path / "cache"
+
+    XsltFilterEngine(rules, cache_dir)
+
+    cached = cache_dir / "xslt" / f"{rules_hash(rules)}.xsl"
+    assert cached.is_file()
+    assert b"com.cached." in cached.read_bytes()
+    assert rules_hash(rules) != rules_hash([FilterRule.parse("class:com.other.*")])
+
+
+def test_xslt_engine_counts_classes_of_groups_with_the_same_names(tmp_path):
+    path = write_report(tmp_path / "generated.xml", 40, classes_per_package=10, packages_per_group=2)
+    tree = etree.parse(str(path))
+    aggregate = tree.getroot().find("group")
+    # A second module with the same classes, in other sourcefiles
+    module = copy.deepcopy(aggregate.find("group"))
+    module.set("name", "copy")
+    for elem in module.iter("class"):
+        elem.set("sourcefilename", "Other" + elem.get("sourcefilename"))
+    for elem in module.iter("sourcefile"):
+        elem.set("name", "Other" + elem.get("name"))
+    aggregate.insert(len(aggregate) - 1, module)
+    tree.write(str(path))
+    rules = [FilterRule.parse("file:Source1.java"), FilterRule.parse("method:get*")]
+
+    model_stats = run_model(path, rules, tmp_path / "model.xml")
+    xslt_stats = run_xslt(path, rules, tmp_path / "xslt.xml")
+
+    assert model_stats["classes_removed"] == 2
+    assert xslt_stats == model_stats
+
+
+def test_tracing_falls_back_from_the_xslt_engine():
+    assert select_engine({"engine": "xslt", "trace": "trace.jsonl"}) == "model"
+    assert select_engine({"engine": "tree", "trace": "trace.jsonl"}) == "tree"